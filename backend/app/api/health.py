@@ -1,7 +1,10 @@
 from fastapi import APIRouter
 
+from ..services import http_client
+
 router = APIRouter(tags=["health"])
 
 @router.get("/health")
 async def health():
-    return {"status": "ok"}
+    # "outbound": Sheets/CSV fetch counters (rate limiter waits, retries).
+    return {"status": "ok", "outbound": http_client.stats()}
@@ -0,0 +1,33 @@
+# backend/app/api/jobs.py
+from __future__ import annotations
+
+from fastapi import APIRouter, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.schemas import JobOut
+from app.services import jobs
+
+
+router = APIRouter(
+    prefix="/jobs",
+    tags=["jobs"],
+)
+
+
+def job_accepted(job: jobs.Job) -> JSONResponse:
+    """202 Accepted for a submitted job: its status, and where to poll it."""
+    return JSONResponse(
+        status_code=202,
+        content=jsonable_encoder(job.to_dict()),
+        headers={"Location": f"/jobs/{job.id}"},
+    )
+
+
+@router.get("/{job_id}", response_model=JobOut)
+def get_job(job_id: str) -> JobOut:
+    """Poll a background job until status is "succeeded" or "failed"."""
+    try:
+        return jobs.get_job(job_id).to_dict()
+    except jobs.JobNotFoundError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
@@ -1,20 +1,51 @@
 # backend/app/api/library.py
 from __future__ import annotations
 
+import asyncio
+import base64
+import hashlib
+import json
+from typing import Any, AsyncIterator, Dict, List, Literal, NoReturn, Optional, Union
 from uuid import uuid4
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 
 # ✅ IMPORTANT: use the real modules, not .api-relative ones
 from app import db
+from app.compact_cards import to_taboo_cards
+from app.config import settings
+from app.conditional import (
+    etag_for_version,
+    etag_matches,
+    not_modified,
+    set_cache_headers,
+)
 from app.models import Deck
+from app.compression import negotiate_encoding
+from app.response_cache import encoded_response, library_body, library_response
+from app.search_index import search_library
+from app.duplicate_index import check_words, duplicate_report, find_duplicates
 from app.schemas import (
     LibraryStateOut,
+    LibrarySummaryOut,
+    LibraryChangesOut,
+    LibrarySearchOut,
+    DuplicateGroupsOut,
+    DuplicateCheckRequest,
+    DuplicateCheckOut,
+    DeckCardsPageOut,
     ImportFromUrlRequest,
     AddCategoryRequest,
     MoveDeckRequest,
+    LibraryBatchRequest,
+    RefreshDecksOut,
+    JobOut,
 )
-from app.services.taboo_parser import fetch_csv_text, parse_deck_from_csv
+from app.api.jobs import job_accepted
+from app.services import deck_refresh, jobs
+from app.services.taboo_parser import fetch_csv_source, parse_deck_from_csv
 
 
 router = APIRouter(
@@ -23,75 +54,324 @@ router = APIRouter(
 )
 
 
+def _raise_library_error(exc: db.LibraryError) -> NoReturn:
+    """Translate a rejected library mutation into the matching HTTP error."""
+    if isinstance(exc, (db.DeckNotFoundError, db.CategoryNotFoundError)):
+        raise HTTPException(status_code=404, detail=str(exc))
+    raise HTTPException(status_code=400, detail=str(exc))
+
+
+# Mutation routes answer with the full state by default (older clients),
+# or with just the summary when called with ?view=summary.
+View = Literal["full", "summary"]
+LibraryOut = Union[LibraryStateOut, LibrarySummaryOut]
+
+DEFAULT_CARDS_PAGE = 100
+MAX_CARDS_PAGE = 1000
+
+DEFAULT_SEARCH_HITS = 50
+MAX_SEARCH_HITS = 500
+
+DEFAULT_DUPLICATE_GROUPS = 100
+MAX_DUPLICATE_GROUPS = 5000
+
+# Comment line sent on idle change streams so proxies keep them open.
+STREAM_KEEPALIVE_SECONDS = 15.0
+
+
+def _library_out(request: Request, view: View) -> Response:
+    """
+    The library as a ready-serialized (and, if the client accepts it,
+    compressed) JSON response: full state (cards included) or just the
+    summary. See response_cache.py.
+    """
+    return library_response("summary" if view == "summary" else "state", request)
+
+
+def _cached_get(request: Request, kind: str) -> Response:
+    """
+    Conditional GET of a cached library body (ETag = library version plus
+    the negotiated Content-Encoding).
+    """
+    encoding = negotiate_encoding(request)
+    version = db.get_library_version()
+    etag = etag_for_version(kind, version, encoding)
+    if etag_matches(request, etag):
+        response = not_modified(etag)
+        response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+    body, version = library_body(kind, version, encoding)
+    response = encoded_response(body, encoding)
+    set_cache_headers(response, etag_for_version(kind, version, encoding))
+    return response
+
+
+def _ensure_uncategorized() -> None:
+    if not db.load_index().has_category("Uncategorized"):
+        db.add_category("Uncategorized", position=0)
+
+
+def _encode_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(f"o:{offset}".encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        prefix, offset = base64.urlsafe_b64decode(padded).decode().split(":", 1)
+        if prefix != "o" or int(offset) < 0:
+            raise ValueError(cursor)
+        return int(offset)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+
 @router.get("/decks-state", response_model=LibraryStateOut)
-async def get_decks_state() -> LibraryStateOut:
+def get_decks_state(request: Request) -> Response:
     """
-    Return all categories + decks for the Manage tab.
+    Return all categories + decks (cards included) for the Play tab.
+
+    The ETag is the library version: if the client already has it
+    (If-None-Match), answer 304 without loading or serializing anything.
+    Otherwise the body comes pre-serialized from response_cache.
 
     Also guarantees that 'Uncategorized' always exists.
     """
-    state = db.load_library()
+    _ensure_uncategorized()
+    return _cached_get(request, "state")
 
-    if "Uncategorized" not in state.categories:
-        state.categories.insert(0, "Uncategorized")
-        db.save_library(state)
 
-    return LibraryStateOut(categories=state.categories, decks=state.decks)
+@router.get("/summary", response_model=LibrarySummaryOut)
+def get_library_summary(request: Request) -> Response:
+    """
+    Return categories + deck metadata without any cards.
 
+    This is all the Manage tab needs, and its size doesn't grow with the
+    number of cards. Conditional and cached like decks-state. Also
+    guarantees that 'Uncategorized' always exists.
+    """
+    _ensure_uncategorized()
+    return _cached_get(request, "summary")
 
-@router.post("/decks/refresh-from-source", response_model=LibraryStateOut)
-async def refresh_decks_from_source() -> LibraryStateOut:
+
+@router.get("/changes", response_model=LibraryChangesOut)
+def get_library_changes(since: int = Query(..., ge=0)) -> LibraryChangesOut:
     """
-    Re-fetch all Google Sheets–backed decks from their source URLs.
+    Return the mutations made after library version `since`.
 
-    Use this when you've updated your Google Sheets and want to sync
-    the stored cards in library.json.
+    Each change is the record the writer committed ({"seq", "op", ...}).
+    If they are too old to replay, reset is true: reload the summary (or
+    decks-state) and continue from `version`.
+    """
+    records, version = db.changes_since(since)
+    if records is None:
+        return LibraryChangesOut(version=version, reset=True)
+    return LibraryChangesOut(version=version, changes=records)
+
+
+def _sse(event: str, data: Dict[str, Any], event_id: int) -> str:
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    return f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n"
+
+
+async def _change_events(request: Request, since: int) -> AsyncIterator[str]:
+    """
+    Server-Sent Events: one "change" event per record (id = its seq), or a
+    "reset" event when the client has to reload everything.
+
+    Our own commits wake the stream immediately; writes from other worker
+    processes are picked up every LIBRARY_CHANGES_POLL_SECONDS.
+    """
+    loop = asyncio.get_running_loop()
+    wake = asyncio.Event()
+
+    def listener() -> None:
+        loop.call_soon_threadsafe(wake.set)
+
+    db.add_change_listener(listener)
+    try:
+        yield "retry: 3000\n\n"
+        last_sent = loop.time()
+
+        while not await request.is_disconnected():
+            wake.clear()
+            records, version = await run_in_threadpool(db.changes_since, since)
+            if records is None:
+                yield _sse("reset", {"version": version}, version)
+                last_sent = loop.time()
+            elif records:
+                for record in records:
+                    yield _sse("change", record, record["seq"])
+                last_sent = loop.time()
+            since = version
+
+            if loop.time() - last_sent >= STREAM_KEEPALIVE_SECONDS:
+                yield ": keepalive\n\n"
+                last_sent = loop.time()
+
+            try:
+                await asyncio.wait_for(
+                    wake.wait(), timeout=settings.LIBRARY_CHANGES_POLL_SECONDS
+                )
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        db.remove_change_listener(listener)
+
+
+@router.get("/changes/stream")
+async def stream_library_changes(
+    request: Request,
+    since: Optional[int] = Query(None, ge=0),
+) -> StreamingResponse:
+    """
+    Push library changes live (text/event-stream, use EventSource).
+
+    Starts after `since`; a reconnecting EventSource resumes from its
+    Last-Event-ID; otherwise only changes from now on are sent.
     """
-    state = db.load_library()
-    dirty = False
+    if since is None:
+        last_event_id = request.headers.get("last-event-id", "")
+        if last_event_id.isdigit():
+            since = int(last_event_id)
+        else:
+            since = await run_in_threadpool(db.get_library_version)
+
+    return StreamingResponse(
+        _change_events(request, since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/decks/{deck_id}/cards", response_model=DeckCardsPageOut)
+def get_deck_cards(
+    deck_id: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_CARDS_PAGE, ge=1, le=MAX_CARDS_PAGE),
+) -> DeckCardsPageOut:
+    """
+    Return one page of a deck's cards.
+
+    Start without a cursor; keep passing back `next_cursor` until it is
+    null.
+    """
+    offset = _decode_cursor(cursor) if cursor else 0
+    try:
+        cards = db.load_deck_cards(deck_id)
+    except db.LibraryError as exc:
+        _raise_library_error(exc)
+
+    end = offset + limit
+    return DeckCardsPageOut(
+        deck_id=deck_id,
+        total=len(cards),
+        cards=to_taboo_cards(cards[offset:end]),
+        next_cursor=_encode_cursor(end) if end < len(cards) else None,
+    )
+
+
+@router.get("/search", response_model=LibrarySearchOut)
+def search_cards(
+    q: str = Query(..., min_length=1, max_length=200),
+    prefix: bool = True,
+    deck_id: Optional[List[str]] = Query(None),
+    category: Optional[str] = None,
+    limit: int = Query(DEFAULT_SEARCH_HITS, ge=1, le=MAX_SEARCH_HITS),
+) -> LibrarySearchOut:
+    """
+    Find cards whose goal word or taboo words contain every word of `q`
+    (case-insensitive; with prefix=true, "ice cr" also finds "Ice Cream").
 
-    for deck in state.decks:
-        # Only refresh Google Sheets decks that have a source URL
-        if deck.source_type != "google_sheets":
-            continue
-        if not deck.source:
-            continue
+    Narrow it down with one or more deck_id=... and/or category=...
+    """
+    try:
+        result = search_library(q, prefix=prefix, deck_ids=deck_id, category=category, limit=limit)
+    except db.LibraryError as exc:
+        _raise_library_error(exc)
+    return LibrarySearchOut(**result)
+
+
+@router.get("/duplicates", response_model=DuplicateGroupsOut)
+def list_duplicates(
+    deck_id: Optional[List[str]] = Query(None),
+    category: Optional[str] = None,
+    near: bool = True,
+    cross_deck: bool = True,
+    limit: int = Query(DEFAULT_DUPLICATE_GROUPS, ge=1, le=MAX_DUPLICATE_GROUPS),
+) -> DuplicateGroupsOut:
+    """
+    Goal words that appear on more than one card, largest groups first.
 
-        try:
-            csv_text = await fetch_csv_text(deck.source)
-            # Use the deck's configured taboo_words_per_card (default is 4)
-            cards = parse_deck_from_csv(csv_text, deck.taboo_words_per_card)
-        except Exception as exc:
-            # Don't kill the whole refresh if one deck fails
-            print(f"Failed to refresh deck {deck.id}: {exc}")
-            continue
+    near=false only counts words that are identical up to case and
+    whitespace; cross_deck=false also lists repeats within one deck.
+    Narrow it down to groups involving deck_id=... and/or category=...
+    """
+    try:
+        result = find_duplicates(
+            deck_ids=deck_id, category=category, near=near, cross_deck=cross_deck, limit=limit
+        )
+    except db.LibraryError as exc:
+        _raise_library_error(exc)
+    return DuplicateGroupsOut(**result)
 
-        if cards:
-            deck.cards = cards
-            deck.card_count = len(cards)
-            dirty = True
 
-    if dirty:
-        db.save_library(state)
+@router.post("/duplicates/check", response_model=DuplicateCheckOut)
+def check_duplicates(body: DuplicateCheckRequest) -> DuplicateCheckOut:
+    """Which of these goal words already exist in the library (exactly or nearly)."""
+    return DuplicateCheckOut(**check_words(body.words, body.exclude_deck_id))
+
+
+@router.post("/decks/refresh-from-source", status_code=202, response_model=JobOut)
+async def refresh_decks_from_source() -> Response:
+    """
+    Re-fetch all Google Sheets–backed decks from their source URLs.
+
+    Use this when you've updated your Google Sheets and want to sync
+    the stored cards. Runs as a background job: answers 202 right away,
+    poll GET /jobs/{id}. The job's result reports how each deck went
+    (RefreshDecksOut); decks are fetched concurrently (see
+    services/deck_refresh.py). Only one refresh runs at a time.
+    """
+    async def run(job: jobs.Job):
+        results = await deck_refresh.refresh_decks(progress=job.set_progress)
+        return RefreshDecksOut.model_validate(deck_refresh.summarize(results)).model_dump()
 
-    return LibraryStateOut(categories=state.categories, decks=state.decks)
+    return job_accepted(jobs.submit("library_refresh", run, key="library_refresh"))
 
 
-@router.post("/decks/from-url", response_model=LibraryStateOut)
-async def import_deck_from_url(body: ImportFromUrlRequest) -> LibraryStateOut:
+@router.post("/decks/from-url", status_code=202, response_model=JobOut)
+async def import_deck_from_url(body: ImportFromUrlRequest) -> Response:
     """
     Import a deck from a Google Sheets/CSV URL and add it to the library.
 
     This is where we actually parse the CSV into TabooCard objects and
-    store them on the Deck.
+    store them on the Deck. Runs as a background job: answers 202 right
+    away, poll GET /jobs/{id}; the result is {"deck_id", "name",
+    "card_count"}.
     """
+    async def run(job: jobs.Job):
+        return await _import_deck(body, job)
+
+    # Only an identical request (same URL, name, category, ...) joins a
+    # running import; anything else is an import of its own.
+    request_hash = hashlib.sha256(
+        json.dumps(body.model_dump(), sort_keys=True).encode("utf-8")
+    ).hexdigest()[:32]
+    return job_accepted(jobs.submit("deck_import", run, key=f"deck_import:{request_hash}"))
+
+
+async def _import_deck(body: ImportFromUrlRequest, job: jobs.Job) -> Dict[str, Any]:
     # Pull raw data so we're safe even if the Pydantic model doesn't
     # actually define taboo_words_per_card yet.
     taboo_words_per_card = body.taboo_words_per_card or 4
 
+    job.set_progress(0, 2, "Fetching")
     try:
-        csv_text = await fetch_csv_text(body.url)
-        cards = parse_deck_from_csv(csv_text, taboo_words_per_card)
+        fetch = await fetch_csv_source(body.url)
+        job.set_progress(1, 2, "Parsing")
+        cards = await run_in_threadpool(parse_deck_from_csv, fetch.text, taboo_words_per_card)
     except Exception as exc:
         raise HTTPException(
             status_code=400,
@@ -104,15 +384,11 @@ async def import_deck_from_url(body: ImportFromUrlRequest) -> LibraryStateOut:
             detail="No valid cards found in the provided CSV/Sheets URL.",
         )
 
-    state = db.load_library()
-
     # Either use provided name or make a generic one
     deck_name = (body.name or "").strip() or _make_deck_name()
 
-    # Category: if provided and it doesn't exist yet, add it
+    # Category: if provided and it doesn't exist yet, upsert_deck adds it
     category = (body.category or "").strip() or "Uncategorized"
-    if category not in state.categories:
-        state.categories.append(category)
 
     deck = Deck(
         id=str(uuid4()),
@@ -125,9 +401,23 @@ async def import_deck_from_url(body: ImportFromUrlRequest) -> LibraryStateOut:
         cards=cards,
     )
 
-    state.decks.append(deck)
-    db.save_library(state)
-    return LibraryStateOut(categories=state.categories, decks=state.decks)
+    # Checked before the deck lands, so its own cards don't count.
+    duplicates = await run_in_threadpool(duplicate_report, [c.word for c in cards])
+
+    await run_in_threadpool(db.upsert_deck, deck)
+    # The new deck holds exactly this version: its first refresh can
+    # revalidate instead of fetching it again.
+    try:
+        await fetch.remember(f"deck:{deck.id}")
+    except OSError as exc:
+        print(f"Failed to cache the source of deck {deck.id}: {exc}")
+    job.set_progress(2, 2, "Done")
+    return {
+        "deck_id": deck.id,
+        "name": deck.name,
+        "card_count": deck.card_count,
+        "duplicates": duplicates,
+    }
 
 
 def _make_deck_name() -> str:
@@ -135,70 +425,74 @@ def _make_deck_name() -> str:
     return "Imported deck"
 
 
-@router.post("/categories", response_model=LibraryStateOut)
-async def add_category(body: AddCategoryRequest) -> LibraryStateOut:
-    state = db.load_library()
+@router.post("/categories", response_model=LibraryOut)
+def add_category(request: Request, body: AddCategoryRequest, view: View = "full") -> Response:
     name = body.name.strip()
     if not name:
         raise HTTPException(status_code=400, detail="Category name cannot be empty.")
 
-    if name not in state.categories:
-        state.categories.append(name)
-        db.save_library(state)
-
-    return LibraryStateOut(categories=state.categories, decks=state.decks)
-
-
-@router.delete("/categories/{name}", response_model=LibraryStateOut)
-async def delete_category(name: str) -> LibraryStateOut:
-    state = db.load_library()
-    if name == "Uncategorized":
-        raise HTTPException(
-            status_code=400,
-            detail="Cannot delete the 'Uncategorized' category.",
-        )
+    db.add_category(name)
+    return _library_out(request, view)
 
-    if name not in state.categories:
-        raise HTTPException(status_code=404, detail="Category not found.")
-
-    # Move decks back to 'Uncategorized'
-    for deck in state.decks:
-        if deck.category == name:
-            deck.category = "Uncategorized"
-
-    state.categories = [c for c in state.categories if c != name]
-    db.save_library(state)
-    return LibraryStateOut(categories=state.categories, decks=state.decks)
 
+@router.delete("/categories/{name}", response_model=LibraryOut)
+def delete_category(request: Request, name: str, view: View = "full") -> Response:
+    # Decks in the deleted category move back to 'Uncategorized'
+    try:
+        db.delete_category(name)
+    except db.LibraryError as exc:
+        _raise_library_error(exc)
+    return _library_out(request, view)
 
-@router.patch("/decks/{deck_id}/category", response_model=LibraryStateOut)
-async def move_deck_category(deck_id: str, body: MoveDeckRequest) -> LibraryStateOut:
-    state = db.load_library()
-    if body.category not in state.categories:
-        raise HTTPException(status_code=400, detail="Target category does not exist.")
 
-    found = False
-    for deck in state.decks:
-        if deck.id == deck_id:
-            deck.category = body.category
-            found = True
-            break
+@router.patch("/decks/{deck_id}/category", response_model=LibraryOut)
+def move_deck_category(
+    request: Request, deck_id: str, body: MoveDeckRequest, view: View = "full"
+) -> Response:
+    try:
+        db.move_deck(deck_id, body.category)
+    except db.LibraryError as exc:
+        _raise_library_error(exc)
+    return _library_out(request, view)
 
-    if not found:
-        raise HTTPException(status_code=404, detail="Deck not found.")
 
-    db.save_library(state)
-    return LibraryStateOut(categories=state.categories, decks=state.decks)
+@router.delete("/decks/{deck_id}", response_model=LibraryOut)
+def delete_deck(request: Request, deck_id: str, view: View = "full") -> Response:
+    try:
+        db.delete_deck(deck_id, missing_ok=False)
+    except db.LibraryError as exc:
+        _raise_library_error(exc)
+    return _library_out(request, view)
 
 
-@router.delete("/decks/{deck_id}", response_model=LibraryStateOut)
-async def delete_deck(deck_id: str) -> LibraryStateOut:
-    state = db.load_library()
-    original_len = len(state.decks)
-    state.decks = [d for d in state.decks if d.id != deck_id]
+@router.post("/batch", response_model=LibraryOut)
+def apply_library_batch(
+    request: Request, body: LibraryBatchRequest, view: View = "full"
+) -> Response:
+    """
+    Apply a list of operations (add/delete category, move/delete/rename
+    deck) in order, atomically, with a single write.
 
-    if len(state.decks) == original_len:
-        raise HTTPException(status_code=404, detail="Deck not found.")
+    All operations are checked against the state the previous ones leave
+    behind; if any of them fails nothing is applied and the error names
+    the operation. Deleting a deck that is already gone is an error here,
+    like DELETE /library/decks/{id}.
+    """
+    ops: List[Dict[str, Any]] = []
+    for operation in body.operations:
+        record = operation.model_dump()
+        if operation.op == "add_category":
+            record["name"] = record["name"].strip()
+            if not record["name"]:
+                raise HTTPException(status_code=400, detail="Category name cannot be empty.")
+        elif operation.op == "rename_deck":
+            record["name"] = record["name"].strip()
+        elif operation.op == "delete_deck":
+            record["missing_ok"] = False
+        ops.append(record)
 
-    db.save_library(state)
-    return LibraryStateOut(categories=state.categories, decks=state.decks)
+    try:
+        db.apply_batch(ops)
+    except db.LibraryError as exc:
+        _raise_library_error(exc)
+    return _library_out(request, view)
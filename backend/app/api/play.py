@@ -0,0 +1,81 @@
+# backend/app/api/play.py
+from __future__ import annotations
+
+from typing import NoReturn
+
+from fastapi import APIRouter, HTTPException
+
+from app.schemas import CreatePlaySessionRequest, PlaySessionOut
+from app.services import play_sessions
+
+
+router = APIRouter(
+    prefix="/play",
+    tags=["play"],
+)
+
+
+def _raise_play_error(exc: play_sessions.PlaySessionError) -> NoReturn:
+    if isinstance(exc, play_sessions.PlaySessionNotFoundError):
+        raise HTTPException(status_code=404, detail=str(exc))
+    raise HTTPException(status_code=400, detail=str(exc))
+
+
+@router.post("/sessions", response_model=PlaySessionOut)
+def create_play_session(body: CreatePlaySessionRequest) -> PlaySessionOut:
+    """
+    Start a shuffled run over the selected decks and return its first card.
+
+    The server keeps the shuffle; the client only ever receives the
+    current card.
+    """
+    if not body.deck_ids:
+        raise HTTPException(status_code=400, detail="Select at least one deck first.")
+    try:
+        return play_sessions.create_session(body.deck_ids)
+    except play_sessions.PlaySessionError as exc:
+        _raise_play_error(exc)
+
+
+@router.get("/sessions/{session_id}", response_model=PlaySessionOut)
+def get_play_session(session_id: str) -> PlaySessionOut:
+    try:
+        return play_sessions.get_session(session_id)
+    except play_sessions.PlaySessionError as exc:
+        _raise_play_error(exc)
+
+
+@router.post("/sessions/{session_id}/draw", response_model=PlaySessionOut)
+def draw_card(session_id: str) -> PlaySessionOut:
+    """The current card was played; move on to the next one."""
+    try:
+        return play_sessions.draw(session_id)
+    except play_sessions.PlaySessionError as exc:
+        _raise_play_error(exc)
+
+
+@router.post("/sessions/{session_id}/skip", response_model=PlaySessionOut)
+def skip_card(session_id: str) -> PlaySessionOut:
+    """Send the current card to the back of the run."""
+    try:
+        return play_sessions.skip(session_id)
+    except play_sessions.PlaySessionError as exc:
+        _raise_play_error(exc)
+
+
+@router.post("/sessions/{session_id}/reshuffle", response_model=PlaySessionOut)
+def reshuffle_session(session_id: str) -> PlaySessionOut:
+    """Start a fresh shuffled run over the same decks."""
+    try:
+        return play_sessions.reshuffle(session_id)
+    except play_sessions.PlaySessionError as exc:
+        _raise_play_error(exc)
+
+
+@router.delete("/sessions/{session_id}")
+def end_play_session(session_id: str):
+    try:
+        play_sessions.end_session(session_id)
+    except play_sessions.PlaySessionError as exc:
+        _raise_play_error(exc)
+    return {"message": "Play session ended."}
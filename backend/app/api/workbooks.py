@@ -1,20 +1,23 @@
 # backend/app/api/workbooks.py
 
-from fastapi import APIRouter, HTTPException
+import json
+
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
 
 from app import db
-from app.services.sheet_parser import parse_workbook
+from app.api.jobs import job_accepted
+from app.conditional import etag_for_bytes, etag_matches, not_modified, set_cache_headers
+from app.schemas import JobOut
+from app.services import jobs, workbook_autosync, workbook_sync
+from app.services.sheet_parser import GoogleSheetsError, extract_sheet_id
 from app.services.crud_workbook import (
-    create_workbook,
     get_all_workbooks,
-    update_workbook,
     get_workbook_by_id,
-    update_last_synced,
     delete_workbook,
 )
-from app.models import Workbook, WorkbookTab
-from app.services.crud_deck import create_deck, update_deck_cards
 
 
 router = APIRouter(prefix="/admin/workbooks", tags=["workbooks"])
@@ -24,86 +27,73 @@ class WorkbookCreateRequest(BaseModel):
     sheet_url: str
 
 
-@router.post("/add")
-def add_workbook(body: WorkbookCreateRequest):
-  parsed = parse_workbook(body.sheet_url)
-
-  # Build workbook object WITHOUT deck IDs yet
-  workbook = Workbook(
-      workbook_id=parsed["sheet_id"],
-      name=parsed["name"],
-      tabs=[
-          WorkbookTab(
-              tab_name=t["tab_name"],
-              sheet_gid=t["sheet_gid"],
-              deck_id=None,
-          )
-          for t in parsed["tabs"]
-      ],
-  )
-
-  # Insert and get Mongo ObjectId
-  workbook_id = create_workbook(workbook)
-
-  # Now create decks for each tab and wire deck IDs back into the workbook
-  for tab_data in parsed["tabs"]:
-      tab_url = (
-          f"https://docs.google.com/spreadsheets/d/{parsed['sheet_id']}/edit"
-          f"#gid={tab_data['sheet_gid']}"
-      )
-
-      deck_id = create_deck(
-          name=tab_data["tab_name"],
-          cards=tab_data["cards"],
-          source=tab_url,  # Used by UI "Sheet" button
-          workbook_id=workbook_id,
-          sheet_gid=tab_data["sheet_gid"],
-          tab_name=tab_data["tab_name"],
-      )
-
-      # Attach deck_id to matching workbook tab
-      for t in workbook.tabs:
-          if t.tab_name == tab_data["tab_name"] and t.sheet_gid == tab_data["sheet_gid"]:
-              t.deck_id = deck_id
-              break
-
-  # Save workbook with deck IDs included
-  update_workbook(workbook_id, workbook)
-  update_last_synced(workbook_id)
-
-  return {
-      "message": "Workbook imported.",
-      "workbook_id": workbook_id,
-  }
+@router.post("/add", status_code=202, response_model=JobOut)
+async def add_workbook(body: WorkbookCreateRequest):
+    """
+    Import a workbook (one deck per tab) as a background job.
+
+    Answers 202 with the job right away; poll GET /jobs/{id}. Its result
+    is {"message", "workbook_id"}. Importing the same sheet again while
+    that job is still running returns the running job.
+    """
+    try:
+        sheet_id = extract_sheet_id(body.sheet_url)
+    except GoogleSheetsError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    async def run(job: jobs.Job):
+        return await workbook_sync.import_workbook(body.sheet_url, job.set_progress)
+
+    job = jobs.submit("workbook_import", run, key=f"workbook_import:{sheet_id}")
+    return job_accepted(job)
 
 
 @router.get("/list")
-def list_workbooks():
-    return [w.dict(by_alias=True) for w in get_all_workbooks()]
+def list_workbooks(request: Request):
+    """
+    All workbooks. Workbooks live in Mongo with no version number, so the
+    ETag is a hash of the (small) serialized list; a matching If-None-Match
+    gets an empty 304 instead of the body.
+    """
+    payload = jsonable_encoder([w.dict(by_alias=True) for w in get_all_workbooks()])
+    body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
 
+    etag = etag_for_bytes(body)
+    if etag_matches(request, etag):
+        return not_modified(etag)
 
-@router.post("/{workbook_id}/reload")
-def reload_workbook(workbook_id: str):
-    workbook = get_workbook_by_id(workbook_id)
-    if not workbook:
-        raise HTTPException(404, "Workbook not found.")
+    response = Response(content=body, media_type="application/json")
+    set_cache_headers(response, etag)
+    return response
+
+
+@router.get("/autosync")
+def autosync_status():
+    """
+    State of the background auto-sync: when it last checked, which
+    workbooks are syncing now, and which are backing off after failures.
+    """
+    return jsonable_encoder(workbook_autosync.status())
 
-    parsed = parse_workbook(workbook.workbook_id)
 
-    # Update decks: keep deck IDs the same, just replace cards
-    for tab_data in parsed["tabs"]:
-        # Find the corresponding tab by name
-        tab = next(
-            (t for t in workbook.tabs if t.tab_name == tab_data["tab_name"]),
-            None,
-        )
-        if not tab or not tab.deck_id:
-            continue
+@router.post("/{workbook_id}/reload", status_code=202, response_model=JobOut)
+async def reload_workbook(workbook_id: str):
+    """
+    Re-parse a workbook and replace its decks' cards, as a background job.
+
+    Answers 202 with the job; poll GET /jobs/{id}. A reload of a workbook
+    that is already being reloaded returns that job instead of starting a
+    second one.
+    """
+    workbook = await run_in_threadpool(get_workbook_by_id, workbook_id)
+    if not workbook:
+        raise HTTPException(404, "Workbook not found.")
 
-        update_deck_cards(tab.deck_id, tab_data["cards"])
+    async def run(job: jobs.Job):
+        return await workbook_sync.reload_workbook(workbook_id, job.set_progress)
 
-    update_last_synced(workbook_id)
-    return {"message": "Workbook reloaded."}
+    job = jobs.submit("workbook_reload", run, key=f"workbook:{workbook_id}")
+    return job_accepted(job)
 
 
 @router.delete("/{workbook_id}")
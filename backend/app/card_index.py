@@ -0,0 +1,158 @@
+"""
+Shared plumbing for in-memory indexes derived from deck cards (search,
+duplicate detection).
+
+A CardIndex follows the library through its change feed instead of
+rescanning it: sync() asks db.changes_since() what was committed since the
+version it last indexed and re-indexes only the decks those records
+touched (upsert_deck, replace_cards, delete_deck, including inside
+batches). Category and move/rename ops don't touch cards, so they cost
+nothing; deck names and categories are looked up from the index metadata
+at query time. If the change log no longer reaches back far enough (or
+the whole library was replaced) the index is rebuilt from scratch.
+
+sync() runs lazily at the start of every query, so the first query after
+a startup pays for the full build and later ones only for what changed.
+Writes by other worker processes are picked up the same way.
+"""
+from __future__ import annotations
+
+import re
+import threading
+import unicodedata
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Iterable, List, Optional, Set, Tuple
+
+from . import db
+from .compact_cards import CompactCard
+from .library_ops import flatten_record, record_deck_id
+
+
+# Ops that change a deck's cards, and ops that don't touch cards at all.
+# Anything else (e.g. "replace_library") triggers a full rebuild.
+CARD_OPS = frozenset({"upsert_deck", "replace_cards", "delete_deck"})
+META_OPS = frozenset({"add_category", "delete_category", "move_deck", "rename_deck"})
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def normalize(text: str) -> str:
+    """
+    Case- and width-insensitive form of a word: NFKC, casefolded (and
+    NFKC again, since casefolding can un-normalize a few characters).
+    """
+    if text.isascii():
+        return text.lower()  # same result, much cheaper
+    return unicodedata.normalize("NFKC", unicodedata.normalize("NFKC", text).casefold())
+
+
+def tokenize(normalized: str) -> List[str]:
+    """The word tokens of an already normalized string ("ice-cream" -> ice, cream)."""
+    if normalized.isalnum():
+        return [normalized]
+    return _WORD_RE.findall(normalized)
+
+
+@lru_cache(maxsize=1 << 16)
+def terms(text: str) -> Tuple[str, ...]:
+    """
+    Distinct tokens of a raw card word, normalized. Cached: the same taboo
+    words come up again and again across a library.
+    """
+    return tuple(dict.fromkeys(tokenize(normalize(text))))
+
+
+def changed_decks(records: Iterable[dict]) -> Optional[Set[str]]:
+    """
+    Ids of the decks whose cards `records` touched, or None if one of them
+    can't be applied deck by deck (full rebuild needed).
+    """
+    deck_ids: Set[str] = set()
+    for record in records:
+        for sub in flatten_record(record):
+            op = sub.get("op")
+            if op in CARD_OPS:
+                deck_ids.add(record_deck_id(sub))
+            elif op not in META_OPS:
+                return None
+    return deck_ids
+
+
+class CardIndex(ABC):
+    """
+    Base class: keeps a derived index in step with the library.
+
+    Subclasses implement _clear(), _add_deck() and _remove_deck(), and may
+    override _after_update() to tidy up once per sync. All of them are
+    called with self._lock held; queries should hold it too (call sync()
+    first, then read under the lock).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._version: Optional[int] = None  # library version indexed; None = never built
+
+    # ----- to implement -----
+
+    @abstractmethod
+    def _clear(self) -> None:
+        """Forget every deck."""
+
+    @abstractmethod
+    def _add_deck(self, deck_id: str, cards: List[CompactCard]) -> None:
+        """Index a deck's cards (the deck is not indexed yet)."""
+
+    @abstractmethod
+    def _remove_deck(self, deck_id: str) -> None:
+        """Drop a deck; a no-op if it isn't indexed."""
+
+    def _after_update(self) -> None:
+        pass
+
+    # ----- maintenance -----
+
+    def _index_deck(self, deck_id: str) -> None:
+        self._remove_deck(deck_id)
+        try:
+            cards = db.load_deck_cards(deck_id)
+        except db.DeckNotFoundError:
+            return  # deleted
+        self._add_deck(deck_id, cards)
+
+    def _rebuild(self) -> None:
+        index, version = db.load_index_and_version()
+        self._clear()
+        for meta in list(index.decks):
+            self._index_deck(meta.id)
+        # Commits landing while we read cards are replayed by the next
+        # sync(); re-indexing a deck is idempotent.
+        self._version = version
+
+    def sync(self) -> int:
+        """Bring the index up to the current library version and return it."""
+        current = db.get_library_version()
+        with self._lock:
+            if self._version == current:
+                return current
+
+            deck_ids = None
+            if self._version is not None:
+                records, version = db.changes_since(self._version)
+                if records is not None:
+                    deck_ids = changed_decks(records)
+
+            if deck_ids is None:
+                self._rebuild()
+            else:
+                for deck_id in deck_ids:
+                    self._index_deck(deck_id)
+                self._version = version
+            self._after_update()
+            return self._version
+
+    def reset(self) -> None:
+        """Forget everything; the next sync() rebuilds from scratch."""
+        with self._lock:
+            self._clear()
+            self._version = None
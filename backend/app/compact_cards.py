@@ -0,0 +1,92 @@
+"""
+Compact in-memory representation of deck cards.
+
+A Pydantic TabooCard costs ~500 bytes before counting its strings (the
+instance, its __dict__, a fields-set set and a list), and every taboo word
+decoded from JSON is its own str object even though the same words repeat
+across thousands of cards.
+
+Internally (card cache, stores) cards are CompactCard tuples instead:
+
+    CompactCard(word, taboo)   word: str, taboo: tuple of str
+
+with every string interned in one shared pool (sys.intern: one object per
+distinct string, freed again once no card uses it). CompactCard keeps the
+.word / .taboo attribute names, so code that only reads cards works with
+either type. Convert to TabooCard only when building an API response
+(to_taboo_cards).
+
+See scripts/measure_card_memory.py for the numbers on 100k cards.
+"""
+from __future__ import annotations
+
+import sys
+from typing import Iterable, List, NamedTuple, Sequence, Tuple, Union
+
+from .models import TabooCard
+
+
+class CompactCard(NamedTuple):
+    word: str
+    taboo: Tuple[str, ...]
+
+
+AnyCard = Union[CompactCard, TabooCard]
+
+_intern = sys.intern
+_new_tuple = tuple.__new__
+
+
+def make_card(word: str, taboo: Iterable[str]) -> CompactCard:
+    """Build a CompactCard, interning all of its strings."""
+    return _new_tuple(CompactCard, (_intern(word), tuple(map(_intern, taboo))))
+
+
+def compact_cards(cards: Iterable[AnyCard]) -> List[CompactCard]:
+    """Convert cards of either type to CompactCard."""
+    return [make_card(c.word, c.taboo) for c in cards]
+
+
+def card_to_dict(card: AnyCard) -> dict:
+    """JSON-ready dict, same shape as TabooCard.model_dump()."""
+    return {"word": card.word, "taboo": list(card.taboo)}
+
+
+def _taboo_card_factory():
+    """
+    Return a (word, taboo list) -> TabooCard constructor.
+
+    model_construct() costs several microseconds per call, which dominates
+    converting a large deck. TabooCard has no private attributes and no
+    extra fields, so an instance is just its __dict__ plus pydantic's
+    bookkeeping slots -- exactly what model_construct() would set. Falls
+    back to model_construct() if the model ever grows something that needs
+    more.
+    """
+    if TabooCard.__private_attributes__ or TabooCard.model_config.get("extra") == "allow":
+        return lambda word, taboo: TabooCard.model_construct(word=word, taboo=taboo)
+
+    new = object.__new__
+    set_attr = object.__setattr__
+
+    def make(word: str, taboo: List[str]) -> TabooCard:
+        card = new(TabooCard)
+        set_attr(card, "__dict__", {"word": word, "taboo": taboo})
+        set_attr(card, "__pydantic_fields_set__", {"word", "taboo"})
+        set_attr(card, "__pydantic_extra__", None)
+        set_attr(card, "__pydantic_private__", None)
+        return card
+
+    return make
+
+
+_make_taboo_card = _taboo_card_factory()
+
+
+def to_taboo_cards(cards: Sequence[AnyCard]) -> List[TabooCard]:
+    """Convert cards to Pydantic TabooCards (API edge only)."""
+    make = _make_taboo_card
+    return [
+        c if isinstance(c, TabooCard) else make(c.word, list(c.taboo))
+        for c in cards
+    ]
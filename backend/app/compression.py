@@ -0,0 +1,81 @@
+"""
+Content-Encoding negotiation (gzip, and brotli when it is installed).
+
+The library payload is very repetitive (the same keys and taboo words over
+and over), so it compresses ~10x. The hot read routes compress each body
+once per library version and keep the result (response_cache.py); every
+other JSON response goes through Starlette's GZipMiddleware (main.py),
+which leaves responses that already carry a Content-Encoding alone.
+
+brotli is optional: `pip install brotli` (or brotlicffi) to offer "br"
+to browsers that accept it. Without it we just stick to gzip.
+"""
+from __future__ import annotations
+
+import gzip
+from typing import Dict, Optional
+
+from fastapi import Request
+
+from .config import settings
+
+try:  # optional dependency
+    import brotli as _brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    try:
+        import brotlicffi as _brotli
+    except ImportError:
+        _brotli = None
+
+
+# Preferred first when the client rates them equally.
+SUPPORTED_ENCODINGS = ("br", "gzip") if _brotli is not None else ("gzip",)
+
+
+def _parse_accept_encoding(header: str) -> Dict[str, float]:
+    """{"gzip": 1.0, "br": 0.5, ...} from an Accept-Encoding header."""
+    weights: Dict[str, float] = {}
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name] = q
+    return weights
+
+
+def negotiate_encoding(request: Request) -> Optional[str]:
+    """
+    Pick the Content-Encoding to answer with ("br", "gzip"), or None for
+    the plain body.
+    """
+    if not settings.RESPONSE_COMPRESSION_ENABLED:
+        return None
+    header = request.headers.get("accept-encoding")
+    if not header:
+        return None
+
+    weights = _parse_accept_encoding(header)
+    wildcard = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        q = weights.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return _brotli.compress(data, quality=settings.RESPONSE_BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=settings.RESPONSE_GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Unsupported encoding: {encoding}")
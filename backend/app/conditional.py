@@ -0,0 +1,59 @@
+"""
+Conditional GET helpers (ETag / If-None-Match).
+
+Read routes send a strong ETag plus "Cache-Control: no-cache", so browsers
+keep the body and revalidate with If-None-Match on the next fetch(); when
+the tag still matches the route answers 304 with no body and skips
+building the payload.
+"""
+from __future__ import annotations
+
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response
+
+
+# Cache, but always check with us before reusing.
+CACHE_CONTROL = "no-cache"
+
+
+def etag_for_version(kind: str, version: int, encoding: Optional[str] = None) -> str:
+    """
+    ETag for a representation that only changes with a version number.
+
+    Compressed variants get their own tag ("state-7.gzip"): a strong ETag
+    names exact bytes.
+    """
+    if encoding:
+        return f'"{kind}-{version}.{encoding}"'
+    return f'"{kind}-{version}"'
+
+
+def etag_for_bytes(data: bytes) -> str:
+    """ETag from a hash of the response body."""
+    return '"' + hashlib.sha256(data).hexdigest()[:32] + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match already names this ETag."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison: ignore any W/ prefix.
+    target = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == target for tag in header.split(","))
+
+
+def set_cache_headers(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+
+
+def not_modified(etag: str) -> Response:
+    """An empty 304 carrying the current ETag."""
+    response = Response(status_code=304)
+    set_cache_headers(response, etag)
+    return response
@@ -50,6 +50,145 @@ class Settings(BaseSettings):
 
     # === Google Sheets API (for later Sheets integration) ===
     GOOGLE_SHEETS_API_KEY: Optional[str] = None
+    # Point this at a local stub (scripts/stub_sheets_server.py) to try
+    # imports without touching Google.
+    GOOGLE_SHEETS_API_BASE: str = "https://sheets.googleapis.com/v4"
+    # Workbook imports fetch all tabs with values:batchGet, this many tabs
+    # per request.
+    SHEETS_BATCH_GET_MAX_RANGES: int = 50
+
+    # === Library storage ===
+    # "json": data/library.json + journal + data/decks/ (default)
+    # "sqlite": data/library.sqlite3 (or LIBRARY_SQLITE_PATH). Migrate once
+    #           with `python -m app.stores.sqlite_store migrate`.
+    LIBRARY_BACKEND: str = "json"
+    LIBRARY_SQLITE_PATH: Optional[str] = None
+
+    # Keep the validated library index in memory and only re-read the store
+    # when it changes. Turn off to force a fresh read on every call (handy
+    # when hand-editing library.json while debugging).
+    LIBRARY_CACHE_ENABLED: bool = True
+
+    # Journaled mode: every mutation is appended to data/library.journal as
+    # one compact record instead of rewriting the whole library file. Once
+    # the journal holds this many records it is rolled into a fresh
+    # library.json snapshot in the background.
+    LIBRARY_JOURNAL_ENABLED: bool = True
+    LIBRARY_JOURNAL_COMPACT_EVERY: int = 500
+
+    # Deck cards live in data/decks/<deck_id>.json and are only read when a
+    # route needs them. At most this many cards are kept in memory.
+    LIBRARY_CARD_CACHE_MAX_CARDS: int = 50_000
+
+    # All library writes go through one writer thread. It waits this long
+    # for concurrent requests to join a burst, then commits them together
+    # with a single journal write.
+    LIBRARY_WRITER_GROUP_WINDOW_MS: float = 2.0
+
+    # On-disk format of the JSON store's index snapshot and deck card files:
+    # "json" (library.json, decks/<id>.json) or "binary" (library.tlib,
+    # decks/<id>.tcards; compressed, string table, no Pydantic validation on
+    # load). Either format is still read, files are rewritten in the chosen
+    # one as they change; convert everything at once with
+    # `python -m app.stores.binary_snapshot convert-store`.
+    LIBRARY_SNAPSHOT_FORMAT: str = "json"
+
+    # Change feed (GET /library/changes, /library/changes/stream): how many
+    # recent mutations are kept for clients catching up. Older "since"
+    # values get a reset (refetch everything) instead.
+    LIBRARY_CHANGELOG_SIZE: int = 1000
+    # How often open change streams check for writes made by other worker
+    # processes (our own writes are pushed immediately).
+    LIBRARY_CHANGES_POLL_SECONDS: float = 2.0
+
+    # === Deck source refresh (POST /library/decks/refresh-from-source) ===
+    # Sheets are fetched concurrently through one pooled HTTP client: at
+    # most LIBRARY_REFRESH_CONCURRENCY at a time, and a deck that takes
+    # longer than LIBRARY_REFRESH_DECK_TIMEOUT_SECONDS (fetch + parse) is
+    # reported as timed out instead of holding up the rest. Waiting for the
+    # rate limiter or a Retry-After below doesn't count against it.
+    LIBRARY_REFRESH_CONCURRENCY: int = 8
+    LIBRARY_REFRESH_DECK_TIMEOUT_SECONDS: float = 30.0
+    # The pooled client (services/http_client.py) is shared by every Sheets
+    # API and CSV fetch. HTTP/2 is used if the `h2` package is installed.
+    SOURCE_FETCH_TIMEOUT_SECONDS: float = 20.0
+    SOURCE_FETCH_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    SOURCE_FETCH_MAX_CONNECTIONS: int = 20
+    SOURCE_FETCH_HTTP2: bool = True
+    # Every outbound fetch first takes a token from one shared bucket,
+    # refilled at SOURCE_FETCH_RATE_PER_MINUTE (0 = unlimited) and holding
+    # at most SOURCE_FETCH_BURST, so a big workbook import or a full deck
+    # refresh slows down to the Sheets quota instead of tripping it.
+    SOURCE_FETCH_RATE_PER_MINUTE: float = 120.0
+    SOURCE_FETCH_BURST: int = 20
+    # 429 and 5xx answers (and connection errors) are retried up to
+    # SOURCE_FETCH_MAX_RETRIES times, waiting Retry-After if the server
+    # sends one, else SOURCE_FETCH_RETRY_BASE_SECONDS doubling per attempt
+    # (with jitter), never more than SOURCE_FETCH_RETRY_MAX_SECONDS. A 429
+    # also holds back every other request for that long.
+    SOURCE_FETCH_MAX_RETRIES: int = 4
+    SOURCE_FETCH_RETRY_BASE_SECONDS: float = 1.0
+    SOURCE_FETCH_RETRY_MAX_SECONDS: float = 60.0
+
+    # Sheet / CSV responses with an ETag or Last-Modified are kept in
+    # data/source_cache/ (at most SOURCE_CACHE_MAX_BYTES, least recently
+    # used dropped first) and revalidated with conditional requests; an
+    # unchanged source skips parsing and the library write.
+    SOURCE_CACHE_ENABLED: bool = True
+    SOURCE_CACHE_MAX_BYTES: int = 200 * 1024 * 1024
+
+    # === Library search and duplicates (/library/search, /library/duplicates) ===
+    # The in-memory word indexes are built on first use and then kept up to
+    # date deck by deck. Build them in the background at startup instead,
+    # so the first search / import doesn't wait for them.
+    CARD_INDEXES_WARM_ON_STARTUP: bool = True
+
+    # === Workbook auto-sync ===
+    # Registered workbooks are reloaded in the background once their
+    # last_synced is older than the interval (plus a per-workbook jitter of
+    # up to WORKBOOK_AUTOSYNC_JITTER_SECONDS, so they don't all come due
+    # together). Checked every WORKBOOK_AUTOSYNC_CHECK_SECONDS; at most
+    # WORKBOOK_AUTOSYNC_MAX_CONCURRENT sync at once. A workbook that fails
+    # is retried after WORKBOOK_AUTOSYNC_BACKOFF_SECONDS, doubling per
+    # failure up to WORKBOOK_AUTOSYNC_BACKOFF_MAX_SECONDS.
+    WORKBOOK_AUTOSYNC_ENABLED: bool = True
+    WORKBOOK_AUTOSYNC_INTERVAL_SECONDS: int = 30 * 60
+    WORKBOOK_AUTOSYNC_JITTER_SECONDS: int = 5 * 60
+    WORKBOOK_AUTOSYNC_CHECK_SECONDS: int = 60
+    WORKBOOK_AUTOSYNC_MAX_CONCURRENT: int = 1
+    WORKBOOK_AUTOSYNC_BACKOFF_SECONDS: int = 5 * 60
+    WORKBOOK_AUTOSYNC_BACKOFF_MAX_SECONDS: int = 6 * 60 * 60
+
+    # === Background jobs (GET /jobs/{id}) ===
+    # Workbook imports/reloads, deck imports and refreshes from source run
+    # as in-process jobs: at most JOBS_MAX_CONCURRENT at a time. Finished
+    # jobs stay readable for JOBS_KEEP_SECONDS (at most JOBS_KEEP_MAX).
+    JOBS_MAX_CONCURRENT: int = 2
+    JOBS_KEEP_SECONDS: int = 60 * 60
+    JOBS_KEEP_MAX: int = 200
+
+    # === Play sessions (/play/sessions) ===
+    # Sessions unused for this long are dropped; beyond PLAY_SESSION_MAX the
+    # least recently used go first. Merged card pools are cached for the
+    # PLAY_POOL_CACHE_SIZE most recently used deck selections.
+    # Sessions live in the memory of the worker process that created them:
+    # with several workers (uvicorn --workers N), the load balancer must
+    # route a session's requests to the same worker (sticky sessions), or
+    # they 404 whenever another worker answers.
+    PLAY_SESSION_IDLE_SECONDS: int = 6 * 60 * 60
+    PLAY_SESSION_MAX: int = 1000
+    PLAY_POOL_CACHE_SIZE: int = 16
+
+    # === Response compression ===
+    # gzip (and brotli, if the `brotli` package is installed) negotiated
+    # through Accept-Encoding. The library read routes compress each body
+    # once per library version and cache it, so the levels can be fairly
+    # high; other responses above RESPONSE_COMPRESS_MIN_BYTES are gzipped
+    # on the fly.
+    RESPONSE_COMPRESSION_ENABLED: bool = True
+    RESPONSE_GZIP_LEVEL: int = 6
+    RESPONSE_BROTLI_QUALITY: int = 6
+    RESPONSE_COMPRESS_MIN_BYTES: int = 1000
 
 
 settings = Settings()
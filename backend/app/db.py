@@ -1,65 +1,499 @@
 from __future__ import annotations
 
-import json
-from pathlib import Path
-from typing import Optional
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from .models import LibraryState, Deck
+from .compact_cards import CompactCard, to_taboo_cards
+from .config import settings
+from .library_ops import (
+    CategoryNotFoundError,
+    DeckNotFoundError,
+    LibraryError,
+    apply_record,
+    flatten_record,
+    record_deck_id,
+)
+from .models import Deck, DeckMeta, LibraryIndex, LibraryState, TabooCard
+from .stores import DATA_DIR, get_store
 
+__all__ = [
+    "DATA_DIR",
+    "LibraryError",
+    "DeckNotFoundError",
+    "CategoryNotFoundError",
+]
 
-DATA_DIR = Path(__file__).resolve().parent / "data"
-DATA_DIR.mkdir(parents=True, exist_ok=True)
 
-LIBRARY_FILE = DATA_DIR / "library.json"
+# ---------- In-process cache ----------
+#
+# Parsing + validating the whole library on every request is the expensive
+# part of every route, so we keep ONE validated LibraryIndex in memory.
+# The index is small (no cards), so metadata-only routes never touch cards.
+#
+# The cache is keyed by the store's stamp (file stamps for the JSON store,
+# the persisted version for SQLite), so edits made by another worker process
+# are still picked up, and it is refreshed directly by our own writes so
+# they never re-read.
+#
+# NOTE: load_index() hands out the cached instance itself. Treat it as
+# read-only and go through the mutation helpers below to change anything.
+# The writer never changes a handed-out index either: it applies a burst to
+# a copy and swaps the copy in, so a reader keeps a consistent snapshot.
 
+_cache_lock = threading.RLock()
+_cached_index: Optional[LibraryIndex] = None
+_cached_stamp: Any = None
 
-def _default_state() -> LibraryState:
-    """Return a fresh default library state."""
-    return LibraryState(categories=["Uncategorized"], decks=[])
+# Sequence number of the last mutation applied to the library. Persisted by
+# the store, so it is monotonic across restarts and shared by every process
+# using the same data.
+_library_version = 0
 
+# deck_id -> (card stamp, cards). Least recently used first. Cards are kept
+# as interned CompactCard tuples (see compact_cards.py), not TabooCards.
+_card_cache: "OrderedDict[str, Tuple[Any, List[CompactCard]]]" = OrderedDict()
+_card_cache_size = 0
+
+
+# ---------- Change log ----------
+#
+# The most recent committed records (seq, op, ...), oldest first, so clients
+# can ask "what changed since version N" instead of refetching everything.
+# Writes by other processes leave a gap here; changes_since() then falls
+# back to the store's own log (JSON journal / SQLite changes table).
+
+_changes: "deque[Dict[str, Any]]" = deque(maxlen=max(1, settings.LIBRARY_CHANGELOG_SIZE))
+
+# Called (from the writer thread) after every commit. Must be quick and
+# thread-safe, e.g. loop.call_soon_threadsafe(event.set).
+_change_listeners: List[Callable[[], None]] = []
+
+
+def add_change_listener(listener: Callable[[], None]) -> None:
+    _change_listeners.append(listener)
 
-def load_library() -> LibraryState:
-    """Load the library from disk, or return an empty default state."""
-    if not LIBRARY_FILE.exists():
-        return _default_state()
 
+def remove_change_listener(listener: Callable[[], None]) -> None:
     try:
-        raw = json.loads(LIBRARY_FILE.read_text(encoding="utf-8"))
-        return LibraryState.model_validate(raw)
-    except Exception:
-        # If file is corrupted, fall back to a clean state
-        return _default_state()
+        _change_listeners.remove(listener)
+    except ValueError:
+        pass
 
 
-def save_library(state: LibraryState) -> None:
-    """Persist the current library state to disk."""
-    payload = state.model_dump()
-    LIBRARY_FILE.write_text(
-        json.dumps(payload, indent=2, ensure_ascii=False),
-        encoding="utf-8",
+def _notify_change_listeners() -> None:
+    for listener in list(_change_listeners):
+        try:
+            listener()
+        except Exception as exc:
+            print("Library change listener failed:", exc)
+
+
+def _is_contiguous(records: List[Dict[str, Any]], since: int, version: int) -> bool:
+    """True if records are exactly seq since+1 .. version, in order."""
+    return [r.get("seq") for r in records] == list(range(since + 1, version + 1))
+
+
+def _forget_cards(deck_id: str) -> None:
+    global _card_cache_size
+    entry = _card_cache.pop(deck_id, None)
+    if entry is not None:
+        _card_cache_size -= len(entry[1])
+
+
+def _remember_cards(deck_id: str, stamp: Any, cards: List[CompactCard]) -> None:
+    """Cache a deck's cards, evicting least recently used decks over budget."""
+    global _card_cache_size
+    _forget_cards(deck_id)
+    _card_cache[deck_id] = (stamp, cards)
+    _card_cache_size += len(cards)
+    while _card_cache_size > settings.LIBRARY_CARD_CACHE_MAX_CARDS and len(_card_cache) > 1:
+        _, (_, evicted) = _card_cache.popitem(last=False)
+        _card_cache_size -= len(evicted)
+
+
+def _read_cards(deck_id: str) -> List[CompactCard]:
+    """Return a deck's cards from the LRU cache or the store."""
+    store = get_store()
+
+    if not settings.LIBRARY_CACHE_ENABLED:
+        return store.read_cards(deck_id)
+
+    stamp = store.card_stamp(deck_id)
+    with _cache_lock:
+        entry = _card_cache.get(deck_id)
+        if entry is not None and entry[0] == stamp:
+            _card_cache.move_to_end(deck_id)
+            return entry[1]
+
+    cards = store.read_cards(deck_id)
+    with _cache_lock:
+        _remember_cards(deck_id, stamp, cards)
+    return cards
+
+
+class _PendingWrite:
+    __slots__ = ("record", "cards", "future")
+
+    def __init__(self, record: Dict[str, Any], cards: Optional[List[TabooCard]]):
+        self.record = record
+        self.cards = cards
+        self.future: "Future[LibraryIndex]" = Future()
+
+
+# ---------- Serialized writer ----------
+#
+# Every mutation is queued and applied by ONE writer thread, in order, to
+# the current index. Whatever is waiting in the queue when the writer wakes
+# up is committed together: one store lock acquisition and one persist call
+# (one journal append + fsync, or one SQLite transaction) for the whole
+# burst ("group commit").
+#
+# Because the writer re-checks the store under its cross-process lock before
+# applying anything, a write from another worker process is loaded first and
+# never overwritten (no lost updates).
+
+_MAX_GROUP_SIZE = 256
+
+_write_queue: "queue.Queue[_PendingWrite]" = queue.Queue()
+_writer_thread: Optional[threading.Thread] = None
+_writer_start_lock = threading.Lock()
+
+
+def _ensure_writer() -> None:
+    global _writer_thread
+    with _writer_start_lock:
+        if _writer_thread is None or not _writer_thread.is_alive():
+            _writer_thread = threading.Thread(
+                target=_writer_loop, name="library-writer", daemon=True
+            )
+            _writer_thread.start()
+
+
+def _writer_loop() -> None:
+    while True:
+        batch = [_write_queue.get()]
+
+        # Give concurrent requests a moment to join this commit.
+        window = settings.LIBRARY_WRITER_GROUP_WINDOW_MS / 1000.0
+        deadline = time.monotonic() + window
+        while len(batch) < _MAX_GROUP_SIZE:
+            timeout = deadline - time.monotonic()
+            try:
+                if timeout > 0:
+                    batch.append(_write_queue.get(timeout=timeout))
+                else:
+                    batch.append(_write_queue.get_nowait())
+            except queue.Empty:
+                break
+
+        try:
+            _commit_group(batch)
+        except Exception as exc:
+            # Storage trouble: the cached index may be ahead of the store.
+            invalidate_library_cache()
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(exc)
+
+
+def _commit_group(batch: List[_PendingWrite]) -> None:
+    """
+    Apply a burst of queued mutations and persist them with a single write.
+
+    Each record succeeds or fails on its own (as if it had been a separate
+    request); rejected records are never persisted.
+    """
+    global _cached_index, _cached_stamp, _library_version
+
+    store = get_store()
+    with store.write_lock():
+        # Work on a copy: readers may be iterating the cached index right
+        # now, and must never see a half-applied burst. The copy is swapped
+        # in once it is durable.
+        with _cache_lock:
+            index = load_index().scratch_copy()
+            version = _library_version
+        accepted: List[Dict[str, Any]] = []
+        cards: Dict[str, List[TabooCard]] = {}
+        ok: List[_PendingWrite] = []
+
+        for item in batch:
+            try:
+                # apply_record() checks every precondition before touching
+                # the index, so a rejected record leaves it unchanged.
+                apply_record(index, item.record)
+            except LibraryError as exc:
+                item.future.set_exception(exc)
+                continue
+
+            version += 1
+            record = {"seq": version, **item.record}
+            if item.cards is not None:
+                cards[record_deck_id(record)] = item.cards
+            accepted.append(record)
+            ok.append(item)
+
+        if not accepted:
+            return
+
+        # The fsync happens here, without _cache_lock: reads keep being
+        # served from the previous index meanwhile.
+        store.persist(index, accepted, cards, version)
+
+        with _cache_lock:
+            for record in accepted:
+                for sub in flatten_record(record):
+                    deck_id = record_deck_id(sub)
+                    if deck_id is not None:
+                        _forget_cards(deck_id)
+
+            _library_version = version
+            _changes.extend(accepted)
+            if settings.LIBRARY_CACHE_ENABLED:
+                _cached_index = index
+                _cached_stamp = store.stamp()
+
+    store.after_commit()
+
+    for item in ok:
+        item.future.set_result(index)
+
+    _notify_change_listeners()
+
+
+def _commit(record: Dict[str, Any], cards: Optional[List[TabooCard]] = None) -> LibraryIndex:
+    """
+    Queue a mutation for the writer thread and wait until it is durable.
+
+    If `cards` is given they are persisted together with the record.
+    Raises LibraryError if the record was rejected.
+    """
+    _ensure_writer()
+    item = _PendingWrite(record, cards)
+    _write_queue.put(item)
+    return item.future.result()
+
+
+# ---------- Mutations ----------
+
+
+def add_category(name: str, position: Optional[int] = None) -> LibraryIndex:
+    """Add a category (no-op if it already exists)."""
+    return _commit({"op": "add_category", "name": name, "position": position})
+
+
+def delete_category(name: str) -> LibraryIndex:
+    """Delete a category, moving its decks back to 'Uncategorized'."""
+    return _commit({"op": "delete_category", "name": name})
+
+
+def move_deck(deck_id: str, category: str) -> LibraryIndex:
+    """Move a deck into an existing category."""
+    return _commit({"op": "move_deck", "deck_id": deck_id, "category": category})
+
+
+def upsert_deck(deck: Deck) -> LibraryIndex:
+    """Insert or replace a deck (metadata + cards) and return the updated index."""
+    meta = deck.model_dump(exclude={"cards"})
+    return _commit({"op": "upsert_deck", "deck": meta}, cards=deck.cards)
+
+
+def replace_deck_cards(
+    deck_id: str,
+    cards: List[TabooCard],
+    taboo_words_per_card: Optional[int] = None,
+) -> LibraryIndex:
+    """Replace a deck's cards while keeping its id/category/etc."""
+    return _commit(
+        {
+            "op": "replace_cards",
+            "deck_id": deck_id,
+            "card_count": len(cards),
+            "taboo_words_per_card": taboo_words_per_card,
+        },
+        cards=cards,
     )
 
 
-def upsert_deck(deck: Deck) -> LibraryState:
-    """Insert or replace a deck, then save and return the updated state."""
-    state = load_library()
-    existing_idx: Optional[int] = None
-    for idx, d in enumerate(state.decks):
-        if d.id == deck.id:
-            existing_idx = idx
-            break
+def delete_deck(deck_id: str, missing_ok: bool = True) -> LibraryIndex:
+    """Delete a deck. Raises DeckNotFoundError unless missing_ok."""
+    return _commit({"op": "delete_deck", "deck_id": deck_id, "missing_ok": missing_ok})
+
+
+def apply_batch(ops: List[Dict[str, Any]]) -> LibraryIndex:
+    """
+    Apply an ordered list of operations as one atomic mutation.
+
+    Each op is a plain record ({"op": "move_deck", "deck_id": ..., ...};
+    see library_ops.BATCH_OPS). Either all of them are applied -- one
+    version bump, one write -- or none: raises the LibraryError of the
+    first operation that doesn't fit the state left by the ones before it.
+    """
+    return _commit({"op": "batch", "ops": ops})
+
+
+def compact_store() -> None:
+    """Compact the store now (JSON: roll the journal into a snapshot)."""
+    get_store().compact()
+
+
+# ---------- Loading ----------
+
+
+def get_library_version() -> int:
+    """Return the sequence number of the last applied mutation."""
+    load_index()  # make sure we've seen writes from other processes
+    return _library_version
+
+
+def changes_since(since: int) -> Tuple[Optional[List[Dict[str, Any]]], int]:
+    """
+    Return (records committed after version `since`, current version).
+
+    Records come back in seq order. If they are no longer available (too
+    old, or `since` is not a version this library ever had) the list is
+    None: the caller should reload everything and continue from the
+    returned version.
+    """
+    with _cache_lock:
+        load_index()  # pick up writes from other processes
+        version = _library_version
+        if since == version:
+            return [], version
+        if since < 0 or since > version:
+            return None, version
+        records = [r for r in _changes if r["seq"] > since]
+
+    if _is_contiguous(records, since, version):
+        return records, version
+
+    stored = get_store().read_changes(since)
+    if stored is not None:
+        stored = [r for r in stored if r["seq"] <= version]
+        if _is_contiguous(stored, since, version):
+            return stored, version
+    return None, version
 
-    if existing_idx is None:
-        state.decks.append(deck)
-    else:
-        state.decks[existing_idx] = deck
 
-    save_library(state)
-    return state
+def invalidate_library_cache() -> None:
+    """Drop the cached index and cards so the next load re-reads the store."""
+    global _cached_index, _cached_stamp, _card_cache_size
+    with _cache_lock:
+        _cached_index = None
+        _cached_stamp = None
+        _card_cache.clear()
+        _card_cache_size = 0
+
+
+def load_index() -> LibraryIndex:
+    """
+    Return categories + deck metadata (no cards).
+
+    Served from the in-process cache while the store is unchanged;
+    otherwise re-read (JSON: snapshot plus a replay of the journal).
+    """
+    global _cached_index, _cached_stamp, _library_version
+
+    store = get_store()
+    with _cache_lock:
+        stamp = store.stamp()
+        if (
+            settings.LIBRARY_CACHE_ENABLED
+            and _cached_index is not None
+            and stamp == _cached_stamp
+        ):
+            return _cached_index
+
+        index, version = store.read_index()
+        _library_version = version
+        if settings.LIBRARY_CACHE_ENABLED:
+            _cached_index = index
+            # Re-read: loading may itself have touched the store (e.g. the
+            # one-time inline-cards migration of an old library.json).
+            _cached_stamp = store.stamp()
+        return index
+
+
+def load_index_and_version() -> Tuple[LibraryIndex, int]:
+    """load_index() plus the version it corresponds to, read together."""
+    with _cache_lock:
+        index = load_index()
+        return index, _library_version
+
+
+def get_deck_meta(deck_id: str) -> DeckMeta:
+    """Return one deck's metadata. Raises DeckNotFoundError."""
+    deck = load_index().get_deck(deck_id)
+    if deck is None:
+        raise DeckNotFoundError("Deck not found.")
+    return deck
+
+
+def load_deck_cards(deck_id: str) -> List[CompactCard]:
+    """
+    Return one deck's cards (compact form), reading them from the store only
+    on a cache miss.
+
+    The returned list is shared with the cache; don't mutate it. Use
+    load_deck() / load_library() when you need Pydantic models for a
+    response.
+    """
+    get_deck_meta(deck_id)  # only hand out cards for decks in the index
+    return _read_cards(deck_id)
+
+
+def load_deck(deck_id: str) -> Deck:
+    """Return one fully hydrated deck. Raises DeckNotFoundError."""
+    meta = get_deck_meta(deck_id)
+    return Deck.model_construct(**dict(meta), cards=to_taboo_cards(_read_cards(deck_id)))
+
+
+def load_library() -> LibraryState:
+    """
+    Return the whole library with every deck's cards hydrated.
+
+    Only routes that really need every card (e.g. the Play tab payload)
+    should call this; everything else should use load_index(). Cards are
+    converted from their compact form here, on the way out.
+    """
+    index = load_index()
+    decks = [
+        Deck.model_construct(**dict(meta), cards=to_taboo_cards(_read_cards(meta.id)))
+        for meta in list(index.decks)
+    ]
+    return LibraryState.model_construct(categories=list(index.categories), decks=decks)
+
+
+def save_library(state: LibraryState) -> None:
+    """
+    Persist a whole library state (cards included), replacing everything.
+
+    Prefer the mutation helpers above; this is the bulk "replace everything"
+    path.
+    """
+    global _cached_index, _cached_stamp, _library_version, _card_cache_size
+
+    index = LibraryIndex(
+        categories=list(state.categories),
+        decks=[DeckMeta.model_validate(d.model_dump(exclude={"cards"})) for d in state.decks],
+    )
+    cards = {d.id: d.cards for d in state.decks}
 
+    store = get_store()
+    with store.write_lock(), _cache_lock:
+        load_index()  # pick up the latest version from the store first
+        version = _library_version + 1
+        store.save_all(index, cards, version)
+        _library_version = version
+        _changes.append({"seq": version, "op": "replace_library"})
+        _card_cache.clear()
+        _card_cache_size = 0
+        if settings.LIBRARY_CACHE_ENABLED:
+            _cached_index = index
+            _cached_stamp = store.stamp()
 
-def delete_deck(deck_id: str) -> LibraryState:
-    state = load_library()
-    state.decks = [d for d in state.decks if d.id != deck_id]
-    save_library(state)
-    return state
+    _notify_change_listeners()
@@ -0,0 +1,292 @@
+"""
+Cross-deck duplicate detection (GET /library/duplicates,
+POST /library/duplicates/check, and the import jobs' "duplicates" report).
+
+Every goal word in the library is hashed under two keys:
+
+  exact key   normalized (NFKC + casefold) with whitespace collapsed:
+              "Ice  Cream" == "ice cream"
+  near key    the exact key without punctuation or accents and with each
+              word made singular: "Ice-Creams!" ~ "ice cream",
+              "Crème brûlée" ~ "creme brulee"
+
+The index maps near key -> {deck_id: [card index, ...]}; cards sharing a
+near key are duplicates, "exact" if their exact keys match too, "near"
+otherwise. Keys with more than one card are tracked as they come and go,
+so listing every duplicate group only visits the groups, and checking new
+words before an import is one dict lookup per word.
+
+Like the search index it follows the change feed (card_index.CardIndex):
+an import or refresh costs O(cards in the changed decks), never a rescan.
+"""
+from __future__ import annotations
+
+import unicodedata
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from . import db
+from .card_index import CardIndex, normalize, tokenize
+from .compact_cards import CompactCard
+
+
+# Matches listed per word by check_words(), and words listed in an import
+# report (the counts always cover everything).
+MAX_MATCHES_PER_WORD = 20
+MAX_REPORT_EXAMPLES = 20
+
+
+@lru_cache(maxsize=1 << 16)
+def exact_key(word: str) -> str:
+    return " ".join(normalize(word).split())
+
+
+def _singular(token: str) -> str:
+    """Crude English singular: cherries -> cherry, boxes -> box, cats -> cat."""
+    if len(token) <= 3 or not token.isalpha():
+        return token
+    if token.endswith("ies"):
+        return token[:-3] + "y"
+    if token.endswith(("sses", "shes", "ches", "xes", "zes")):
+        return token[:-2]
+    if token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+
+@lru_cache(maxsize=1 << 16)
+def near_key(word: str) -> str:
+    text = normalize(word)
+    if not text.isascii():
+        decomposed = unicodedata.normalize("NFKD", text)
+        text = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    # Punctuation drops out between the word tokens ("_" too, which the
+    # tokenizer would otherwise keep as a letter).
+    return " ".join(_singular(t) for t in tokenize(text.replace("_", " ")))
+
+
+class DuplicateIndex(CardIndex):
+    def __init__(self) -> None:
+        super().__init__()
+        self._groups: Dict[str, Dict[str, List[int]]] = {}  # near key -> deck -> card indices
+        self._sizes: Dict[str, int] = {}  # near key -> number of cards
+        self._multi: Set[str] = set()  # near keys shared by 2+ cards
+        self._deck_keys: Dict[str, List[str]] = {}  # deck -> near key of each card
+        self._deck_cards: Dict[str, List[CompactCard]] = {}
+
+    # ----- CardIndex hooks -----
+
+    def _clear(self) -> None:
+        self._groups.clear()
+        self._sizes.clear()
+        self._multi.clear()
+        self._deck_keys.clear()
+        self._deck_cards.clear()
+
+    def _add_deck(self, deck_id: str, cards: List[CompactCard]) -> None:
+        keys = [near_key(card.word) for card in cards]
+        groups, sizes = self._groups, self._sizes
+        for i, key in enumerate(keys):
+            if not key:
+                continue  # no letters or digits at all
+            by_deck = groups.get(key)
+            if by_deck is None:
+                groups[key] = {deck_id: [i]}
+                sizes[key] = 1
+                continue
+            by_deck.setdefault(deck_id, []).append(i)
+            sizes[key] += 1
+            if sizes[key] == 2:
+                self._multi.add(key)
+        self._deck_keys[deck_id] = keys
+        self._deck_cards[deck_id] = cards
+
+    def _remove_deck(self, deck_id: str) -> None:
+        keys = self._deck_keys.pop(deck_id, None)
+        if keys is None:
+            return
+        self._deck_cards.pop(deck_id, None)
+        groups, sizes = self._groups, self._sizes
+        for key in set(keys):
+            by_deck = groups.get(key)
+            if by_deck is None:
+                continue
+            removed = by_deck.pop(deck_id, None)
+            if removed is None:
+                continue
+            sizes[key] -= len(removed)
+            if sizes[key] < 2:
+                self._multi.discard(key)
+            if not by_deck:
+                del groups[key]
+                del sizes[key]
+
+    # ----- queries -----
+
+    def _card(self, deck_id: str, i: int, kind: Optional[str] = None) -> Dict[str, Any]:
+        entry = {"deck_id": deck_id, "card_index": i, "word": self._deck_cards[deck_id][i].word}
+        if kind is not None:
+            entry["kind"] = kind
+        return entry
+
+    def check_words(self, words: Iterable[str], exclude_deck_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        For each word that already exists in the library (outside
+        `exclude_deck_id`), the cards it duplicates: {version, items:
+        [{word, matches: [{deck_id, card_index, word, kind}]}]}.
+        """
+        version = self.sync()
+        items = []
+        with self._lock:
+            for word in words:
+                by_deck = self._groups.get(near_key(word))
+                if not by_deck:
+                    continue
+                exact = exact_key(word)
+                matches = []
+                for deck_id, indices in by_deck.items():
+                    if deck_id == exclude_deck_id:
+                        continue
+                    cards = self._deck_cards[deck_id]
+                    for i in indices:
+                        kind = "exact" if exact_key(cards[i].word) == exact else "near"
+                        matches.append(self._card(deck_id, i, kind))
+                if matches:
+                    # Exact matches first.
+                    matches.sort(key=lambda m: m["kind"] != "exact")
+                    items.append({"word": word, "matches": matches[:MAX_MATCHES_PER_WORD]})
+        return {"version": version, "items": items}
+
+    def groups(
+        self,
+        deck_ids: Optional[Set[str]] = None,
+        near: bool = True,
+        cross_deck: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        Every set of cards sharing a word: {version, groups: [{key, kind,
+        cards: [{deck_id, card_index, word}]}]}. With near=False only
+        exact duplicates count; with cross_deck, repeats within a single
+        deck are left out. With `deck_ids`, only groups involving one of
+        those decks.
+        """
+        version = self.sync()
+        found = []
+        with self._lock:
+            for key in self._multi:
+                by_deck = self._groups[key]
+                if deck_ids is not None and deck_ids.isdisjoint(by_deck):
+                    continue
+                if cross_deck and len(by_deck) < 2:
+                    continue
+                members = [(d, i) for d, indices in by_deck.items() for i in indices]
+                if near:
+                    subgroups = [members]
+                else:
+                    by_exact: Dict[str, list] = {}
+                    for d, i in members:
+                        by_exact.setdefault(exact_key(self._deck_cards[d][i].word), []).append((d, i))
+                    subgroups = list(by_exact.values())
+
+                for sub in subgroups:
+                    if len(sub) < 2:
+                        continue
+                    if cross_deck and len({d for d, _ in sub}) < 2:
+                        continue
+                    if deck_ids is not None and not any(d in deck_ids for d, _ in sub):
+                        continue
+                    words = {exact_key(self._deck_cards[d][i].word) for d, i in sub}
+                    found.append({
+                        "key": key,
+                        "kind": "exact" if len(words) == 1 else "near",
+                        "cards": [self._card(d, i) for d, i in sub],
+                    })
+        found.sort(key=lambda g: (-len(g["cards"]), g["key"]))
+        return {"version": version, "groups": found}
+
+
+_index = DuplicateIndex()
+
+
+def _name_decks(cards: Iterable[Dict[str, Any]]) -> None:
+    """Add each entry's current deck name."""
+    index = db.load_index()
+    for card in cards:
+        meta = index.get_deck(card["deck_id"])
+        card["deck_name"] = meta.name if meta is not None else None
+
+
+def check_words(words: Iterable[str], exclude_deck_id: Optional[str] = None) -> Dict[str, Any]:
+    """Which of `words` already exist in the library (see DuplicateIndex.check_words)."""
+    result = _index.check_words(words, exclude_deck_id)
+    _name_decks(m for item in result["items"] for m in item["matches"])
+    return result
+
+
+def find_duplicates(
+    deck_ids: Optional[Iterable[str]] = None,
+    category: Optional[str] = None,
+    near: bool = True,
+    cross_deck: bool = True,
+    limit: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Duplicate groups across the library (or involving `deck_ids` / decks
+    in `category`), largest first. Raises CategoryNotFoundError.
+    """
+    wanted = set(deck_ids) if deck_ids is not None else None
+    if category is not None:
+        index = db.load_index()
+        if not index.has_category(category):
+            raise db.CategoryNotFoundError("Category not found.")
+        in_category = set(index.deck_ids_in_category(category))
+        wanted = in_category if wanted is None else wanted & in_category
+
+    result = _index.groups(wanted, near=near, cross_deck=cross_deck)
+    result["total"] = len(result["groups"])
+    if limit is not None:
+        result["groups"] = result["groups"][:limit]
+    _name_decks(c for group in result["groups"] for c in group["cards"])
+    return result
+
+
+def duplicate_report(
+    words: Iterable[str],
+    exclude_deck_id: Optional[str] = None,
+    examples: int = MAX_REPORT_EXAMPLES,
+) -> Dict[str, Any]:
+    """
+    Short summary for an import: how many of the new words already exist
+    elsewhere ({cards, exact, near}) plus the first few as examples.
+    """
+    items = check_words(words, exclude_deck_id)["items"]
+    exact = sum(1 for item in items if item["matches"][0]["kind"] == "exact")
+    return {
+        "cards": len(items),
+        "exact": exact,
+        "near": len(items) - exact,
+        "examples": items[:examples],
+    }
+
+
+def merge_reports(reports: Iterable[Dict[str, Any]], examples: int = MAX_REPORT_EXAMPLES) -> Dict[str, Any]:
+    """Add up several duplicate_report()s (e.g. one per workbook tab)."""
+    total: Dict[str, Any] = {"cards": 0, "exact": 0, "near": 0, "examples": []}
+    for report in reports:
+        for field in ("cards", "exact", "near"):
+            total[field] += report[field]
+        total["examples"].extend(report["examples"][: examples - len(total["examples"])])
+    return total
+
+
+def warm_duplicate_index() -> None:
+    """Build the index ahead of the first use (run in a background thread)."""
+    try:
+        _index.sync()
+    except Exception as exc:
+        print("Duplicate index warm-up failed:", exc)
+
+
+def reset_duplicate_index() -> None:
+    """Drop the index; the next use rebuilds it."""
+    _index.reset()
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+from .models import DeckMeta, LibraryIndex
+
+
+class LibraryError(Exception):
+    """A library mutation was rejected (bad input for the current state)."""
+    pass
+
+
+class DeckNotFoundError(LibraryError):
+    """The referenced deck id does not exist."""
+    pass
+
+
+class CategoryNotFoundError(LibraryError):
+    """The referenced category does not exist."""
+    pass
+
+
+# Operations allowed inside a "batch" record: metadata only (no cards
+# travel with a batch) and no nesting.
+BATCH_OPS = frozenset(
+    {"add_category", "delete_category", "move_deck", "delete_deck", "rename_deck"}
+)
+
+
+def apply_record(index: LibraryIndex, record: Dict[str, Any]) -> None:
+    """
+    Apply one mutation record to an index in place.
+
+    This is the single definition of what each library operation means; it
+    is used for live writes and for journal replay, whichever store backend
+    is active. Records only carry deck metadata -- cards are persisted by
+    the store alongside the record.
+
+    Every precondition is checked before anything is touched, so a rejected
+    record (LibraryError) leaves the index unchanged. Lookups go through the
+    index's id/category tables, so each record costs O(1) (deleting a
+    category: O(decks in it)).
+
+    A "batch" record carries an ordered list of records under "ops" and is
+    all-or-nothing: the operations are first tried on a scratch copy of the
+    index (O(decks)), and only applied for real once all of them passed.
+    """
+    op = record["op"]
+
+    if op == "add_category":
+        index.add_category(record["name"], record.get("position"))
+
+    elif op == "delete_category":
+        name = record["name"]
+        if name == "Uncategorized":
+            raise LibraryError("Cannot delete the 'Uncategorized' category.")
+        if not index.has_category(name):
+            raise CategoryNotFoundError("Category not found.")
+        # Move decks back to 'Uncategorized'
+        index.add_category("Uncategorized")
+        index.remove_category(name, fallback="Uncategorized")
+
+    elif op == "move_deck":
+        category = record["category"]
+        if not index.has_category(category):
+            raise LibraryError("Target category does not exist.")
+        deck = index.get_deck(record["deck_id"])
+        if deck is None:
+            raise DeckNotFoundError("Deck not found.")
+        index.move_deck(deck, category)
+
+    elif op == "upsert_deck":
+        deck = DeckMeta.model_validate(record["deck"])
+        index.add_category(deck.category)
+        index.put_deck(deck)
+
+    elif op == "replace_cards":
+        deck = index.get_deck(record["deck_id"])
+        if deck is None:
+            raise DeckNotFoundError("Deck not found.")
+        deck.card_count = record["card_count"]
+        if record.get("taboo_words_per_card"):
+            deck.taboo_words_per_card = record["taboo_words_per_card"]
+
+    elif op == "delete_deck":
+        removed = index.remove_deck(record["deck_id"])
+        if not removed and not record.get("missing_ok", True):
+            raise DeckNotFoundError("Deck not found.")
+
+    elif op == "rename_deck":
+        name = record["name"].strip()
+        if not name:
+            raise LibraryError("Deck name cannot be empty.")
+        deck = index.get_deck(record["deck_id"])
+        if deck is None:
+            raise DeckNotFoundError("Deck not found.")
+        index.rename_deck(deck, name)
+
+    elif op == "batch":
+        ops = record["ops"]
+        scratch = index.scratch_copy()
+        for number, sub in enumerate(ops, 1):
+            try:
+                if sub.get("op") not in BATCH_OPS:
+                    raise LibraryError(f"Not allowed in a batch: {sub.get('op')!r}")
+                apply_record(scratch, sub)
+            except LibraryError as exc:
+                # Same error type (so a missing deck is still a 404), but
+                # say which operation it was.
+                raise type(exc)(f"Operation {number} ({sub.get('op')}): {exc}") from exc
+        for sub in ops:
+            apply_record(index, sub)
+
+    else:
+        raise LibraryError(f"Unknown library operation: {op!r}")
+
+
+def flatten_record(record: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """The plain records a record stands for (a batch's operations, in order)."""
+    if record["op"] == "batch":
+        return list(record["ops"])
+    return [record]
+
+
+def record_deck_id(record: Dict[str, Any]) -> Optional[str]:
+    """Return the id of the deck a record touches, if any."""
+    if "deck_id" in record:
+        return record["deck_id"]
+    if "deck" in record:
+        return record["deck"]["id"]
+    return None
@@ -1,10 +1,18 @@
+import threading
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 
-from .api import auth, health, library, workbooks
+from .api import auth, health, jobs, library, play, workbooks
 from .auth_repository import ensure_default_roles
 from .mongo_client import ping_mongo
 from .config import settings
+from .duplicate_index import warm_duplicate_index
+from .search_index import warm_search_index
+from .services import jobs as job_runner
+from .services import workbook_autosync
+from .services.http_client import close_http_client
 
 
 app = FastAPI(title="Taboo Staff Backend")
@@ -18,6 +26,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# gzip everything else that's big enough. The library read routes compress
+# (and cache) their own bodies -- see compression.py -- and the middleware
+# leaves responses that already have a Content-Encoding alone.
+if settings.RESPONSE_COMPRESSION_ENABLED:
+    app.add_middleware(
+        GZipMiddleware,
+        minimum_size=settings.RESPONSE_COMPRESS_MIN_BYTES,
+        compresslevel=settings.RESPONSE_GZIP_LEVEL,
+    )
+
 
 def _mask_mongo_uri(uri: str) -> str:
     """
@@ -39,6 +57,11 @@ def _mask_mongo_uri(uri: str) -> str:
         return uri
 
 
+def _warm_card_indexes() -> None:
+    warm_search_index()
+    warm_duplicate_index()
+
+
 @app.on_event("startup")
 def startup_event():
     """
@@ -46,7 +69,11 @@ def startup_event():
       - Load & print effective configuration values
       - Ping MongoDB to confirm connectivity
       - Seed initial staff/admin roles *only if ping succeeds*
+      - Build the library search / duplicate indexes in the background
     """
+    if settings.CARD_INDEXES_WARM_ON_STARTUP:
+        threading.Thread(target=_warm_card_indexes, name="card-index-warmup", daemon=True).start()
+
     print("=== Backend Startup: Initializing MongoDB ===")
 
     # Debug log: show effective URI (masked)
@@ -65,6 +92,23 @@ def startup_event():
     print("=== Backend Startup Complete ===")
 
 
+@app.on_event("startup")
+async def start_background_tasks():
+    """Start the workbook auto-sync scheduler (needs the running event loop)."""
+    workbook_autosync.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """
+    Stop the auto-sync scheduler, cancel unfinished background jobs, then
+    close the pooled HTTP client.
+    """
+    await workbook_autosync.stop()
+    await job_runner.shutdown()
+    await close_http_client()
+
+
 @app.get("/")
 async def root():
     return {"message": "Backend running"}
@@ -74,4 +118,6 @@ async def root():
 app.include_router(health.router)
 app.include_router(auth.router)
 app.include_router(library.router)
+app.include_router(play.router)
 app.include_router(workbooks.router)
+app.include_router(jobs.router)
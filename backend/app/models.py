@@ -1,8 +1,8 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
 from bson import ObjectId
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 
 class TabooCard(BaseModel):
@@ -10,7 +10,8 @@ class TabooCard(BaseModel):
     taboo: List[str]
 
 
-class Deck(BaseModel):
+class DeckMeta(BaseModel):
+    """Everything about a deck except its cards (what the library index holds)."""
     id: str
     name: str
     category: str  # e.g. "Uncategorized", "Family", etc.
@@ -22,10 +23,140 @@ class Deck(BaseModel):
     # This drives the CSV parser when refreshing from source.
     taboo_words_per_card: int = 4
 
+
+class Deck(DeckMeta):
     # Stored cards (no image field anymore)
     cards: List[TabooCard] = Field(default_factory=list)
 
 
+class _IndexTables:
+    """Lookup tables kept next to a LibraryIndex's lists."""
+    __slots__ = ("decks_by_id", "category_decks", "category_set", "deck_positions")
+
+    def __init__(self, categories: List[str], decks: List[DeckMeta]):
+        self.decks_by_id: Dict[str, DeckMeta] = {}
+        self.category_decks: Dict[str, Dict[str, None]] = {c: {} for c in categories}
+        self.category_set: Dict[str, None] = dict.fromkeys(categories)
+        # deck id -> position in `decks`; dropped after a removal shifts the
+        # list and rebuilt the next time a removal needs it.
+        self.deck_positions: Optional[Dict[str, int]] = None
+        for deck in decks:
+            self.decks_by_id[deck.id] = deck
+            self.category_decks.setdefault(deck.category, {})[deck.id] = None
+
+
+class LibraryIndex(BaseModel):
+    """
+    Categories + deck metadata only; cards are stored per deck.
+
+    Alongside the two lists it keeps lookup tables, built on first use and
+    then kept in step by the methods below:
+
+        deck id  -> DeckMeta
+        category -> ids of the decks in it (a dict used as a set)
+        ordered category set (for O(1) "does it exist")
+
+    Change the index through these methods (library_ops.apply_record does),
+    not by editing `categories` / `decks` directly, or the tables go stale.
+    """
+    categories: List[str]
+    decks: List[DeckMeta]
+
+    _tables: Optional[_IndexTables] = PrivateAttr(default=None)
+
+    def _get_tables(self) -> _IndexTables:
+        # Read the private slot directly: pydantic's attribute hook for
+        # private attributes costs more than the lookups themselves.
+        tables = self.__pydantic_private__.get("_tables")
+        if tables is None:
+            tables = _IndexTables(self.categories, self.decks)
+            self._tables = tables
+        return tables
+
+    # ---- lookups ----
+
+    def get_deck(self, deck_id: str) -> Optional[DeckMeta]:
+        return self._get_tables().decks_by_id.get(deck_id)
+
+    def has_category(self, name: str) -> bool:
+        return name in self._get_tables().category_set
+
+    def deck_ids_in_category(self, name: str) -> List[str]:
+        """Ids of the decks in a category (not in `decks` order)."""
+        return list(self._get_tables().category_decks.get(name, ()))
+
+    # ---- mutations ----
+
+    def add_category(self, name: str, position: Optional[int] = None) -> bool:
+        """Add a category; False if it already exists."""
+        t = self._get_tables()
+        if name in t.category_set:
+            return False
+        if position is None:
+            self.categories.append(name)
+            t.category_set[name] = None
+        else:
+            # Rare (only "put Uncategorized back in front").
+            self.categories.insert(position, name)
+            t.category_set = dict.fromkeys(self.categories)
+        t.category_decks.setdefault(name, {})
+        return True
+
+    def remove_category(self, name: str, fallback: str) -> None:
+        """Remove a category, moving its decks into `fallback`."""
+        t = self._get_tables()
+        for deck_id in list(t.category_decks.get(name, ())):
+            self.move_deck(t.decks_by_id[deck_id], fallback)
+        t.category_decks.pop(name, None)
+        t.category_set.pop(name, None)
+        self.categories.remove(name)
+
+    def move_deck(self, deck: DeckMeta, category: str) -> None:
+        t = self._get_tables()
+        t.category_decks.get(deck.category, {}).pop(deck.id, None)
+        t.category_decks.setdefault(category, {})[deck.id] = None
+        deck.category = category
+
+    def put_deck(self, deck: DeckMeta) -> None:
+        """Insert a deck, or update the existing one with that id in place."""
+        t = self._get_tables()
+        existing = t.decks_by_id.get(deck.id)
+        if existing is None:
+            if t.deck_positions is not None:
+                t.deck_positions[deck.id] = len(self.decks)
+            self.decks.append(deck)
+            t.decks_by_id[deck.id] = deck
+            t.category_decks.setdefault(deck.category, {})[deck.id] = None
+            return
+        if existing.category != deck.category:
+            self.move_deck(existing, deck.category)
+        for field in DeckMeta.model_fields:
+            setattr(existing, field, getattr(deck, field))
+
+    def rename_deck(self, deck: DeckMeta, name: str) -> None:
+        deck.name = name
+
+    def scratch_copy(self) -> "LibraryIndex":
+        """An independent copy (deck metas copied too) to try changes on."""
+        return LibraryIndex.model_construct(
+            categories=list(self.categories),
+            decks=[d.model_copy() for d in self.decks],
+        )
+
+    def remove_deck(self, deck_id: str) -> bool:
+        """Remove a deck; False if there is no deck with that id."""
+        t = self._get_tables()
+        deck = t.decks_by_id.pop(deck_id, None)
+        if deck is None:
+            return False
+        t.category_decks.get(deck.category, {}).pop(deck_id, None)
+        if t.deck_positions is None:
+            t.deck_positions = {d.id: i for i, d in enumerate(self.decks)}
+        del self.decks[t.deck_positions[deck_id]]
+        t.deck_positions = None
+        return True
+
+
 class LibraryState(BaseModel):
     categories: List[str]
     decks: List[Deck]
@@ -0,0 +1,195 @@
+"""
+Pre-serialized library responses.
+
+Returning a LibraryStateOut through response_model makes FastAPI validate
+and serialize every Deck and TabooCard again on each request, which is most
+of the CPU a decks-state call costs. Instead the JSON body is built once per
+library version -- straight from the cached DeckMetas and CompactCards, no
+Pydantic models for the cards -- and routes hand the bytes out as a raw
+Response.
+
+Entries are keyed by (kind, library version), so a body can never outlive
+the state it was built from, and the whole cache is dropped as soon as a
+commit lands (db change listener). Each deck's "cards" JSON is kept too,
+for as long as the card cache holds on to the same card list, so a
+mutation that doesn't touch cards (move, rename, add category) only
+re-serializes deck metadata.
+
+The bytes are exactly what response_model would have produced (same field
+order, compact separators, non-ASCII kept). Compressed variants (gzip / br,
+see compression.py) are cached next to the plain body under the same
+version, so a payload is compressed once, not once per request.
+"""
+from __future__ import annotations
+
+import json
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import Request, Response
+
+from . import db
+from .compact_cards import CompactCard
+from .compression import compress, negotiate_encoding
+
+
+_dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+_lock = threading.Lock()
+# kind -> (version, body); one entry per kind is all we ever serve.
+_bodies: Dict[str, Tuple[int, bytes]] = {}
+# (kind, content encoding) -> (version, compressed body)
+_encoded: Dict[Tuple[str, str], Tuple[int, bytes]] = {}
+# deck id -> (the card list it was built from, its JSON)
+_card_json: Dict[str, Tuple[List[CompactCard], str]] = {}
+
+# Only one thread builds a given kind at a time; the others wait for it
+# and reuse the result.
+_build_locks: Dict[str, threading.Lock] = {"state": threading.Lock(), "summary": threading.Lock()}
+_compress_locks: Dict[Tuple[str, str], threading.Lock] = {}
+
+
+def _clear_bodies() -> None:
+    with _lock:
+        _bodies.clear()
+        _encoded.clear()
+
+
+db.add_change_listener(_clear_bodies)
+
+
+def invalidate() -> None:
+    """Forget every cached body and card fragment."""
+    with _lock:
+        _bodies.clear()
+        _encoded.clear()
+        _card_json.clear()
+
+
+def _cards_json(deck_id: str, cards: List[CompactCard], previous: Dict) -> str:
+    hit = previous.get(deck_id)
+    if hit is not None and hit[0] is cards:
+        return hit[1]
+    return _dumps([{"word": c.word, "taboo": list(c.taboo)} for c in cards])
+
+
+def _build_state() -> Tuple[bytes, int]:
+    index, version = db.load_index_and_version()
+    with _lock:
+        previous = dict(_card_json)
+
+    fragments: Dict[str, Tuple[List[CompactCard], str]] = {}
+    parts: List[str] = []
+    for meta in list(index.decks):
+        try:
+            cards = db.load_deck_cards(meta.id)
+        except db.DeckNotFoundError:
+            continue  # deleted while we were building; the version moved on
+        cards_json = _cards_json(meta.id, cards, previous)
+        fragments[meta.id] = (cards, cards_json)
+        meta_json = _dumps(meta.model_dump(mode="json"))
+        parts.append(meta_json[:-1] + ',"cards":' + cards_json + "}")
+
+    body = (
+        '{"categories":' + _dumps(list(index.categories))
+        + ',"decks":[' + ",".join(parts) + "]}"
+    ).encode()
+
+    with _lock:
+        _card_json.clear()
+        _card_json.update(fragments)
+    return body, version
+
+
+def _build_summary() -> Tuple[bytes, int]:
+    index, version = db.load_index_and_version()
+    body = _dumps({
+        "version": version,
+        "categories": list(index.categories),
+        "decks": [meta.model_dump(mode="json") for meta in list(index.decks)],
+    }).encode()
+    return body, version
+
+
+_BUILDERS = {"state": _build_state, "summary": _build_summary}
+
+
+def library_body(
+    kind: str, version: Optional[int] = None, encoding: Optional[str] = None
+) -> Tuple[bytes, int]:
+    """
+    Return (JSON body, library version) for "state" (LibraryStateOut) or
+    "summary" (LibrarySummaryOut), serializing only on a cache miss.
+
+    With an `encoding` ("gzip", "br") the body comes back compressed in
+    that encoding, also cached.
+    """
+    if version is None:
+        version = db.get_library_version()
+    if encoding is not None:
+        return _encoded_body(kind, version, encoding)
+
+    with _lock:
+        hit = _bodies.get(kind)
+    if hit is not None and hit[0] == version:
+        return hit[1], version
+
+    with _build_locks[kind]:
+        with _lock:
+            hit = _bodies.get(kind)
+        if hit is not None and hit[0] == version:
+            return hit[1], version
+
+        body, built_version = _BUILDERS[kind]()
+        # Only keep it if nothing committed while we were building: the
+        # body must match the version it is filed under.
+        if db.get_library_version() == built_version:
+            with _lock:
+                _bodies[kind] = (built_version, body)
+        return body, built_version
+
+
+def _encoded_body(kind: str, version: int, encoding: str) -> Tuple[bytes, int]:
+    key = (kind, encoding)
+    with _lock:
+        hit = _encoded.get(key)
+        compress_lock = _compress_locks.setdefault(key, threading.Lock())
+    if hit is not None and hit[0] == version:
+        return hit[1], version
+
+    # Compressing a large body takes a while: one thread per variant at a
+    # time, like building it.
+    with compress_lock:
+        with _lock:
+            hit = _encoded.get(key)
+        if hit is not None and hit[0] == version:
+            return hit[1], version
+
+        body, version = library_body(kind, version)
+        data = compress(body, encoding)
+        with _lock:
+            # Same rule as the plain body: only file it under a current version.
+            current = _bodies.get(kind)
+            if current is not None and current[0] == version:
+                _encoded[key] = (version, data)
+        return data, version
+
+
+def library_response(
+    kind: str, request: Optional[Request] = None, version: Optional[int] = None
+) -> Response:
+    """
+    library_body() as a raw application/json Response, compressed when the
+    request's Accept-Encoding allows it.
+    """
+    encoding = negotiate_encoding(request) if request is not None else None
+    body, _ = library_body(kind, version, encoding)
+    return encoded_response(body, encoding)
+
+
+def encoded_response(body: bytes, encoding: Optional[str]) -> Response:
+    response = Response(content=body, media_type="application/json")
+    response.headers["Vary"] = "Accept-Encoding"
+    if encoding is not None:
+        response.headers["Content-Encoding"] = encoding
+    return response
@@ -1,7 +1,8 @@
-from typing import List, Optional
-from pydantic import BaseModel
+from datetime import datetime
+from typing import Annotated, Any, Dict, List, Literal, Optional, Union
+from pydantic import BaseModel, Field
 
-from .models import Deck
+from .models import Deck, DeckMeta, TabooCard
 
 
 class LibraryStateOut(BaseModel):
@@ -9,6 +10,109 @@ class LibraryStateOut(BaseModel):
     decks: List[Deck]
 
 
+class LibrarySummaryOut(BaseModel):
+    """Categories + deck metadata, no cards (what the Manage tab needs)."""
+    version: int
+    categories: List[str]
+    decks: List[DeckMeta]
+
+
+class DeckCardsPageOut(BaseModel):
+    """One page of a deck's cards; pass next_cursor back to get the next."""
+    deck_id: str
+    total: int
+    cards: List[TabooCard]
+    next_cursor: Optional[str] = None
+
+
+class LibraryChangesOut(BaseModel):
+    """
+    Mutation records after `since`, oldest first. With reset=True they
+    weren't available any more: reload everything and continue from
+    `version`.
+    """
+    version: int
+    reset: bool = False
+    changes: List[Dict[str, Any]] = []
+
+
+class SearchHit(BaseModel):
+    deck_id: str
+    deck_name: Optional[str] = None
+    category: Optional[str] = None
+    card_index: int  # position in the deck's cards
+    word: str
+    taboo: List[str]
+    matched_in: List[Literal["word", "taboo"]]
+
+
+class LibrarySearchOut(BaseModel):
+    """Best matches first; `total` counts every match, not just the hits returned."""
+    query: str
+    version: int
+    total: int
+    hits: List[SearchHit]
+
+
+class DuplicateCard(BaseModel):
+    deck_id: str
+    deck_name: Optional[str] = None
+    card_index: int
+    word: str
+
+
+class DuplicateMatch(DuplicateCard):
+    kind: Literal["exact", "near"]  # same word, or same up to punctuation/accents/plural
+
+
+class DuplicateGroup(BaseModel):
+    key: str  # the shared normalized word
+    kind: Literal["exact", "near"]
+    cards: List[DuplicateCard]
+
+
+class DuplicateGroupsOut(BaseModel):
+    """Largest groups first; `total` counts every group, not just those returned."""
+    version: int
+    total: int
+    groups: List[DuplicateGroup]
+
+
+class DuplicateCheckRequest(BaseModel):
+    words: List[str] = Field(..., max_length=20000)
+    # Ignore this deck's own cards (e.g. when checking a deck's new cards
+    # before replacing them).
+    exclude_deck_id: Optional[str] = None
+
+
+class DuplicateCheckItem(BaseModel):
+    word: str
+    matches: List[DuplicateMatch]
+
+
+class DuplicateCheckOut(BaseModel):
+    """Only the words that already exist somewhere are listed."""
+    version: int
+    items: List[DuplicateCheckItem]
+
+
+class DeckRefreshResult(BaseModel):
+    deck_id: str
+    name: str
+    status: str  # "refreshed", "unchanged", "empty", "failed", "timeout" or "deleted"
+    card_count: Optional[int] = None
+    error: Optional[str] = None
+    elapsed_ms: float
+
+
+class RefreshDecksOut(BaseModel):
+    """Per-deck refresh report (the result of a refresh job)."""
+    refreshed: int
+    unchanged: int = 0
+    failed: int
+    results: List[DeckRefreshResult]
+
+
 class ImportFromUrlRequest(BaseModel):
     url: str
     name: Optional[str] = None
@@ -21,3 +125,85 @@ class AddCategoryRequest(BaseModel):
 
 class MoveDeckRequest(BaseModel):
     category: str
+
+
+# -------- Batch (POST /library/batch) --------
+
+class AddCategoryOp(BaseModel):
+    op: Literal["add_category"]
+    name: str
+
+
+class DeleteCategoryOp(BaseModel):
+    op: Literal["delete_category"]
+    name: str
+
+
+class MoveDeckOp(BaseModel):
+    op: Literal["move_deck"]
+    deck_id: str
+    category: str
+
+
+class DeleteDeckOp(BaseModel):
+    op: Literal["delete_deck"]
+    deck_id: str
+
+
+class RenameDeckOp(BaseModel):
+    op: Literal["rename_deck"]
+    deck_id: str
+    name: str
+
+
+BatchOperation = Annotated[
+    Union[AddCategoryOp, DeleteCategoryOp, MoveDeckOp, DeleteDeckOp, RenameDeckOp],
+    Field(discriminator="op"),
+]
+
+
+class LibraryBatchRequest(BaseModel):
+    """Operations applied in order, all or nothing."""
+    operations: List[BatchOperation] = Field(..., min_length=1, max_length=1000)
+
+
+# -------- Background jobs --------
+
+class JobOut(BaseModel):
+    """
+    A background job (GET /jobs/{id}). status: "queued", "running",
+    "succeeded" or "failed". progress is done/total (0..1) when the job
+    knows its total; result is set once it succeeded, error once it failed.
+    """
+    id: str
+    kind: str
+    status: str
+    done: int = 0
+    total: Optional[int] = None
+    progress: Optional[float] = None
+    message: Optional[str] = None
+    result: Any = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+# -------- Play sessions --------
+
+class CreatePlaySessionRequest(BaseModel):
+    deck_ids: List[str]
+
+
+class PlayCardOut(BaseModel):
+    word: str
+    taboo: List[str]
+    deck_id: str
+    deck_name: str
+
+
+class PlaySessionOut(BaseModel):
+    session_id: str
+    total: int       # cards in the pool
+    remaining: int   # cards left in this run, current one included
+    card: Optional[PlayCardOut] = None  # current card; None when the run is over
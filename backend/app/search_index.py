@@ -0,0 +1,269 @@
+"""
+Inverted index over every card's goal word and taboo words
+(GET /library/search).
+
+Each goal word / taboo word is normalized (card_index.normalize: NFKC +
+casefold) and split into word tokens. Postings map a token to the cards
+containing it, per deck:
+
+    token -> {deck_id: [card ref, ...]}     card ref = card_index << 1 | in_taboo
+
+and a sorted list of all distinct tokens answers prefix queries with two
+bisects. A query matches a card when every query token (as a prefix, or
+exactly) appears in the card's goal word or taboo words; hits are ranked
+goal word == query, goal word starts with the query, query found in the
+goal word, then found only among the taboo words.
+
+The index follows the change feed (see card_index.CardIndex): only decks
+that were upserted, refreshed or deleted since the last query are
+re-indexed, and the sorted token list is patched with bisect.insort
+unless a lot changed at once, in which case it is simply re-sorted.
+"""
+from __future__ import annotations
+
+import heapq
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from . import db
+from .card_index import CardIndex, normalize, terms, tokenize
+from .compact_cards import CompactCard
+
+
+# Match flags of one card for a query: bit 0 = every query token is in the
+# goal word, bit 1 = some query token is among the taboo words.
+_IN_WORD = 1
+_IN_TABOO = 2
+
+CardKey = Tuple[str, int]  # (deck id, card index)
+
+
+class SearchIndex(CardIndex):
+    def __init__(self) -> None:
+        super().__init__()
+        self._postings: Dict[str, Dict[str, List[int]]] = {}
+        self._terms: List[str] = []  # sorted distinct tokens
+        self._deck_tokens: Dict[str, Set[str]] = {}
+        self._deck_cards: Dict[str, List[CompactCard]] = {}
+        self._deck_words: Dict[str, List[str]] = {}  # normalized goal words
+        # Tokens that appeared / disappeared since _terms was last patched.
+        self._added: Set[str] = set()
+        self._removed: Set[str] = set()
+
+    # ----- CardIndex hooks -----
+
+    def _clear(self) -> None:
+        self._postings.clear()
+        self._terms = []
+        self._deck_tokens.clear()
+        self._deck_cards.clear()
+        self._deck_words.clear()
+        self._added.clear()
+        self._removed.clear()
+
+    def _add_deck(self, deck_id: str, cards: List[CompactCard]) -> None:
+        refs: Dict[str, List[int]] = {}
+        get = refs.get
+        words = []
+        for i, card in enumerate(cards):
+            words.append(normalize(card.word))
+            ref = i << 1
+            for token in terms(card.word):
+                bucket = get(token)
+                if bucket is None:
+                    refs[token] = [ref]
+                else:
+                    bucket.append(ref)
+            ref |= 1
+            for taboo in card.taboo:
+                for token in terms(taboo):
+                    bucket = get(token)
+                    if bucket is None:
+                        refs[token] = [ref]
+                    elif bucket[-1] != ref:  # same token in two taboo words
+                        bucket.append(ref)
+
+        postings = self._postings
+        for token, token_refs in refs.items():
+            by_deck = postings.get(token)
+            if by_deck is None:
+                postings[token] = by_deck = {}
+                if token in self._removed:
+                    self._removed.discard(token)
+                else:
+                    self._added.add(token)
+            by_deck[deck_id] = token_refs
+
+        self._deck_tokens[deck_id] = set(refs)
+        self._deck_cards[deck_id] = cards
+        self._deck_words[deck_id] = words
+
+    def _remove_deck(self, deck_id: str) -> None:
+        tokens = self._deck_tokens.pop(deck_id, None)
+        if tokens is None:
+            return
+        self._deck_cards.pop(deck_id, None)
+        self._deck_words.pop(deck_id, None)
+        postings = self._postings
+        for token in tokens:
+            by_deck = postings[token]
+            by_deck.pop(deck_id, None)
+            if not by_deck:
+                del postings[token]
+                if token in self._added:
+                    self._added.discard(token)
+                else:
+                    self._removed.add(token)
+
+    def _after_update(self) -> None:
+        added, removed = self._added, self._removed
+        if not added and not removed:
+            return
+        sorted_terms = self._terms
+        if len(added) + len(removed) > 256:
+            # One linear pass instead of thousands of list shifts: filter,
+            # then let sort() merge the two sorted runs.
+            if removed:
+                sorted_terms = [t for t in sorted_terms if t not in removed]
+            sorted_terms.extend(sorted(added))
+            sorted_terms.sort()
+            self._terms = sorted_terms
+        else:
+            for token in removed:
+                i = bisect_left(sorted_terms, token)
+                if i < len(sorted_terms) and sorted_terms[i] == token:
+                    del sorted_terms[i]
+            for token in added:
+                insort(sorted_terms, token)
+        added.clear()
+        removed.clear()
+
+    # ----- queries -----
+
+    def _token_matches(self, token: str, prefix: bool, decks: Optional[Set[str]]) -> Dict[CardKey, int]:
+        """Cards containing `token` (or a token starting with it) -> match flags."""
+        if prefix:
+            terms = self._terms
+            lo = bisect_left(terms, token)
+            hi = bisect_left(terms, token + "\U0010ffff")
+            matched: Iterable[str] = terms[lo:hi]
+        else:
+            matched = (token,) if token in self._postings else ()
+
+        found: Dict[CardKey, int] = {}
+        for term in matched:
+            for deck_id, refs in self._postings[term].items():
+                if decks is not None and deck_id not in decks:
+                    continue
+                for ref in refs:
+                    key = (deck_id, ref >> 1)
+                    found[key] = found.get(key, 0) | (_IN_TABOO if ref & 1 else _IN_WORD)
+        return found
+
+    def search(
+        self,
+        query: str,
+        prefix: bool = True,
+        deck_ids: Optional[Iterable[str]] = None,
+        limit: int = 50,
+    ) -> Dict[str, Any]:
+        """
+        Cards matching `query`, best first (at most `limit`), plus the total
+        number of matches and the library version searched.
+        """
+        version = self.sync()
+        normalized = normalize(query).strip()
+        tokens = sorted(set(tokenize(normalized)))
+        if not tokens:
+            return {"version": version, "total": 0, "hits": []}
+        decks = set(deck_ids) if deck_ids is not None else None
+
+        with self._lock:
+            per_token = [self._token_matches(t, prefix, decks) for t in tokens]
+            per_token.sort(key=len)  # intersect starting from the rarest
+            matches = per_token[0]
+            for other in per_token[1:]:
+                matches = {
+                    key: (flags & other[key] & _IN_WORD) | ((flags | other[key]) & _IN_TABOO)
+                    for key, flags in matches.items()
+                    if key in other
+                }
+
+            deck_words = self._deck_words
+
+            def rank(item: Tuple[CardKey, int]):
+                (deck_id, i), flags = item
+                word = deck_words[deck_id][i]
+                if word == normalized:
+                    tier = 0
+                elif word.startswith(normalized):
+                    tier = 1
+                elif flags & _IN_WORD:
+                    tier = 2
+                else:
+                    tier = 3
+                return (tier, len(word), word, deck_id, i)
+
+            best = heapq.nsmallest(limit, matches.items(), key=rank)
+            hits = []
+            for (deck_id, i), flags in best:
+                card = self._deck_cards[deck_id][i]
+                matched_in = []
+                if flags & _IN_WORD:
+                    matched_in.append("word")
+                if flags & _IN_TABOO:
+                    matched_in.append("taboo")
+                hits.append({
+                    "deck_id": deck_id,
+                    "card_index": i,
+                    "word": card.word,
+                    "taboo": list(card.taboo),
+                    "matched_in": matched_in,
+                })
+            return {"version": version, "total": len(matches), "hits": hits}
+
+
+_index = SearchIndex()
+
+
+def search_library(
+    query: str,
+    prefix: bool = True,
+    deck_ids: Optional[Iterable[str]] = None,
+    category: Optional[str] = None,
+    limit: int = 50,
+) -> Dict[str, Any]:
+    """
+    Search every deck's cards (or only `deck_ids` / decks in `category`).
+
+    Hits carry their deck's current name and category. Raises
+    CategoryNotFoundError for an unknown category.
+    """
+    index = db.load_index()
+    if category is not None:
+        if not index.has_category(category):
+            raise db.CategoryNotFoundError("Category not found.")
+        in_category = set(index.deck_ids_in_category(category))
+        deck_ids = in_category if deck_ids is None else in_category.intersection(deck_ids)
+
+    result = _index.search(query, prefix=prefix, deck_ids=deck_ids, limit=limit)
+    for hit in result["hits"]:
+        meta = index.get_deck(hit["deck_id"])
+        hit["deck_name"] = meta.name if meta is not None else None
+        hit["category"] = meta.category if meta is not None else None
+    result["query"] = query
+    return result
+
+
+def warm_search_index() -> None:
+    """Build the index ahead of the first search (run in a background thread)."""
+    try:
+        version = _index.sync()
+        print(f"Search index ready (library version {version}).")
+    except Exception as exc:
+        print("Search index warm-up failed:", exc)
+
+
+def reset_search_index() -> None:
+    """Drop the index; the next search rebuilds it."""
+    _index.reset()
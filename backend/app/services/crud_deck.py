@@ -2,20 +2,13 @@
 
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List
 from uuid import uuid4
 
 from app import db
 from app.models import Deck, TabooCard
 
 
-def _find_deck(state, deck_id: str) -> Optional[Deck]:
-    for d in state.decks:
-        if d.id == deck_id:
-            return d
-    return None
-
-
 def create_deck(
     *,
     name: str,
@@ -31,8 +24,6 @@ def create_deck(
     - `cards` is a list of {"goal": str, "taboos": [str, ...]}
     - `source` will be a URL pointing back to the specific tab
     """
-    state = db.load_library()
-
     taboo_cards: List[TabooCard] = [
         TabooCard(word=card["goal"], taboo=card["taboos"])
         for card in cards
@@ -55,8 +46,7 @@ def create_deck(
         cards=taboo_cards,
     )
 
-    state.decks.append(deck)
-    db.save_library(state)
+    db.upsert_deck(deck)
     return deck.id
 
 
@@ -64,21 +54,18 @@ def update_deck_cards(deck_id: str, cards: List[Dict[str, Any]]) -> None:
     """
     Replace the cards for an existing deck while keeping its id/category/etc.
     """
-    state = db.load_library()
-    deck = _find_deck(state, deck_id)
-    if deck is None:
-        # If the deck somehow disappeared, just bail quietly for now.
-        # (We could raise, but that would make reload brittle.)
-        return
-
     taboo_cards: List[TabooCard] = [
         TabooCard(word=card["goal"], taboo=card["taboos"])
         for card in cards
     ]
 
-    deck.cards = taboo_cards
-    deck.card_count = len(taboo_cards)
+    taboo_words_per_card = None
     if taboo_cards:
-        deck.taboo_words_per_card = max(len(c.taboo) for c in taboo_cards)
+        taboo_words_per_card = max(len(c.taboo) for c in taboo_cards)
 
-    db.save_library(state)
+    try:
+        db.replace_deck_cards(deck_id, taboo_cards, taboo_words_per_card)
+    except db.DeckNotFoundError:
+        # If the deck somehow disappeared, just bail quietly for now.
+        # (We could raise, but that would make reload brittle.)
+        return
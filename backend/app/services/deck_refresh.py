@@ -0,0 +1,169 @@
+# backend/app/services/deck_refresh.py
+"""
+Re-fetch Google Sheets–backed decks from their source URLs.
+
+All decks are fetched concurrently through the shared, pooled HTTP client
+(services/http_client.py), at most LIBRARY_REFRESH_CONCURRENCY at a
+time. Each deck gets its own deadline (LIBRARY_REFRESH_DECK_TIMEOUT_SECONDS
+for fetch + parse), so one slow sheet is reported as timed out instead of
+holding up the others: the whole refresh takes about as long as the
+slowest single deck. Time spent waiting for the outbound rate limiter or
+a Retry-After (http_client.py) doesn't count against the deadline, so a
+throttled refresh slows down instead of timing decks out. Each deck's new cards are written as soon as they are
+parsed; writes landing together share one commit (see db's writer).
+
+Fetches are conditional (source_cache.py): a sheet that answers 304 is
+reported as "unchanged" without being parsed or written. The validators
+are kept per deck and only once the deck's new cards are stored, so a
+refresh that failed half-way is retried in full next time.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from app import db
+from app.config import settings
+from app.models import DeckMeta, TabooCard
+from app.services.http_client import QuotaWaits, SourceFetch, quota_waits
+from app.services.taboo_parser import fetch_csv_source, parse_deck_from_csv
+
+
+def _result(deck: DeckMeta, status: str, started: float, **extra) -> Dict:
+    return {
+        "deck_id": deck.id,
+        "name": deck.name,
+        "status": status,
+        "card_count": extra.get("card_count"),
+        "error": extra.get("error"),
+        "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+    }
+
+
+async def _refresh_one(deck: DeckMeta, semaphore: asyncio.Semaphore) -> Dict:
+    async with semaphore:
+        started = time.monotonic()
+        try:
+            fetch, cards = await _with_deadline(
+                _fetch_and_parse(deck), settings.LIBRARY_REFRESH_DECK_TIMEOUT_SECONDS
+            )
+        except asyncio.TimeoutError:
+            return _result(deck, "timeout", started, error="Timed out fetching the sheet.")
+        except Exception as exc:
+            # Don't kill the whole refresh if one deck fails
+            print(f"Failed to refresh deck {deck.id}: {exc}")
+            return _result(deck, "failed", started, error=str(exc) or type(exc).__name__)
+
+        if cards is None:
+            return _result(deck, "unchanged", started, card_count=deck.card_count)
+        if not cards:
+            return _result(deck, "empty", started, error="No valid cards found; kept the old ones.")
+
+        try:
+            await run_in_threadpool(db.replace_deck_cards, deck.id, cards)
+        except db.DeckNotFoundError:
+            return _result(deck, "deleted", started, error="Deck was deleted during the refresh.")
+        except Exception as exc:
+            # Storage trouble (OSError, sqlite3.Error, ...) is this deck's
+            # failure too: the other decks' results still get reported.
+            print(f"Failed to store refreshed deck {deck.id}: {exc}")
+            return _result(deck, "failed", started, error=str(exc) or type(exc).__name__)
+        # Stored: from now on a 304 really means "unchanged".
+        try:
+            await fetch.remember()
+        except OSError as exc:
+            print(f"Failed to cache the source of deck {deck.id}: {exc}")
+        return _result(deck, "refreshed", started, card_count=len(cards))
+
+
+async def _with_deadline(coro, timeout: float):
+    """
+    Await `coro` for at most `timeout` seconds, not counting its quota
+    waits (http_client.quota_waits). Raises asyncio.TimeoutError.
+    """
+    started = time.monotonic()
+    waits = QuotaWaits()
+    token = quota_waits.set(waits)
+    try:
+        task = asyncio.ensure_future(coro)  # copies the context: shares `waits`
+    finally:
+        quota_waits.reset(token)
+    try:
+        while True:
+            left = started + timeout + waits.seconds - time.monotonic()
+            if left <= 0:
+                raise asyncio.TimeoutError
+            done, _pending = await asyncio.wait({task}, timeout=left)
+            if done:
+                return task.result()
+    finally:
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+async def _fetch_and_parse(deck: DeckMeta) -> Tuple[SourceFetch, Optional[List[TabooCard]]]:
+    """(the fetch, the deck's new cards or None if its source hasn't changed)."""
+    fetch = await fetch_csv_source(deck.source, scope=f"deck:{deck.id}")
+    if not fetch.changed:
+        return fetch, None
+    # Use the deck's configured taboo_words_per_card (default is 4). Parsing
+    # is CPU work: keep it off the event loop so other fetches progress.
+    cards = await run_in_threadpool(parse_deck_from_csv, fetch.text, deck.taboo_words_per_card)
+    return fetch, cards
+
+
+def refreshable_decks(deck_ids: Optional[Sequence[str]] = None) -> List[DeckMeta]:
+    """Google Sheets decks with a source URL (optionally only `deck_ids`)."""
+    index = db.load_index()
+    wanted = set(deck_ids) if deck_ids is not None else None
+    # Copy the list: other requests may commit while we await fetches.
+    return [
+        deck
+        for deck in list(index.decks)
+        if deck.source_type == "google_sheets"
+        and deck.source
+        and (wanted is None or deck.id in wanted)
+    ]
+
+
+async def refresh_decks(
+    deck_ids: Optional[Sequence[str]] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> List[Dict]:
+    """
+    Refresh every Sheets-backed deck (or just `deck_ids`) and return one
+    report per deck: {deck_id, name, status, card_count, error, elapsed_ms}
+    with status "refreshed", "unchanged", "empty", "failed", "timeout" or
+    "deleted".
+
+    `progress(decks_done, decks_total)` is called as decks finish.
+    """
+    decks = refreshable_decks(deck_ids)
+    semaphore = asyncio.Semaphore(max(1, settings.LIBRARY_REFRESH_CONCURRENCY))
+    finished = 0
+    if progress:
+        progress(0, len(decks))
+
+    async def one(deck: DeckMeta) -> Dict:
+        nonlocal finished
+        result = await _refresh_one(deck, semaphore)
+        finished += 1
+        if progress:
+            progress(finished, len(decks))
+        return result
+
+    return list(await asyncio.gather(*(one(deck) for deck in decks)))
+
+
+def summarize(results: List[Dict]) -> Dict:
+    """The RefreshDecksOut shape: counts plus the per-deck results."""
+    counts = {"refreshed": 0, "unchanged": 0}
+    for r in results:
+        if r["status"] in counts:
+            counts[r["status"]] += 1
+    failed = len(results) - counts["refreshed"] - counts["unchanged"]
+    return {**counts, "failed": failed, "results": results}
@@ -0,0 +1,325 @@
+# backend/app/services/http_client.py
+"""
+The one outbound HTTP client: Google Sheets API calls (sheet_parser) and
+published-CSV fetches (taboo_parser) both go through it.
+
+It is an httpx.AsyncClient living as long as the app (closed by the
+shutdown hook in main.py), so connections -- and TLS sessions -- to
+Google are kept alive and reused instead of handshaking on every call,
+and a slow Sheets response only parks a coroutine, not a threadpool
+worker. HTTP/2 is used when the optional `h2` package is installed
+(`pip install httpx[http2]`): then concurrent requests to the same host
+share one connection.
+
+Timeouts are explicit: SOURCE_FETCH_CONNECT_TIMEOUT_SECONDS to connect,
+SOURCE_FETCH_TIMEOUT_SECONDS for each read/write/pool wait.
+
+A client is tied to the event loop it was created on; a new loop (tests,
+scripts using asyncio.run) gets a fresh one.
+
+Quota: every request first takes a token from one process-wide bucket
+(SOURCE_FETCH_RATE_PER_MINUTE, up to SOURCE_FETCH_BURST at once), so a
+large import or refresh queues up smoothly instead of running into the
+Sheets API's per-minute quota. 429 and 5xx answers and connection errors
+are retried with exponential backoff and jitter, honouring Retry-After; a
+429 also pauses the bucket, so the requests queued behind it back off
+too. stats() (shown on GET /health) counts what happened.
+"""
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import random
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+import httpx
+from fastapi.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.services import source_cache
+
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared AsyncClient for the running event loop."""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = httpx.AsyncClient(
+            http2=settings.SOURCE_FETCH_HTTP2 and HTTP2_AVAILABLE,
+            timeout=httpx.Timeout(
+                settings.SOURCE_FETCH_TIMEOUT_SECONDS,
+                connect=settings.SOURCE_FETCH_CONNECT_TIMEOUT_SECONDS,
+            ),
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=settings.SOURCE_FETCH_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.SOURCE_FETCH_MAX_CONNECTIONS,
+            ),
+        )
+        _client_loop = loop
+    return _client
+
+
+async def close_http_client() -> None:
+    """Close the shared client (app shutdown)."""
+    global _client, _client_loop
+    client, _client, _client_loop = _client, None, None
+    if client is not None and not client.is_closed:
+        await client.aclose()
+
+
+class TokenBucket:
+    """
+    `rate` tokens per second, at most `burst` saved up.
+
+    take() reserves a token and returns how long to wait for it: the count
+    may go negative, so waiters queue up in order without a lock being held
+    while they sleep. Works across event loops and threads.
+    """
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def take(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def give_back(self) -> None:
+        """Return a reserved token (its waiter was cancelled)."""
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + 1)
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no token for at least `seconds` (after a 429)."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+
+_bucket: Optional[TokenBucket] = None
+_stats_lock = threading.Lock()
+_stats: Dict[str, float] = {
+    "requests": 0,          # sent, retries included
+    "throttled": 0,         # had to wait for a token
+    "throttle_wait_seconds": 0.0,
+    "retries": 0,
+    "rate_limited": 0,      # 429 answers
+    "server_errors": 0,     # 5xx answers
+    "connection_errors": 0,
+    "gave_up": 0,           # still failing after SOURCE_FETCH_MAX_RETRIES
+}
+
+
+def _count(name: str, amount: float = 1) -> None:
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def _get_bucket() -> Optional[TokenBucket]:
+    """The shared bucket, or None when SOURCE_FETCH_RATE_PER_MINUTE is 0."""
+    global _bucket
+    rate = settings.SOURCE_FETCH_RATE_PER_MINUTE / 60
+    if rate <= 0:
+        return None
+    if _bucket is None or _bucket.rate != rate or _bucket.burst != max(1, settings.SOURCE_FETCH_BURST):
+        _bucket = TokenBucket(rate, settings.SOURCE_FETCH_BURST)
+    return _bucket
+
+
+class QuotaWaits:
+    """Seconds spent waiting for the limiter or before a retry (see quota_waits)."""
+
+    __slots__ = ("seconds",)
+
+    def __init__(self) -> None:
+        self.seconds = 0.0
+
+
+# Set by a caller with its own deadline (deck_refresh.py) so it can leave
+# quota waits out of it: they are the point of the limiter, not slowness.
+quota_waits: ContextVar[Optional[QuotaWaits]] = ContextVar("quota_waits", default=None)
+
+
+async def _quota_sleep(delay: float) -> None:
+    waits = quota_waits.get()
+    if waits is not None:
+        waits.seconds += delay  # counted up front: deadlines move out right away
+    await asyncio.sleep(delay)
+
+
+async def _wait_for_token() -> None:
+    bucket = _get_bucket()
+    if bucket is None:
+        return
+    delay = bucket.take()
+    if delay <= 0:
+        return
+    _count("throttled")
+    _count("throttle_wait_seconds", delay)
+    try:
+        await _quota_sleep(delay)
+    except asyncio.CancelledError:
+        bucket.give_back()
+        raise
+
+
+def _retry_after(resp: httpx.Response) -> Optional[float]:
+    """Seconds asked for by a Retry-After header (delta or HTTP date), if any."""
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def _backoff(attempt: int) -> float:
+    """Delay before retry number `attempt` (1-based): doubling, with jitter."""
+    delay = settings.SOURCE_FETCH_RETRY_BASE_SECONDS * 2 ** (attempt - 1)
+    return min(delay, settings.SOURCE_FETCH_RETRY_MAX_SECONDS) * random.uniform(0.5, 1.0)
+
+
+async def send_get(url: str, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+    """
+    GET `url` on the shared client, within the rate limit, retrying 429,
+    5xx and connection errors. Returns the last response (whatever its
+    status) or raises the last connection error.
+    """
+    client = get_http_client()
+    attempt = 0
+    while True:
+        await _wait_for_token()
+        _count("requests")
+        try:
+            resp = await client.get(url, headers=headers)
+        except httpx.TransportError:
+            _count("connection_errors")
+            if attempt >= settings.SOURCE_FETCH_MAX_RETRIES:
+                _count("gave_up")
+                raise
+            delay = _backoff(attempt + 1)
+        else:
+            if resp.status_code not in RETRY_STATUSES:
+                return resp
+            _count("rate_limited" if resp.status_code == 429 else "server_errors")
+            if attempt >= settings.SOURCE_FETCH_MAX_RETRIES:
+                _count("gave_up")
+                return resp
+            asked = _retry_after(resp)
+            delay = _backoff(attempt + 1) if asked is None else asked
+            delay = min(delay, settings.SOURCE_FETCH_RETRY_MAX_SECONDS)
+            if resp.status_code == 429:
+                bucket = _get_bucket()
+                if bucket is not None:
+                    bucket.pause(delay)
+            await resp.aclose()
+
+        attempt += 1
+        _count("retries")
+        await _quota_sleep(delay)
+
+
+def stats() -> Dict[str, Any]:
+    """Outbound request counters and limiter settings (for GET /health)."""
+    with _stats_lock:
+        counters = dict(_stats)
+    counters["throttle_wait_seconds"] = round(counters["throttle_wait_seconds"], 1)
+    return {
+        "rate_per_minute": settings.SOURCE_FETCH_RATE_PER_MINUTE,
+        "burst": settings.SOURCE_FETCH_BURST,
+        **counters,
+    }
+
+
+class SourceFetch:
+    """
+    What cached_get() got: the response, its text, whether it changed.
+
+    A 200 is not stored in the source cache by cached_get() itself: call
+    remember() once its content has been written to the library, so a
+    fetch whose apply step failed is fetched in full again next time
+    instead of being answered 304 ("unchanged").
+    """
+
+    __slots__ = ("url", "scope", "response", "text", "changed")
+
+    def __init__(self, url: str, scope: Optional[str], response: httpx.Response, text: str, changed: bool) -> None:
+        self.url = url
+        self.scope = scope
+        self.response = response
+        self.text = text
+        self.changed = changed
+
+    @property
+    def status_code(self) -> int:
+        """The response status; 200 for a 304 served from the cache."""
+        return self.response.status_code if self.changed else 200
+
+    async def remember(self, scope: Optional[str] = None) -> None:
+        """
+        Keep the validators (and body) for the next conditional fetch, under
+        `scope` (default: the scope it was fetched for). A no-op unless
+        this was a fresh 200.
+        """
+        scope = scope or self.scope
+        if scope is None or not self.changed or self.response.status_code != 200:
+            return
+        resp = self.response
+        await run_in_threadpool(
+            source_cache.remember, self.url, scope, resp.content, resp.encoding, resp.headers
+        )
+
+
+async def cached_get(url: str, scope: Optional[str] = None) -> SourceFetch:
+    """
+    GET a source, conditionally when `scope` (e.g. "deck:<id>") already
+    holds a copy of it (source_cache.py).
+
+    The request carries If-None-Match / If-Modified-Since when the scope
+    has a remembered copy; on a 304 the stored text comes back with
+    changed=False. Without a scope the fetch is unconditional. Goes
+    through send_get(), so it is rate limited and retried; a status still
+    failing after the retries is returned as it is (check status_code).
+    Call remember() on the result after applying it.
+    """
+    headers: Dict[str, str] = {}
+    if scope is not None:
+        headers = await run_in_threadpool(source_cache.conditional_headers, url, scope)
+    resp = await send_get(url, headers=headers)
+    if resp.status_code == 304 and scope is not None:
+        text = await run_in_threadpool(source_cache.cached_text, url, scope, headers)
+        if text is not None:
+            return SourceFetch(url, scope, resp, text, False)
+        resp = await send_get(url)  # lost our copy meanwhile: fetch it whole
+    return SourceFetch(url, scope, resp, resp.text, True)
@@ -0,0 +1,211 @@
+# backend/app/services/jobs.py
+"""
+In-process background jobs (workbook imports/reloads, deck imports,
+refreshes from source).
+
+Heavy endpoints used to do all their network fetches and parsing inside
+the request, which hits proxy timeouts on big workbooks and ties up
+threadpool workers. Now they submit a job and answer 202 with its id right
+away; clients poll GET /jobs/{id}.
+
+  - Jobs are asyncio tasks on the app's event loop; at most
+    JOBS_MAX_CONCURRENT run at a time, the rest wait in order ("queued").
+    Blocking work inside a job goes through run_in_threadpool.
+  - Deduplication: a job can carry a key (e.g. "workbook:<id>"). While a
+    job with that key is queued or running, submitting the same key again
+    returns the existing job instead of starting a second one.
+  - Progress: the job function gets its Job and calls
+    job.set_progress(done, total, message).
+  - Finished jobs are kept for JOBS_KEEP_SECONDS (and at most
+    JOBS_KEEP_MAX of them) so clients can still read the result.
+
+Jobs live in this process only: with several workers, poll the worker
+that accepted the job (or run one worker), and a restart forgets them.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+from uuid import uuid4
+
+from app.config import settings
+
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+
+class JobNotFoundError(Exception):
+    """Unknown job id (never existed, or finished long enough ago to be dropped)."""
+    pass
+
+
+class Job:
+    __slots__ = (
+        "id", "kind", "key", "status", "done", "total", "message",
+        "result", "error", "created_at", "started_at", "finished_at",
+        "_finished_mono", "_task",
+    )
+
+    def __init__(self, kind: str, key: Optional[str]):
+        self.id = uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.status = QUEUED
+        self.done = 0
+        self.total: Optional[int] = None
+        self.message: Optional[str] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.now(timezone.utc)
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self._finished_mono: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def set_progress(self, done: int, total: Optional[int] = None, message: Optional[str] = None) -> None:
+        """Report progress; safe to call from a threadpool thread."""
+        self.done = done
+        if total is not None:
+            self.total = total
+        if message is not None:
+            self.message = message
+
+    def to_dict(self) -> Dict[str, Any]:
+        progress = None
+        if self.status == SUCCEEDED:
+            progress = 1.0
+        elif self.total:
+            progress = min(1.0, self.done / self.total)
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "done": self.done,
+            "total": self.total,
+            "progress": progress,
+            "message": self.message,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+JobFunc = Callable[[Job], Awaitable[Any]]
+
+_lock = threading.Lock()
+_jobs: "OrderedDict[str, Job]" = OrderedDict()  # oldest first
+_active_by_key: Dict[str, Job] = {}
+_semaphore: Optional[asyncio.Semaphore] = None
+_semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    # Created lazily on the running loop (asyncio primitives are bound to it).
+    global _semaphore, _semaphore_loop
+    loop = asyncio.get_running_loop()
+    if _semaphore is None or _semaphore_loop is not loop:
+        _semaphore = asyncio.Semaphore(max(1, settings.JOBS_MAX_CONCURRENT))
+        _semaphore_loop = loop
+    return _semaphore
+
+
+def _prune(now: float) -> None:
+    """Drop finished jobs that are too old, or beyond the cap (under _lock)."""
+    finished = [j for j in _jobs.values() if j.status not in ACTIVE_STATUSES]
+    excess = len(finished) - max(0, settings.JOBS_KEEP_MAX)
+    for job in finished:
+        too_old = now - (job._finished_mono or now) > settings.JOBS_KEEP_SECONDS
+        if too_old or excess > 0:
+            del _jobs[job.id]
+            excess -= 1
+
+
+async def _run(job: Job, func: JobFunc) -> None:
+    try:
+        async with _get_semaphore():
+            job.status = RUNNING
+            job.started_at = datetime.now(timezone.utc)
+            job.result = await func(job)
+            job.status = SUCCEEDED
+    except asyncio.CancelledError:
+        job.status = FAILED
+        job.error = "Cancelled (server shutting down)."
+        raise
+    except Exception as exc:
+        print(f"Job {job.kind} {job.id} failed: {exc}")
+        job.status = FAILED
+        job.error = getattr(exc, "detail", None) or str(exc) or type(exc).__name__
+    finally:
+        job.finished_at = datetime.now(timezone.utc)
+        job._finished_mono = time.monotonic()
+        with _lock:
+            if job.key is not None and _active_by_key.get(job.key) is job:
+                del _active_by_key[job.key]
+
+
+# ---------- Public API ----------
+
+
+def submit(kind: str, func: JobFunc, key: Optional[str] = None) -> Job:
+    """
+    Start `func(job)` in the background and return its Job.
+
+    Must be called from the event loop (an async route). If `key` is given
+    and a job with that key is still queued or running, that job is
+    returned and `func` is not started.
+    """
+    loop = asyncio.get_running_loop()
+    with _lock:
+        _prune(time.monotonic())
+        if key is not None:
+            existing = _active_by_key.get(key)
+            if existing is not None:
+                return existing
+        job = Job(kind, key)
+        _jobs[job.id] = job
+        if key is not None:
+            _active_by_key[key] = job
+    job._task = loop.create_task(_run(job, func), name=f"job-{kind}-{job.id}")
+    return job
+
+
+def get_job(job_id: str) -> Job:
+    with _lock:
+        _prune(time.monotonic())
+        job = _jobs.get(job_id)
+    if job is None:
+        raise JobNotFoundError("Job not found (it may have expired).")
+    return job
+
+
+async def wait(job: Job) -> Job:
+    """
+    Wait (on the event loop) until `job` has finished, and return it.
+
+    Cancelling the waiter doesn't cancel the job.
+    """
+    task = job._task
+    if task is not None and not task.done():
+        await asyncio.wait({task})
+    return job
+
+
+async def shutdown() -> None:
+    """Cancel jobs that are still queued or running (app shutdown)."""
+    with _lock:
+        tasks = [j._task for j in _jobs.values() if j._task is not None and not j._task.done()]
+    for task in tasks:
+        task.cancel()
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
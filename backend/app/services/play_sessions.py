@@ -0,0 +1,269 @@
+# backend/app/services/play_sessions.py
+"""
+Server-side play sessions (draw / skip / reshuffle over selected decks).
+
+A session never copies cards. It holds:
+
+  - a reference to a merged, read-only pool of the selected decks' cards
+    (pools are cached per deck set + library version and shared by every
+    session playing the same decks), and
+  - a lazily built Fisher–Yates permutation of pool positions: only the
+    positions that have been swapped are stored (a dict), so creating or
+    reshuffling a session is O(1) and each draw does one swap step.
+
+The order of play is: the not-yet-dealt part of the permutation, then the
+skip queue (skipped cards go to the back, in the order they were skipped)
+-- the same order the old in-browser version used. Draw, skip and
+reshuffle are all O(1).
+
+Sessions idle for longer than PLAY_SESSION_IDLE_SECONDS are evicted, as
+are the least recently used ones beyond PLAY_SESSION_MAX.
+
+Sessions exist only in this process's memory. Unlike the library, they
+are not shared between worker processes: with several workers, a
+session's requests must all reach the worker that created it (sticky
+sessions), otherwise they get PlaySessionNotFoundError (404).
+"""
+from __future__ import annotations
+
+import random
+import threading
+import time
+from array import array
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+from uuid import uuid4
+
+from app import db
+from app.compact_cards import CompactCard
+from app.config import settings
+
+
+class PlaySessionError(Exception):
+    """A play session request can't be served."""
+    pass
+
+
+class PlaySessionNotFoundError(PlaySessionError):
+    """Unknown session id (never existed, stopped or evicted)."""
+    pass
+
+
+class EmptyPoolError(PlaySessionError):
+    """The selected decks have no cards."""
+    pass
+
+
+class _Pool:
+    """The merged cards of a deck set (references, not copies)."""
+    __slots__ = ("cards", "deck_of", "deck_ids", "deck_names")
+
+    def __init__(self, decks: Sequence[Tuple[str, str, List[CompactCard]]]):
+        self.cards: List[CompactCard] = []
+        self.deck_of = array("I")  # pool position -> index into deck_ids
+        self.deck_ids: List[str] = []
+        self.deck_names: List[str] = []
+        for deck_id, deck_name, cards in decks:
+            idx = len(self.deck_ids)
+            self.deck_ids.append(deck_id)
+            self.deck_names.append(deck_name)
+            self.cards.extend(cards)
+            self.deck_of.extend([idx] * len(cards))
+
+
+class _Session:
+    __slots__ = ("pool", "swapped", "dealt", "head", "skipped", "last_used", "rng")
+
+    def __init__(self, pool: _Pool):
+        self.pool = pool
+        self.rng = random.Random()
+        self.last_used = time.monotonic()
+        self.reshuffle()
+
+    def reshuffle(self) -> None:
+        # swapped: permutation slot -> pool position, only for touched slots
+        self.swapped: Dict[int, int] = {}
+        self.dealt = 0                    # slots [0, dealt) are used up
+        self.head: Optional[int] = None   # pool position of slot `dealt`
+        self.skipped: Deque[int] = deque()
+
+    def _fresh_left(self) -> int:
+        return len(self.pool.cards) - self.dealt
+
+    def _fresh_head(self) -> int:
+        """Pool position at slot `dealt`, doing that slot's Fisher–Yates step."""
+        if self.head is None:
+            i = self.dealt
+            j = self.rng.randrange(i, len(self.pool.cards))
+            swapped = self.swapped
+            # Slot i is dealt now and never looked at again: swap slots i
+            # and j, keep only j.
+            at_i = swapped.pop(i, i)
+            if j == i:
+                self.head = at_i
+            else:
+                self.head = swapped.get(j, j)
+                swapped[j] = at_i
+        return self.head
+
+    def _advance_fresh(self) -> None:
+        self.dealt += 1
+        self.head = None
+
+    def remaining(self) -> int:
+        return self._fresh_left() + len(self.skipped)
+
+    def current(self) -> Optional[int]:
+        if self._fresh_left() > 0:
+            return self._fresh_head()
+        if self.skipped:
+            return self.skipped[0]
+        return None
+
+    def draw(self) -> None:
+        """The current card was played: drop it."""
+        if self._fresh_left() > 0:
+            self._fresh_head()
+            self._advance_fresh()
+        elif self.skipped:
+            self.skipped.popleft()
+
+    def skip(self) -> None:
+        """Send the current card to the back of the queue."""
+        if self.remaining() <= 1:
+            return
+        if self._fresh_left() > 0:
+            self.skipped.append(self._fresh_head())
+            self._advance_fresh()
+        else:
+            self.skipped.rotate(-1)
+
+
+_lock = threading.Lock()
+_sessions: "OrderedDict[str, _Session]" = OrderedDict()  # least recently used first
+_pools: "OrderedDict[Tuple[Tuple[str, ...], int], _Pool]" = OrderedDict()
+
+
+def _evict_idle(now: float) -> None:
+    """Drop idle sessions, and the oldest ones beyond the cap (under _lock)."""
+    cutoff = now - settings.PLAY_SESSION_IDLE_SECONDS
+    while _sessions:
+        session_id, session = next(iter(_sessions.items()))
+        if session.last_used >= cutoff and len(_sessions) <= settings.PLAY_SESSION_MAX:
+            break
+        del _sessions[session_id]
+
+
+def _get_pool(deck_ids: Sequence[str]) -> _Pool:
+    """Return the merged pool for a deck set, building it on a cache miss."""
+    key_ids = tuple(sorted(set(deck_ids)))
+    index, version = db.load_index_and_version()
+    key = (key_ids, version)
+
+    with _lock:
+        pool = _pools.get(key)
+        if pool is not None:
+            _pools.move_to_end(key)
+            return pool
+
+    decks: List[Tuple[str, str, List[CompactCard]]] = []
+    for deck_id in key_ids:
+        meta = index.get_deck(deck_id)
+        if meta is None:
+            continue  # deleted since the client loaded its deck list
+        try:
+            cards = db.load_deck_cards(deck_id)
+        except db.DeckNotFoundError:
+            continue
+        if cards:
+            decks.append((deck_id, meta.name, cards))
+
+    pool = _Pool(decks)
+    with _lock:
+        _pools[key] = pool
+        while len(_pools) > max(1, settings.PLAY_POOL_CACHE_SIZE):
+            _pools.popitem(last=False)
+    return pool
+
+
+def _touch(session_id: str) -> _Session:
+    """Look up a session and mark it used (under _lock)."""
+    now = time.monotonic()
+    _evict_idle(now)
+    session = _sessions.get(session_id)
+    if session is None:
+        raise PlaySessionNotFoundError("Play session not found (it may have expired).")
+    session.last_used = now
+    _sessions.move_to_end(session_id)
+    return session
+
+
+def _state(session_id: str, session: _Session) -> Dict:
+    pool = session.pool
+    pos = session.current()
+    card = None
+    if pos is not None:
+        c = pool.cards[pos]
+        deck_idx = pool.deck_of[pos]
+        card = {
+            "word": c.word,
+            "taboo": list(c.taboo),
+            "deck_id": pool.deck_ids[deck_idx],
+            "deck_name": pool.deck_names[deck_idx],
+        }
+    return {
+        "session_id": session_id,
+        "total": len(pool.cards),
+        "remaining": session.remaining(),
+        "card": card,
+    }
+
+
+# ---------- Public API ----------
+
+
+def create_session(deck_ids: Sequence[str]) -> Dict:
+    """Start a shuffled run over the given decks. Raises EmptyPoolError."""
+    pool = _get_pool(deck_ids)
+    if not pool.cards:
+        raise EmptyPoolError("The selected decks don't have any stored cards.")
+
+    session_id = uuid4().hex
+    session = _Session(pool)
+    with _lock:
+        _sessions[session_id] = session
+        _evict_idle(session.last_used)
+        return _state(session_id, session)
+
+
+def get_session(session_id: str) -> Dict:
+    with _lock:
+        return _state(session_id, _touch(session_id))
+
+
+def draw(session_id: str) -> Dict:
+    with _lock:
+        session = _touch(session_id)
+        session.draw()
+        return _state(session_id, session)
+
+
+def skip(session_id: str) -> Dict:
+    with _lock:
+        session = _touch(session_id)
+        session.skip()
+        return _state(session_id, session)
+
+
+def reshuffle(session_id: str) -> Dict:
+    """Start a new shuffled run over the same cards."""
+    with _lock:
+        session = _touch(session_id)
+        session.reshuffle()
+        return _state(session_id, session)
+
+
+def end_session(session_id: str) -> None:
+    with _lock:
+        if _sessions.pop(session_id, None) is None:
+            raise PlaySessionNotFoundError("Play session not found (it may have expired).")
@@ -1,7 +1,28 @@
 # backend/app/sheet_parser.py
-import requests
-from typing import List, Dict, Any, Optional
+"""
+Read Google Sheets workbooks through the Sheets API.
+
+All calls are async and go through the shared pooled client
+(services/http_client.py, with the source cache in front), so fetching a
+workbook doesn't hold a threadpool worker while Google answers.
+"""
+import asyncio
+import json
+from urllib.parse import quote, urlencode
+
+from typing import List, Dict, Any, Callable, Optional, Sequence, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
 from app.config import settings
+from app.services.http_client import SourceFetch, cached_get
+
+
+# Only what parse_workbook() reads: the workbook title and each tab's
+# title + gid (the full metadata also carries every tab's grid properties,
+# formatting, protected ranges, ...).
+METADATA_FIELDS = "properties.title,sheets.properties(sheetId,title)"
+BATCH_VALUES_FIELDS = "valueRanges(values)"
 
 
 class GoogleSheetsError(Exception):
@@ -22,39 +43,96 @@ def extract_sheet_id(spreadsheet_url: str) -> str:
     return spreadsheet_url  # assume raw ID
 
 
-def fetch_workbook_metadata(sheet_id: str) -> Dict[str, Any]:
+def _api_url(path: str, params: Sequence[Tuple[str, str]] = ()) -> str:
+    """URL under GOOGLE_SHEETS_API_BASE, with the API key appended."""
+    params = list(params)
+    if settings.GOOGLE_SHEETS_API_KEY:
+        params.append(("key", settings.GOOGLE_SHEETS_API_KEY))
+    base = settings.GOOGLE_SHEETS_API_BASE.rstrip("/")
+    return f"{base}/{path}" + (f"?{urlencode(params)}" if params else "")
+
+
+def _a1_sheet_range(tab_name: str) -> str:
+    """A1 range covering a whole tab: 'My Tab' (quotes doubled inside)."""
+    return "'" + tab_name.replace("'", "''") + "'"
+
+
+async def fetch_workbook_metadata(sheet_id: str) -> Dict[str, Any]:
     """
-    Fetch workbook metadata (list of tabs) using the Sheets API.
+    Fetch workbook metadata (title and list of tabs) using the Sheets API,
+    limited to the fields we use.
     """
-    url = (
-        f"https://sheets.googleapis.com/v4/spreadsheets/{sheet_id}"
-        f"?key={settings.GOOGLE_SHEETS_API_KEY}"
-    )
-    resp = requests.get(url)
+    url = _api_url(f"spreadsheets/{quote(sheet_id)}", [("fields", METADATA_FIELDS)])
+    fetch = await cached_get(url)
 
-    if resp.status_code != 200:
-        raise GoogleSheetsError(f"Failed to fetch workbook metadata: {resp.text}")
+    if fetch.status_code != 200:
+        raise GoogleSheetsError(f"Failed to fetch workbook metadata: {fetch.text}")
 
-    return resp.json()
+    return json.loads(fetch.text)
 
 
-def fetch_tab_values(sheet_id: str, tab_name: str) -> List[List[str]]:
+async def fetch_values_batch(
+    sheet_id: str,
+    tab_names: Sequence[str],
+    major_dimension: str = "ROWS",
+    scope: Optional[str] = None,
+) -> Tuple[List[List[List[str]]], SourceFetch]:
     """
-    Fetch VALUES from a single sheet tab. Returns list of rows, each row is a list of cells.
-    """
-    url = (
-        f"https://sheets.googleapis.com/v4/spreadsheets/{sheet_id}"
-        f"/values/{tab_name}?key={settings.GOOGLE_SHEETS_API_KEY}"
-    )
-    resp = requests.get(url)
+    Fetch several whole tabs in one values:batchGet call.
 
-    if resp.status_code != 200:
+    Returns (values of each tab, in the order asked for; the fetch), where
+    each tab's values are rows (or columns, with major_dimension="COLUMNS").
+    With a `scope` the request is conditional on what that scope last
+    remembered: fetch.changed is False when Google answered 304.
+    """
+    params = [("ranges", _a1_sheet_range(name)) for name in tab_names]
+    params += [("majorDimension", major_dimension), ("fields", BATCH_VALUES_FIELDS)]
+    url = _api_url(f"spreadsheets/{quote(sheet_id)}/values:batchGet", params)
+    fetch = await cached_get(url, scope)
+
+    if fetch.status_code != 200:
+        first = f"tab '{tab_names[0]}'" if tab_names else "tabs"
+        more = f" (and {len(tab_names) - 1} more)" if len(tab_names) > 1 else ""
+        raise GoogleSheetsError(f"Failed to fetch {first} values{more}: {fetch.text}")
+
+    ranges = json.loads(fetch.text).get("valueRanges", [])
+    if len(ranges) != len(tab_names):
         raise GoogleSheetsError(
-            f"Failed to fetch tab '{tab_name}' values: {resp.text}"
+            f"Expected {len(tab_names)} value ranges from batchGet, got {len(ranges)}."
         )
+    return [r.get("values", []) for r in ranges], fetch
+
+
+async def fetch_all_values(
+    sheet_id: str,
+    tab_names: Sequence[str],
+    major_dimension: str = "ROWS",
+    progress: Optional[Callable[[int, int], None]] = None,
+    scope: Optional[str] = None,
+) -> Tuple[List[Tuple[List[List[str]], bool]], List[SourceFetch]]:
+    """
+    fetch_values_batch() over any number of tabs: SHEETS_BATCH_GET_MAX_RANGES
+    tabs per call, the calls running concurrently. Returns ((values,
+    changed) for each tab, in order; the fetches, to remember() once
+    applied).
 
-    data = resp.json()
-    return data.get("values", [])
+    `progress(tabs_done, tabs_total)` is called as calls complete.
+    """
+    size = max(1, settings.SHEETS_BATCH_GET_MAX_RANGES)
+    chunks = [list(tab_names[i:i + size]) for i in range(0, len(tab_names), size)]
+    done = 0
+
+    async def one(chunk: List[str]):
+        nonlocal done
+        values, fetch = await fetch_values_batch(sheet_id, chunk, major_dimension, scope)
+        done += len(chunk)
+        if progress:
+            progress(done, len(tab_names))
+        return [(tab_values, fetch.changed) for tab_values in values], fetch
+
+    results = await asyncio.gather(*(one(chunk) for chunk in chunks))
+    tab_values = [item for chunk_result, _fetch in results for item in chunk_result]
+    return tab_values, [fetch for _chunk_result, fetch in results]
 
 
 def parse_columns_to_cards(columnar_data: List[List[str]]) -> List[Dict[str, Any]]:
@@ -77,26 +155,29 @@ def parse_columns_to_cards(columnar_data: List[List[str]]) -> List[Dict[str, Any
     return cards
 
 
-def transpose_rows_to_columns(rows: List[List[str]]) -> List[List[str]]:
-    """
-    Sheets API returns row-major data. We need columns.
-    If one row is shorter than others, pad with empty strings.
-    """
-    if not rows:
-        return []
-
-    max_len = max(len(r) for r in rows)
-    padded = [r + [""] * (max_len - len(r)) for r in rows]
-
-    # Transpose
-    return list(map(list, zip(*padded)))
-
-
-def parse_workbook(spreadsheet_url_or_id: str) -> Dict[str, Any]:
+async def parse_workbook(
+    spreadsheet_url_or_id: str,
+    progress: Optional[Callable[[int, int], None]] = None,
+    skip_unchanged: bool = False,
+    scope: Optional[str] = None,
+) -> Dict[str, Any]:
     """
     Core function: Given a Google Sheets URL or ID,
     fetch all tabs and convert each tab into a deck structure.
 
+    Two round trips whatever the number of tabs (up to
+    SHEETS_BATCH_GET_MAX_RANGES): the tab list, then every tab's values in
+    one values:batchGet, asked for column by column so there's nothing to
+    transpose.
+
+    `progress(tabs_done, tabs_total)` is called after each batch, if given
+    (from the event loop).
+    With a `scope` ("workbook:<id>") the values are fetched conditionally
+    on what that workbook last stored; with skip_unchanged, tabs whose
+    values haven't changed since (304) are not parsed: their "cards" is
+    None. "sources" holds the fetches: pass the result to
+    remember_sources() once its cards are stored.
+
     Returns:
     {
         "sheet_id": "...",
@@ -108,38 +189,53 @@ def parse_workbook(spreadsheet_url_or_id: str) -> Dict[str, Any]:
                 "cards": [ {goal:"", taboos:[...]}, ... ]
             },
             ...
-        ]
+        ],
+        "sources": [SourceFetch, ...]
     }
     """
     sheet_id = extract_sheet_id(spreadsheet_url_or_id)
-    metadata = fetch_workbook_metadata(sheet_id)
+    metadata = await fetch_workbook_metadata(sheet_id)
 
     workbook_title = metadata.get("properties", {}).get("title", "Untitled Workbook")
     sheet_tabs = metadata.get("sheets", [])
 
     parsed_tabs = []
+    if progress:
+        progress(0, len(sheet_tabs))
 
-    for tab in sheet_tabs:
-        props = tab.get("properties", {})
-        tab_name = props.get("title")
-        gid = props.get("sheetId")
+    props = [tab.get("properties", {}) for tab in sheet_tabs]
+    tab_names = [p.get("title") for p in props]
 
-        # Fetch values for this tab
-        rows = fetch_tab_values(sheet_id, tab_name)
-
-        # Convert rows → columns → cards
-        columns = transpose_rows_to_columns(rows)
-        cards = parse_columns_to_cards(columns)
+    tab_values, sources = await fetch_all_values(
+        sheet_id, tab_names, major_dimension="COLUMNS", progress=progress, scope=scope
+    )
+    for tab_props, (columns, changed) in zip(props, tab_values):
+        if skip_unchanged and not changed:
+            cards = None
+        else:
+            # CPU work: keep it off the event loop.
+            cards = await run_in_threadpool(parse_columns_to_cards, columns)
 
         # Store info
         parsed_tabs.append({
-            "tab_name": tab_name,
-            "sheet_gid": gid,
+            "tab_name": tab_props.get("title"),
+            "sheet_gid": tab_props.get("sheetId"),
             "cards": cards
         })
 
     return {
         "sheet_id": sheet_id,
         "name": workbook_title,
-        "tabs": parsed_tabs
+        "tabs": parsed_tabs,
+        "sources": sources,
     }
+
+
+async def remember_sources(parsed: Dict[str, Any], scope: Optional[str] = None) -> None:
+    """
+    Keep the validators of a parse_workbook() result for the next
+    conditional reload (under `scope`, default the one it was parsed
+    with). Call it only after the tabs' cards are stored.
+    """
+    for fetch in parsed.get("sources", []):
+        await fetch.remember(scope)
@@ -0,0 +1,186 @@
+# backend/app/services/source_cache.py
+"""
+On-disk cache for Google Sheets / CSV source fetches.
+
+Entries are kept per (scope, URL): the scope names what the content was
+applied to -- "deck:<id>" for a CSV deck, "workbook:<id>" for a workbook's
+tabs. For each one whose response carried an ETag or Last-Modified we keep
+the body plus those validators in data/source_cache/, as one file so a
+single rename replaces both:
+
+    <sha256(scope, url)>.entry  {"scope", "url", "etag", "last_modified", "encoding", "size"}
+                                on the first line, then the raw response body
+
+The next fetch for that scope sends If-None-Match / If-Modified-Since. A
+304 means "same as what this deck / workbook already holds": callers then
+reuse the stored body, and the refresh paths skip parsing and the library
+write altogether (see deck_refresh.py and workbook_sync.reload_workbook).
+
+That only holds if an entry is written once its content is stored in the
+library, never at fetch time: a refresh that fetched a new version but
+failed to apply it must not get a 304 next time. Likewise two decks built
+from the same URL each have their own entry, so one being refreshed
+doesn't make the other look unchanged. http_client.cached_get() does the
+HTTP and hands back a SourceFetch whose remember() the caller calls after
+the write. The directory is capped at SOURCE_CACHE_MAX_BYTES;
+least recently used entries go first. Query parameters named "key" (the
+Sheets API key) are never written to disk.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from app.config import settings
+from app.stores import DATA_DIR
+
+
+CACHE_DIR = DATA_DIR / "source_cache"
+ENTRY_SUFFIX = ".entry"
+
+_lock = threading.Lock()
+
+
+def _path(url: str, scope: str) -> Path:
+    name = hashlib.sha256(f"{scope}\n{url}".encode("utf-8")).hexdigest()
+    return CACHE_DIR / f"{name}{ENTRY_SUFFIX}"
+
+
+def _redact(url: str) -> str:
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != "key"]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def _read_entry(url: str, scope: str) -> Optional[Tuple[Dict[str, Any], bytes]]:
+    """(meta, body) of an entry, read in one go, or None."""
+    try:
+        data = _path(url, scope).read_bytes()
+    except OSError:
+        return None
+    head, sep, body = data.partition(b"\n")
+    try:
+        meta = json.loads(head)
+    except ValueError:
+        return None
+    if not sep or not isinstance(meta, dict) or len(body) != meta.get("size"):
+        return None
+    return meta, body
+
+
+def _validators(meta: Mapping[str, Any]) -> Dict[str, str]:
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+    return headers
+
+
+def conditional_headers(url: str, scope: str) -> Dict[str, str]:
+    """If-None-Match / If-Modified-Since for a URL `scope` holds a copy of."""
+    if not settings.SOURCE_CACHE_ENABLED:
+        return {}
+    entry = _read_entry(url, scope)
+    return {} if entry is None else _validators(entry[0])
+
+
+def cached_text(url: str, scope: str, sent: Mapping[str, str]) -> Optional[str]:
+    """
+    The stored body after a 304 to a request that carried `sent`
+    (conditional_headers()), or None if we no longer have that copy -- it
+    may have been replaced since the headers were read.
+    """
+    entry = _read_entry(url, scope)
+    if entry is None:
+        return None
+    meta, body = entry
+    if _validators(meta) != dict(sent):
+        return None
+    try:
+        os.utime(_path(url, scope))  # mark as recently used
+    except OSError:
+        pass
+    return body.decode(meta.get("encoding") or "utf-8", errors="replace")
+
+
+def remember(
+    url: str,
+    scope: str,
+    body: bytes,
+    encoding: Optional[str],
+    headers: Mapping[str, str],
+) -> None:
+    """
+    Store a 200 response for `scope`, if it came with a validator to
+    revalidate by. Call it once the content has been applied.
+    """
+    if not settings.SOURCE_CACHE_ENABLED:
+        return
+    etag = headers.get("etag")
+    last_modified = headers.get("last-modified")
+    if not (etag or last_modified) or len(body) > settings.SOURCE_CACHE_MAX_BYTES:
+        # Nothing to revalidate with (or too big): drop any stale copy.
+        forget(url, scope)
+        return
+
+    meta = {
+        "scope": scope,
+        "url": _redact(url),
+        "etag": etag,
+        "last_modified": last_modified,
+        "encoding": encoding or "utf-8",
+        "size": len(body),
+    }
+    with _lock:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # Validators and body live in one file, switched by one rename: a
+        # reader never pairs one version's ETag with another's body.
+        fd, tmp = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(json.dumps(meta).encode("utf-8") + b"\n")
+                fh.write(body)
+            os.replace(tmp, _path(url, scope))
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        _enforce_limit()
+
+
+def forget(url: str, scope: str) -> None:
+    _path(url, scope).unlink(missing_ok=True)
+
+
+def clear() -> None:
+    """Drop every cached source."""
+    with _lock:
+        if CACHE_DIR.exists():
+            for path in CACHE_DIR.iterdir():
+                path.unlink(missing_ok=True)
+
+
+def _enforce_limit() -> None:
+    """Evict least recently used entries beyond SOURCE_CACHE_MAX_BYTES (under _lock)."""
+    entries = []
+    total = 0
+    for path in CACHE_DIR.glob(f"*{ENTRY_SUFFIX}"):
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        entries.append((st.st_mtime, path, st.st_size))
+        total += st.st_size
+
+    entries.sort()
+    for _used, path, size in entries:
+        if total <= settings.SOURCE_CACHE_MAX_BYTES:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
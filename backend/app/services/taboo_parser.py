@@ -1,20 +1,121 @@
 from __future__ import annotations
 
 import csv
-import io
-from typing import List
-
-import httpx
+from itertools import compress
+from typing import Iterable, Iterator, List, Optional
 
 from ..models import TabooCard
+from .http_client import SourceFetch, cached_get
+
+
+async def fetch_csv_source(url: str, scope: Optional[str] = None) -> SourceFetch:
+    """
+    Fetch CSV text from a URL (raises for an error status).
+
+    With a `scope` ("deck:<id>") it revalidates against what that deck
+    last stored (source_cache.py): if the server answers 304, the stored
+    text comes back with changed=False. Call remember() on the result once
+    the cards are stored.
+    """
+    fetch = await cached_get(url, scope)
+    if fetch.changed:
+        fetch.response.raise_for_status()
+    return fetch
 
 
 async def fetch_csv_text(url: str) -> str:
     """Fetch raw CSV text from a URL (e.g. a published Google Sheets link)."""
-    async with httpx.AsyncClient(timeout=20.0, follow_redirects=True) as client:
-        resp = await client.get(url)
-        resp.raise_for_status()
-        return resp.text
+    return (await fetch_csv_source(url)).text
+
+
+def _iter_lines(text: str) -> Iterator[str]:
+    """The lines of `text`, endings kept -- like iterating io.StringIO(text), without copying the text."""
+    start, size = 0, len(text)
+    while start < size:
+        end = text.find("\n", start) + 1 or size
+        yield text[start:end]
+        start = end
+
+
+class _Column:
+    """Parse state of one CSV column: its cards so far and the group being read."""
+
+    __slots__ = ("cards", "word", "taboo", "seen", "stopped")
+
+    def __init__(self, stopped: bool = False) -> None:
+        self.cards: List[TabooCard] = []
+        self.word = ""
+        self.taboo: List[str] = []
+        self.seen = False  # any non-blank cell in the current group
+        self.stopped = stopped
+
+    def end_group(self) -> None:
+        if self.word:
+            self.cards.append(TabooCard(word=self.word, taboo=self.taboo))
+        elif not self.seen:
+            self.stopped = True  # an all-blank group ends the column
+        # (a group with taboo words but no word is skipped)
+        self.word = ""
+        self.taboo = []
+        self.seen = False
+
+
+def parse_deck_from_lines(lines: Iterable[str], taboo_words_per_card: int) -> List[TabooCard]:
+    """
+    parse_deck_from_csv() over CSV lines, read one row at a time.
+
+    Only the state of each column's current group is kept (plus the cards
+    found so far), never the grid itself, so memory grows with the number
+    of columns and cards, not with rows x widest row -- on wide, mostly
+    empty sheets most of that grid is blank cells. `lines` can be any
+    iterable of lines (a file, io.StringIO, a line iterator over a body).
+    """
+    # Sanity: avoid nonsense / crashy values
+    if taboo_words_per_card < 1:
+        taboo_words_per_card = 1
+    group_size = 1 + taboo_words_per_card  # word row + N taboo rows
+
+    columns: List[_Column] = []
+    active: List[_Column] = []  # columns not stopped yet
+    offset = -1  # row within the current group
+
+    for row_index, row in enumerate(csv.reader(lines)):
+        offset = row_index % group_size
+        if len(row) > len(columns):
+            # A column first seen below its first group was blank there,
+            # i.e. it ended before it started.
+            late = row_index >= group_size
+            for _ in range(len(columns), len(row)):
+                column = _Column(stopped=late)
+                columns.append(column)
+                if not late:
+                    active.append(column)
+
+        # Only the non-empty cells (compress() skips the rest in C: wide
+        # rows are mostly empty strings).
+        for col_idx in compress(range(len(row)), row):
+            value = row[col_idx].strip()
+            column = columns[col_idx]
+            if not value or column.stopped:
+                continue
+            column.seen = True
+            if offset == 0:
+                column.word = value
+            elif column.word:
+                column.taboo.append(value)
+
+        if offset == group_size - 1:
+            for column in active:
+                column.end_group()
+            active = [c for c in active if not c.stopped]
+
+    # The last group may be cut short by the end of the sheet.
+    if offset != group_size - 1:
+        for column in active:
+            column.end_group()
+
+    # Column by column, top to bottom.
+    return [card for column in columns for card in column.cards]
 
 
 def parse_deck_from_csv(csv_text: str, taboo_words_per_card: int) -> List[TabooCard]:
@@ -40,57 +141,9 @@ def parse_deck_from_csv(csv_text: str, taboo_words_per_card: int) -> List[TabooC
 
     This lets you support decks with 1, 2, 4, 7, etc., taboo words per card,
     while still sharing the same parser.
-    """
-    # Sanity: avoid nonsense / crashy values
-    if taboo_words_per_card < 1:
-        taboo_words_per_card = 1
 
-    rows = list(csv.reader(io.StringIO(csv_text)))
-    cards: List[TabooCard] = []
-
-    if not rows:
-        return cards
-
-    max_cols = max(len(r) for r in rows)
-    max_rows = len(rows)
-    group_size = 1 + taboo_words_per_card  # word row + N taboo rows
-
-    def get_cell(r_index: int, c_index: int) -> str:
-        if 0 <= r_index < max_rows and 0 <= c_index < len(rows[r_index]):
-            return rows[r_index][c_index].strip()
-        return ""
-
-    for col_idx in range(max_cols):
-        start_row = 0
-        while start_row < max_rows:
-            # row 0 in the group → word
-            word = get_cell(start_row + 0, col_idx)
-
-            if not word:
-                # If the *entire* group is blank, stop processing this column
-                all_blank = True
-                for r in range(start_row, min(start_row + group_size, max_rows)):
-                    if get_cell(r, col_idx):
-                        all_blank = False
-                        break
-                if all_blank:
-                    break
-                # Otherwise skip this malformed group
-                start_row += group_size
-                continue
-
-            # rows 1..N → taboo words
-            taboo_words: List[str] = []
-            for offset in range(1, group_size):
-                r_index = start_row + offset
-                if r_index >= max_rows:
-                    break
-                val = get_cell(r_index, col_idx)
-                if val:
-                    taboo_words.append(val)
-
-            cards.append(TabooCard(word=word, taboo=taboo_words))
-
-            start_row += group_size
-
-    return cards
+    A group with taboo words but no word is skipped; an entirely blank
+    group ends its column. Cards come out column by column. The text is
+    read row by row without building the grid (parse_deck_from_lines).
+    """
+    return parse_deck_from_lines(_iter_lines(csv_text), taboo_words_per_card)
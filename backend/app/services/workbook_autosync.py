@@ -0,0 +1,215 @@
+# backend/app/services/workbook_autosync.py
+"""
+Scheduled background re-sync of registered workbooks.
+
+Without this, a workbook only updates when someone clicks reload. The
+scheduler runs on the app's event loop and wakes up every
+WORKBOOK_AUTOSYNC_CHECK_SECONDS:
+
+  - A workbook is stale once its last_synced (Mongo) is older than
+    WORKBOOK_AUTOSYNC_INTERVAL_SECONDS plus a fixed per-workbook jitter
+    (0..WORKBOOK_AUTOSYNC_JITTER_SECONDS, derived from its id). The jitter
+    spreads workbooks imported together over time instead of having them
+    all come due on the same tick, forever. Never-synced workbooks are
+    stale right away.
+  - Stale workbooks are reloaded oldest first, at most
+    WORKBOOK_AUTOSYNC_MAX_CONCURRENT at a time. Each reload is a regular
+    "workbook_reload" job (services/jobs.py) with the same dedupe key as
+    the reload button, so a manual reload and an automatic one never run
+    side by side, and both show up under GET /jobs/{id}.
+  - A workbook whose reload fails is retried after
+    WORKBOOK_AUTOSYNC_BACKOFF_SECONDS, doubling with every further failure
+    up to WORKBOOK_AUTOSYNC_BACKOFF_MAX_SECONDS (plus up to 10% random
+    jitter). One success resets it.
+
+Reloads only rewrite tabs whose values changed (see source_cache.py), so a
+sync of an untouched workbook costs a few conditional requests.
+
+State (failures, running syncs) lives in this process. With several
+workers each runs its own scheduler; since last_synced is shared through
+Mongo, a workbook synced by one worker is no longer stale for the others.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.models import Workbook
+from app.services import jobs, workbook_sync
+from app.services.crud_workbook import get_all_workbooks
+
+
+class _Failure:
+    __slots__ = ("count", "retry_at", "error")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.retry_at = 0.0  # time.monotonic()
+        self.error: Optional[str] = None
+
+
+_task: Optional[asyncio.Task] = None
+_sync_tasks: Set[asyncio.Task] = set()  # keep references until they finish
+_running: Set[str] = set()  # workbook ids with an auto-sync in flight
+_failures: Dict[str, _Failure] = {}
+_last_check: Optional[datetime] = None
+_synced = 0
+_failed = 0
+
+
+def _jitter(workbook_id: str) -> timedelta:
+    """Stable per-workbook offset in [0, WORKBOOK_AUTOSYNC_JITTER_SECONDS)."""
+    span = max(0.0, settings.WORKBOOK_AUTOSYNC_JITTER_SECONDS)
+    digest = hashlib.sha256(workbook_id.encode("utf-8")).digest()
+    fraction = int.from_bytes(digest[:8], "big") / 2 ** 64
+    return timedelta(seconds=span * fraction)
+
+
+def _backoff(failures: int) -> float:
+    base = max(1.0, settings.WORKBOOK_AUTOSYNC_BACKOFF_SECONDS)
+    delay = min(base * 2 ** (failures - 1), settings.WORKBOOK_AUTOSYNC_BACKOFF_MAX_SECONDS)
+    return delay * (1 + random.uniform(0, 0.1))
+
+
+def stale_workbooks(workbooks: List[Workbook], now: datetime) -> List[Workbook]:
+    """Workbooks due for a sync (`now` is naive UTC, like last_synced), oldest first."""
+    interval = timedelta(seconds=settings.WORKBOOK_AUTOSYNC_INTERVAL_SECONDS)
+    monotonic = time.monotonic()
+    due = []
+    for workbook in workbooks:
+        if not workbook.id or workbook.id in _running:
+            continue
+        failure = _failures.get(workbook.id)
+        if failure is not None and monotonic < failure.retry_at:
+            continue
+        last = workbook.last_synced
+        if last is not None and now < last + interval + _jitter(workbook.id):
+            continue
+        due.append(workbook)
+    due.sort(key=lambda w: w.last_synced or datetime.min)
+    return due
+
+
+async def _sync(workbook: Workbook) -> None:
+    global _synced, _failed
+
+    async def run(job: jobs.Job):
+        return await workbook_sync.reload_workbook(workbook.id, job.set_progress)
+
+    job = jobs.submit("workbook_reload", run, key=f"workbook:{workbook.id}")
+    try:
+        await jobs.wait(job)
+    finally:
+        _running.discard(workbook.id)
+
+    if job.status == jobs.SUCCEEDED:
+        _synced += 1
+        _failures.pop(workbook.id, None)
+        return
+
+    _failed += 1
+    failure = _failures.setdefault(workbook.id, _Failure())
+    failure.count += 1
+    failure.error = job.error
+    failure.retry_at = time.monotonic() + _backoff(failure.count)
+    print(
+        f"Auto-sync of workbook {workbook.name!r} failed ({failure.count}x), "
+        f"retrying in {failure.retry_at - time.monotonic():.0f}s: {job.error}"
+    )
+
+
+async def check_once() -> int:
+    """Start syncs for stale workbooks (up to the concurrency cap); return how many."""
+    global _last_check
+    workbooks = await run_in_threadpool(get_all_workbooks)
+    now = datetime.utcnow()
+    _last_check = now
+
+    # Forget backoff state of workbooks that were deleted meanwhile.
+    ids = {w.id for w in workbooks}
+    for workbook_id in list(_failures):
+        if workbook_id not in ids:
+            del _failures[workbook_id]
+
+    free = max(1, settings.WORKBOOK_AUTOSYNC_MAX_CONCURRENT) - len(_running)
+    started = 0
+    for workbook in stale_workbooks(workbooks, now)[: max(0, free)]:
+        _running.add(workbook.id)
+        task = asyncio.get_running_loop().create_task(
+            _sync(workbook), name=f"workbook-autosync-{workbook.id}"
+        )
+        _sync_tasks.add(task)
+        task.add_done_callback(_sync_tasks.discard)
+        started += 1
+    return started
+
+
+async def _loop() -> None:
+    period = max(1.0, settings.WORKBOOK_AUTOSYNC_CHECK_SECONDS)
+    # Random first delay: several workers started together don't all check
+    # (and pick the same workbooks) at the same moment.
+    await asyncio.sleep(random.uniform(0, period))
+    while True:
+        try:
+            await check_once()
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            print("Workbook auto-sync check failed:", exc)
+        await asyncio.sleep(period)
+
+
+def start() -> bool:
+    """Start the scheduler on the running loop (app startup). False if disabled."""
+    global _task
+    if not settings.WORKBOOK_AUTOSYNC_ENABLED:
+        return False
+    if not settings.GOOGLE_SHEETS_API_KEY:
+        print("Workbook auto-sync disabled: GOOGLE_SHEETS_API_KEY is not set.")
+        return False
+    if _task is None or _task.done():
+        _task = asyncio.get_running_loop().create_task(_loop(), name="workbook-autosync")
+    return True
+
+
+async def stop() -> None:
+    """
+    Stop the scheduler (app shutdown). The reloads themselves are jobs;
+    jobs.shutdown() cancels those.
+    """
+    global _task
+    tasks = [t for t in (_task, *_sync_tasks) if t is not None and not t.done()]
+    _task = None
+    for task in tasks:
+        task.cancel()
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def status() -> Dict[str, Any]:
+    """Scheduler state for GET /admin/workbooks/autosync."""
+    now = time.monotonic()
+    return {
+        "enabled": _task is not None and not _task.done(),
+        "interval_seconds": settings.WORKBOOK_AUTOSYNC_INTERVAL_SECONDS,
+        "last_check": _last_check,
+        "running": sorted(_running),
+        "synced": _synced,
+        "failed": _failed,
+        "backing_off": [
+            {
+                "workbook_id": workbook_id,
+                "failures": failure.count,
+                "retry_in_seconds": max(0.0, round(failure.retry_at - now, 1)),
+                "error": failure.error,
+            }
+            for workbook_id, failure in _failures.items()
+        ],
+    }
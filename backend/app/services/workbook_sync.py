@@ -0,0 +1,162 @@
+# backend/app/services/workbook_sync.py
+"""
+Import / reload a Google Sheets workbook into the library.
+
+These are the bodies of POST /admin/workbooks/add and .../{id}/reload,
+kept here so they can run as background jobs (services/jobs.py). Both
+are async: the Sheets calls go through the shared async client, the Mongo
+and library writes run in the threadpool.
+"""
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.duplicate_index import duplicate_report, merge_reports
+from app.models import Workbook, WorkbookTab
+from app.services.crud_deck import create_deck, update_deck_cards
+from app.services.crud_workbook import (
+    create_workbook,
+    get_workbook_by_id,
+    update_last_synced,
+    update_workbook,
+)
+from app.services.sheet_parser import parse_workbook, remember_sources
+
+
+Progress = Optional[Callable[[int, int], None]]
+
+
+class WorkbookNotFoundError(Exception):
+    pass
+
+
+async def import_workbook(sheet_url: str, progress: Progress = None) -> Dict[str, Any]:
+    """
+    Parse every tab of a workbook, create one deck per tab, store the
+    workbook. The result reports goal words that already existed elsewhere
+    in the library (including earlier tabs of this workbook).
+    """
+    parsed = await parse_workbook(sheet_url, progress)
+    result = await run_in_threadpool(_store_imported_workbook, parsed)
+    # Its decks hold exactly these values now: the first reload can
+    # revalidate them instead of rewriting every tab.
+    await _remember_sources(parsed, result["workbook_id"])
+    return result
+
+
+def _store_imported_workbook(parsed: Dict[str, Any]) -> Dict[str, Any]:
+    # Build workbook object WITHOUT deck IDs yet
+    workbook = Workbook(
+        workbook_id=parsed["sheet_id"],
+        name=parsed["name"],
+        tabs=[
+            WorkbookTab(
+                tab_name=t["tab_name"],
+                sheet_gid=t["sheet_gid"],
+                deck_id=None,
+            )
+            for t in parsed["tabs"]
+        ],
+    )
+
+    # Insert and get Mongo ObjectId
+    workbook_id = create_workbook(workbook)
+
+    # Now create decks for each tab and wire deck IDs back into the workbook
+    reports = []
+    for tab_data in parsed["tabs"]:
+        tab_url = (
+            f"https://docs.google.com/spreadsheets/d/{parsed['sheet_id']}/edit"
+            f"#gid={tab_data['sheet_gid']}"
+        )
+
+        reports.append(duplicate_report(c["goal"] for c in tab_data["cards"]))
+        deck_id = create_deck(
+            name=tab_data["tab_name"],
+            cards=tab_data["cards"],
+            source=tab_url,  # Used by UI "Sheet" button
+            workbook_id=workbook_id,
+            sheet_gid=tab_data["sheet_gid"],
+            tab_name=tab_data["tab_name"],
+        )
+
+        # Attach deck_id to matching workbook tab
+        for t in workbook.tabs:
+            if t.tab_name == tab_data["tab_name"] and t.sheet_gid == tab_data["sheet_gid"]:
+                t.deck_id = deck_id
+                break
+
+    # Save workbook with deck IDs included
+    update_workbook(workbook_id, workbook)
+    update_last_synced(workbook_id)
+
+    return {
+        "message": "Workbook imported.",
+        "workbook_id": workbook_id,
+        "duplicates": merge_reports(reports),
+    }
+
+
+async def reload_workbook(workbook_id: str, progress: Progress = None) -> Dict[str, Any]:
+    """
+    Re-parse a workbook and replace its decks' cards (deck ids stay the
+    same). Tabs that haven't changed since the last successful reload (or
+    the import) are skipped; if storing fails, the next reload fetches and
+    applies everything again.
+    """
+    workbook = await run_in_threadpool(get_workbook_by_id, workbook_id)
+    if not workbook:
+        raise WorkbookNotFoundError("Workbook not found.")
+
+    parsed = await parse_workbook(
+        workbook.workbook_id, progress, skip_unchanged=True, scope=_scope(workbook_id)
+    )
+    result = await run_in_threadpool(_apply_reload, workbook_id, workbook, parsed)
+    await _remember_sources(parsed, workbook_id)
+    return result
+
+
+def _scope(workbook_id: str) -> str:
+    """Source-cache scope of a workbook's tab values (source_cache.py)."""
+    return f"workbook:{workbook_id}"
+
+
+async def _remember_sources(parsed: Dict[str, Any], workbook_id: str) -> None:
+    try:
+        await remember_sources(parsed, _scope(workbook_id))
+    except OSError as exc:
+        print(f"Failed to cache the sources of workbook {workbook_id}: {exc}")
+
+
+def _apply_reload(workbook_id: str, workbook: Workbook, parsed: Dict[str, Any]) -> Dict[str, Any]:
+    updated = unchanged = 0
+    reports = []
+    # Update decks: keep deck IDs the same, just replace cards
+    for tab_data in parsed["tabs"]:
+        if tab_data["cards"] is None:
+            unchanged += 1
+            continue
+        # Find the corresponding tab by name
+        tab = next(
+            (t for t in workbook.tabs if t.tab_name == tab_data["tab_name"]),
+            None,
+        )
+        if not tab or not tab.deck_id:
+            continue
+
+        reports.append(
+            duplicate_report((c["goal"] for c in tab_data["cards"]), exclude_deck_id=tab.deck_id)
+        )
+        update_deck_cards(tab.deck_id, tab_data["cards"])
+        updated += 1
+
+    update_last_synced(workbook_id)
+    return {
+        "message": "Workbook reloaded.",
+        "workbook_id": workbook_id,
+        "updated_tabs": updated,
+        "unchanged_tabs": unchanged,
+        "duplicates": merge_reports(reports),
+    }
@@ -0,0 +1,42 @@
+"""
+Persistence backends behind app.db.
+
+Each backend is a module exposing the same small set of functions:
+
+    stamp()                     cheap token that changes whenever the data does
+    read_index()                -> (LibraryIndex, version)
+    card_stamp(deck_id)         cheap token that changes when a deck's cards do
+    read_cards(deck_id)         -> List[CompactCard]
+    write_lock()                context manager held around every write
+    persist(index, records, cards, version)
+                                store accepted records (+ their cards)
+    save_all(index, cards, version)
+                                replace everything (bulk path / migrations)
+    read_changes(since)         -> the records with seq > since it still
+                                   keeps, in order (may start late)
+    after_commit()              housekeeping hook (e.g. journal compaction)
+    compact()                   fold pending changes into the base files now
+
+app.db owns caching, the writer thread and the mutation semantics; the
+stores only move bytes. Writes accept TabooCards or CompactCards (anything
+with .word / .taboo); reads return CompactCards. Pick one with settings.LIBRARY_BACKEND.
+"""
+from pathlib import Path
+from types import ModuleType
+
+from ..config import settings
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+DATA_DIR.mkdir(parents=True, exist_ok=True)
+
+
+def get_store() -> ModuleType:
+    """Return the backend module selected by settings.LIBRARY_BACKEND."""
+    backend = (settings.LIBRARY_BACKEND or "json").lower()
+    if backend == "sqlite":
+        from . import sqlite_store
+        return sqlite_store
+    if backend == "json":
+        from . import json_store
+        return json_store
+    raise ValueError(f"Unknown LIBRARY_BACKEND: {settings.LIBRARY_BACKEND!r}")
@@ -0,0 +1,442 @@
+"""
+Compact binary snapshot format for the library.
+
+Layout of every blob:
+
+    b"TLIB" | format version (u8) | kind (u8) | zlib(payload)
+
+payload (all integers little-endian u32):
+
+    n_strings | n_ints | blob_bytes
+    n_strings x string length (in characters)
+    n_ints    x int stream (structure below, strings as string-table indexes)
+    blob_bytes of UTF-8: every distinct string, concatenated
+
+Each distinct string (deck names, words, and the heavily repeated taboo
+words) is stored once and decoded (and interned) once; every card that
+uses it shares the same str object. Cards decode straight into
+CompactCard tuples and deck metadata into model_construct() -- the data
+was validated when it was written -- so no json.loads and no Pydantic
+validation on cold start.
+
+Int stream by kind:
+
+    KIND_LIBRARY: version, n_categories, category..., n_decks,
+                  per deck: id, name, category, card_count, source_type,
+                  source, taboo_words_per_card, n_cards + 1 (0 = no cards),
+                  then per card: word, n_taboo, taboo...
+    KIND_CARDS:   n_cards, then per card as above
+
+CLI:
+
+    python -m app.stores.binary_snapshot to-binary library.json library.tlib
+    python -m app.stores.binary_snapshot to-json library.tlib library.json
+    python -m app.stores.binary_snapshot verify [library.json]
+    python -m app.stores.binary_snapshot convert-store
+
+convert-store rewrites the live JSON store's snapshot and card files in
+the format selected by LIBRARY_SNAPSHOT_FORMAT.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import struct
+import sys
+import time
+import zlib
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ..compact_cards import AnyCard, CompactCard, to_taboo_cards
+from ..models import Deck, DeckMeta, LibraryIndex, LibraryState
+
+
+MAGIC = b"TLIB"
+FORMAT_VERSION = 1
+
+KIND_LIBRARY = 1
+KIND_CARDS = 2
+
+_HEADER = struct.Struct("<4sBB")
+_COUNTS = struct.Struct("<III")
+
+
+class SnapshotError(Exception):
+    """The blob is not a snapshot this code can read (or is damaged)."""
+    pass
+
+
+def _u32_array(values: Sequence[int]) -> array:
+    arr = array("I", values)
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr
+
+
+class _Writer:
+    """Collects the string table and int stream while encoding."""
+
+    def __init__(self) -> None:
+        self.strings: List[str] = []
+        self.string_ids: Dict[str, int] = {}
+        self.ints: List[int] = []
+
+    def s(self, value: str) -> None:
+        idx = self.string_ids.get(value)
+        if idx is None:
+            idx = len(self.strings)
+            self.string_ids[value] = idx
+            self.strings.append(value)
+        self.ints.append(idx)
+
+    def i(self, value: int) -> None:
+        self.ints.append(value)
+
+    def cards(self, cards: Sequence[AnyCard]) -> None:
+        for card in cards:
+            self.s(card.word)
+            self.i(len(card.taboo))
+            for taboo in card.taboo:
+                self.s(taboo)
+
+    def finish(self, kind: int, level: int = 6) -> bytes:
+        blob = "".join(self.strings).encode("utf-8")
+        payload = b"".join(
+            (
+                _COUNTS.pack(len(self.strings), len(self.ints), len(blob)),
+                _u32_array([len(s) for s in self.strings]).tobytes(),
+                _u32_array(self.ints).tobytes(),
+                blob,
+            )
+        )
+        return _HEADER.pack(MAGIC, FORMAT_VERSION, kind) + zlib.compress(payload, level)
+
+
+class _Reader:
+    """Walks the int stream, resolving string-table indexes."""
+
+    def __init__(self, data: bytes, expected_kind: int) -> None:
+        if len(data) < _HEADER.size:
+            raise SnapshotError("Snapshot is truncated.")
+        magic, fmt, kind = _HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise SnapshotError("Not a library snapshot.")
+        if fmt != FORMAT_VERSION:
+            raise SnapshotError(f"Unsupported snapshot format version {fmt}.")
+        if kind != expected_kind:
+            raise SnapshotError(f"Expected snapshot kind {expected_kind}, got {kind}.")
+
+        try:
+            payload = zlib.decompress(data[_HEADER.size:])
+        except zlib.error as exc:
+            raise SnapshotError(f"Snapshot is corrupt: {exc}") from exc
+
+        if len(payload) < _COUNTS.size:
+            raise SnapshotError("Snapshot is corrupt: payload is truncated.")
+        n_strings, n_ints, blob_bytes = _COUNTS.unpack_from(payload)
+        if _COUNTS.size + 4 * (n_strings + n_ints) + blob_bytes != len(payload):
+            raise SnapshotError("Snapshot is corrupt: counts don't match the payload.")
+        offset = _COUNTS.size
+        lengths = array("I")
+        lengths.frombytes(payload[offset:offset + 4 * n_strings])
+        offset += 4 * n_strings
+        ints = array("I")
+        ints.frombytes(payload[offset:offset + 4 * n_ints])
+        offset += 4 * n_ints
+        if sys.byteorder != "little":
+            lengths.byteswap()
+            ints.byteswap()
+
+        try:
+            text = payload[offset:offset + blob_bytes].decode("utf-8")
+        except UnicodeDecodeError as exc:
+            raise SnapshotError(f"Snapshot is corrupt: {exc}") from exc
+        if sum(lengths) != len(text):
+            raise SnapshotError("Snapshot is corrupt: string lengths don't match the text.")
+        strings: List[str] = []
+        pos = 0
+        intern = sys.intern
+        for length in lengths:
+            strings.append(intern(text[pos:pos + length]))
+            pos += length
+
+        self.strings = strings
+        self.ints = ints
+        self.pos = 0
+
+    def i(self) -> int:
+        value = self.ints[self.pos]
+        self.pos += 1
+        return value
+
+    def s(self) -> str:
+        value = self.strings[self.ints[self.pos]]
+        self.pos += 1
+        return value
+
+    def cards(self, n_cards: int) -> List[CompactCard]:
+        ints, strings = self.ints, self.strings
+        new_card = tuple.__new__
+        pos = self.pos
+        cards: List[CompactCard] = []
+        # Nothing here can form a reference cycle; skip the collector passes
+        # that hundreds of thousands of fresh objects would otherwise trigger.
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for _ in range(n_cards):
+                word = strings[ints[pos]]
+                n_taboo = ints[pos + 1]
+                pos += 2
+                taboo = tuple([strings[i] for i in ints[pos:pos + n_taboo]])
+                pos += n_taboo
+                cards.append(new_card(CompactCard, (word, taboo)))
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        self.pos = pos
+        return cards
+
+    def finish(self) -> None:
+        """Check the int stream was used up exactly."""
+        if self.pos != len(self.ints):
+            raise SnapshotError("Snapshot is corrupt: int stream length doesn't match.")
+
+
+def _short_stream(exc: IndexError) -> SnapshotError:
+    """An IndexError while walking the int stream means a damaged blob."""
+    return SnapshotError(f"Snapshot is corrupt: {exc}")
+
+
+# ---------- Encode / decode ----------
+
+
+def _encode_decks(
+    w: _Writer,
+    decks: Sequence[DeckMeta],
+    cards: Optional[Dict[str, Sequence[AnyCard]]],
+) -> None:
+    w.i(len(decks))
+    for d in decks:
+        w.s(d.id)
+        w.s(d.name)
+        w.s(d.category)
+        w.i(d.card_count)
+        w.s(d.source_type)
+        w.s(d.source)
+        w.i(d.taboo_words_per_card)
+        deck_cards = None if cards is None else cards.get(d.id)
+        if deck_cards is None:
+            w.i(0)
+        else:
+            w.i(len(deck_cards) + 1)
+            w.cards(deck_cards)
+
+
+def _decode(data: bytes) -> Tuple[List[str], List[Tuple[DeckMeta, Optional[List[CompactCard]]]], int]:
+    r = _Reader(data, KIND_LIBRARY)
+    try:
+        version = r.i()
+        categories = [r.s() for _ in range(r.i())]
+        decks: List[Tuple[DeckMeta, Optional[List[CompactCard]]]] = []
+        for _ in range(r.i()):
+            meta = DeckMeta.model_construct(
+                id=r.s(),
+                name=r.s(),
+                category=r.s(),
+                card_count=r.i(),
+                source_type=r.s(),
+                source=r.s(),
+                taboo_words_per_card=r.i(),
+            )
+            n_cards = r.i()
+            decks.append((meta, r.cards(n_cards - 1) if n_cards else None))
+    except IndexError as exc:
+        raise _short_stream(exc) from exc
+    r.finish()
+    return categories, decks, version
+
+
+def peek_version(data: bytes) -> Optional[int]:
+    """
+    The version stored at the start of a library blob, read without
+    decoding the rest -- works on a blob whose tail is damaged. None if
+    even that much can't be read.
+    """
+    try:
+        magic, fmt, kind = _HEADER.unpack_from(data)
+        if magic != MAGIC or fmt != FORMAT_VERSION or kind != KIND_LIBRARY:
+            return None
+        # Decompress only as far as the data goes; a cut-off stream is fine.
+        payload = zlib.decompressobj().decompress(data[_HEADER.size:])
+        n_strings, _n_ints, _blob_bytes = _COUNTS.unpack_from(payload)
+        (version,) = struct.unpack_from("<I", payload, _COUNTS.size + 4 * n_strings)
+        return version
+    except (struct.error, zlib.error):
+        return None
+
+
+def encode_index(index: LibraryIndex, version: int) -> bytes:
+    """Categories + deck metadata, no cards."""
+    w = _Writer()
+    w.i(version)
+    w.i(len(index.categories))
+    for name in index.categories:
+        w.s(name)
+    _encode_decks(w, index.decks, None)
+    return w.finish(KIND_LIBRARY)
+
+
+def decode_index(data: bytes) -> Tuple[LibraryIndex, int]:
+    categories, decks, version = _decode(data)
+    index = LibraryIndex.model_construct(
+        categories=categories, decks=[meta for meta, _ in decks]
+    )
+    return index, version
+
+
+def encode_library(state: LibraryState, version: int = 0) -> bytes:
+    """The whole library, cards included."""
+    w = _Writer()
+    w.i(version)
+    w.i(len(state.categories))
+    for name in state.categories:
+        w.s(name)
+    _encode_decks(w, state.decks, {d.id: d.cards for d in state.decks})
+    return w.finish(KIND_LIBRARY)
+
+
+def decode_library(data: bytes) -> Tuple[LibraryState, int]:
+    categories, decks, version = _decode(data)
+    full = [
+        Deck.model_construct(**dict(meta), cards=to_taboo_cards(cards or []))
+        for meta, cards in decks
+    ]
+    return LibraryState.model_construct(categories=categories, decks=full), version
+
+
+def encode_cards(cards: Sequence[AnyCard]) -> bytes:
+    """One deck's cards (a card segment)."""
+    w = _Writer()
+    w.i(len(cards))
+    w.cards(cards)
+    return w.finish(KIND_CARDS)
+
+
+def decode_cards(data: bytes) -> List[CompactCard]:
+    r = _Reader(data, KIND_CARDS)
+    try:
+        cards = r.cards(r.i())
+    except IndexError as exc:
+        raise _short_stream(exc) from exc
+    r.finish()
+    return cards
+
+
+# ---------- CLI ----------
+
+
+def _read_json_library(path: Path) -> Tuple[LibraryState, int]:
+    raw = json.loads(path.read_text(encoding="utf-8"))
+    return LibraryState.model_validate(raw), int(raw.get("version", 0))
+
+
+def _cmd_to_binary(args: argparse.Namespace) -> None:
+    state, version = _read_json_library(Path(args.src))
+    data = encode_library(state, version)
+    Path(args.dst).write_bytes(data)
+    print(f"Wrote {args.dst}: {len(data):,} bytes ({len(state.decks)} decks)")
+
+
+def _cmd_to_json(args: argparse.Namespace) -> None:
+    state, version = decode_library(Path(args.src).read_bytes())
+    payload = state.model_dump()
+    payload["version"] = version
+    Path(args.dst).write_text(
+        json.dumps(payload, indent=2, ensure_ascii=False), encoding="utf-8"
+    )
+    print(f"Wrote {args.dst} ({len(state.decks)} decks)")
+
+
+def _cmd_verify(args: argparse.Namespace) -> None:
+    if args.src:
+        src = Path(args.src)
+        json_bytes = src.read_bytes()
+        state, version = _read_json_library(src)
+    else:
+        from .. import db
+
+        state, version = db.load_library(), db.get_library_version()
+        json_bytes = json.dumps(state.model_dump(), ensure_ascii=False).encode("utf-8")
+
+    data = encode_library(state, version)
+
+    t0 = time.perf_counter()
+    LibraryState.model_validate(json.loads(json_bytes))
+    t_json = time.perf_counter() - t0
+
+    # Timed the way the store loads it: compact cards, no TabooCards.
+    t0 = time.perf_counter()
+    _decode(data)
+    t_bin = time.perf_counter() - t0
+
+    decoded, decoded_version = decode_library(data)
+
+    if decoded.model_dump() != state.model_dump() or decoded_version != version:
+        print("FAIL: round-trip does not match the source library")
+        raise SystemExit(1)
+
+    n_cards = sum(len(d.cards) for d in state.decks)
+    print(f"OK: {len(state.decks)} decks, {n_cards} cards round-trip exactly")
+    print(f"  json:   {len(json_bytes):>12,} bytes  load {t_json * 1000:8.1f} ms")
+    print(f"  binary: {len(data):>12,} bytes  load {t_bin * 1000:8.1f} ms")
+
+
+def _cmd_convert_store(args: argparse.Namespace) -> None:
+    from ..config import settings
+    from . import json_store
+
+    decks, cards = json_store.convert_files()
+    print(
+        f"Rewrote {decks} decks / {cards} cards as "
+        f"{settings.LIBRARY_SNAPSHOT_FORMAT!r} in {json_store.DATA_DIR}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Convert/verify binary library snapshots.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("to-binary", help="Full library JSON -> binary snapshot.")
+    p.add_argument("src")
+    p.add_argument("dst")
+    p.set_defaults(func=_cmd_to_binary)
+
+    p = sub.add_parser("to-json", help="Binary snapshot -> full library JSON.")
+    p.add_argument("src")
+    p.add_argument("dst")
+    p.set_defaults(func=_cmd_to_json)
+
+    p = sub.add_parser(
+        "verify",
+        help="Round-trip a library JSON file (default: the live library) "
+        "through the binary format and compare sizes/load times.",
+    )
+    p.add_argument("src", nargs="?")
+    p.set_defaults(func=_cmd_verify)
+
+    p = sub.add_parser(
+        "convert-store",
+        help="Rewrite the JSON store's files in LIBRARY_SNAPSHOT_FORMAT.",
+    )
+    p.set_defaults(func=_cmd_convert_store)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
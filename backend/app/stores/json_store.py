@@ -0,0 +1,557 @@
+"""
+JSON-file library store (the default backend).
+
+Layout inside app/data:
+
+    library.json      index snapshot: categories + deck metadata + version
+    library.journal   one compact JSON record per mutation since the snapshot
+    decks/<id>.json   one file of cards per deck
+    library.lock      flock'd around every write
+
+With LIBRARY_SNAPSHOT_FORMAT=binary the snapshot is library.tlib and card
+files are decks/<id>.tcards (see binary_snapshot.py). Files in the other
+format are still read, and replaced as they are rewritten.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+
+from pydantic import ValidationError
+
+from ..config import settings
+from ..compact_cards import AnyCard, CompactCard, card_to_dict, make_card
+from ..library_ops import LibraryError, apply_record, flatten_record
+from ..models import LibraryIndex, TabooCard
+from . import DATA_DIR
+from . import binary_snapshot
+
+
+# Index snapshot: categories + deck metadata (no cards).
+LIBRARY_FILE = DATA_DIR / "library.json"
+LIBRARY_BINARY_FILE = DATA_DIR / "library.tlib"
+JOURNAL_FILE = DATA_DIR / "library.journal"
+
+# Held (flock) by whichever process is writing the library.
+LOCK_FILE = DATA_DIR / "library.lock"
+# How many times the current thread holds write_lock() (it is re-entrant).
+_lock_depth = threading.local()
+
+# One file of cards per deck: data/decks/<deck_id>.json (or .tcards)
+CARDS_SUFFIX = ".json"
+CARDS_BINARY_SUFFIX = ".tcards"
+DECKS_DIR = DATA_DIR / "decks"
+DECKS_DIR.mkdir(parents=True, exist_ok=True)
+
+# Number of records currently sitting in the journal (drives compaction).
+_journal_records = 0
+_compaction_running = False
+_compaction_lock = threading.Lock()
+
+
+def _default_index() -> LibraryIndex:
+    """Return a fresh default library index."""
+    return LibraryIndex(categories=["Uncategorized"], decks=[])
+
+
+def _stat_stamp(path: Path) -> Optional[Tuple[int, int]]:
+    """Return (mtime_ns, size) of a file, or None if missing."""
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _set_aside(path: Path) -> Path:
+    """Keep a copy of an unreadable file next to it instead of losing it."""
+    backup = path.with_name(f"{path.name}.corrupt-{int(time.time())}")
+    backup.write_bytes(path.read_bytes())
+    return backup
+
+
+def _fsync_dir(path: Path) -> None:
+    """fsync a directory so a rename inside it is durable (POSIX only)."""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    """Write to a temp file, fsync it, then rename over the target."""
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, "wb") as fh:
+        fh.write(data)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+    _fsync_dir(path.parent)
+
+
+def _dumps(payload: Any) -> str:
+    """Compact JSON used for the snapshot, journal records and card files."""
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+
+
+def _binary() -> bool:
+    """True if snapshot/card files should be written in the binary format."""
+    return (settings.LIBRARY_SNAPSHOT_FORMAT or "json").lower() == "binary"
+
+
+# ---------- Per-deck card files ----------
+
+
+def _cards_paths(deck_id: str) -> Tuple[Path, Path]:
+    """(preferred, other) card file paths for a deck."""
+    json_path = DECKS_DIR / f"{deck_id}{CARDS_SUFFIX}"
+    binary_path = DECKS_DIR / f"{deck_id}{CARDS_BINARY_SUFFIX}"
+    return (binary_path, json_path) if _binary() else (json_path, binary_path)
+
+
+def _find_cards_path(deck_id: str) -> Optional[Path]:
+    for path in _cards_paths(deck_id):
+        if path.exists():
+            return path
+    return None
+
+
+def _unlink_cards(deck_id: str) -> None:
+    for path in _cards_paths(deck_id):
+        path.unlink(missing_ok=True)
+
+
+def _write_cards(deck_id: str, cards: List[AnyCard]) -> None:
+    path, other = _cards_paths(deck_id)
+    if path.suffix == CARDS_BINARY_SUFFIX:
+        data = binary_snapshot.encode_cards(cards)
+    else:
+        data = _dumps([card_to_dict(c) for c in cards]).encode("utf-8")
+    _atomic_write(path, data)
+    other.unlink(missing_ok=True)
+
+
+def card_stamp(deck_id: str) -> Optional[Tuple[str, int, int]]:
+    path = _find_cards_path(deck_id)
+    if path is None:
+        return None
+    st = _stat_stamp(path)
+    return None if st is None else (path.suffix, *st)
+
+
+def read_cards(deck_id: str) -> List[CompactCard]:
+    path = _find_cards_path(deck_id)
+    if path is None:
+        return []
+    if path.suffix == CARDS_BINARY_SUFFIX:
+        return binary_snapshot.decode_cards(path.read_bytes())
+    raw = json.loads(path.read_text(encoding="utf-8"))
+    return [make_card(c["word"], c["taboo"]) for c in raw]
+
+
+# ---------- Snapshot + journal I/O ----------
+
+
+def _snapshot_paths() -> Tuple[Path, Path]:
+    """(preferred, other) index snapshot paths."""
+    if _binary():
+        return LIBRARY_BINARY_FILE, LIBRARY_FILE
+    return LIBRARY_FILE, LIBRARY_BINARY_FILE
+
+
+# What a damaged snapshot can raise while being decoded. Anything else
+# (OSError: EMFILE, EIO, ...) is not the file's fault and must not get it
+# moved aside.
+_SNAPSHOT_ERRORS = (ValueError, ValidationError, binary_snapshot.SnapshotError)
+
+
+def _decode_snapshot(path: Path) -> Tuple[LibraryIndex, int, Dict[str, List[TabooCard]]]:
+    """
+    Parse a snapshot file. Returns (index, version, inline cards): older
+    library.json files stored every deck's cards inline, and those are
+    handed back by deck id for _fix_snapshot() to move into card files.
+    """
+    data = path.read_bytes()
+    if path == LIBRARY_BINARY_FILE:
+        index, version = binary_snapshot.decode_index(data)
+        return index, version, {}
+
+    raw = json.loads(data)
+    if not isinstance(raw, dict):
+        raise ValueError("library.json is not a JSON object")
+    version = raw.get("version", 0)
+    if not isinstance(version, int):
+        raise ValueError(f"library.json has a bad version: {version!r}")
+    inline: Dict[str, List[TabooCard]] = {}
+    decks = raw.get("decks")
+    if isinstance(decks, list):
+        for deck in decks:
+            if isinstance(deck, dict) and "cards" in deck:
+                cards = deck.pop("cards")
+                if not isinstance(cards, list):
+                    raise ValueError(f"deck {deck.get('id')!r} has bad inline cards")
+                inline[deck.get("id")] = [TabooCard.model_validate(c) for c in cards]
+    return LibraryIndex.model_validate(raw), version, inline
+
+
+def _read_snapshot() -> Tuple[LibraryIndex, int]:
+    """
+    Read the index snapshot. Returns (index, version).
+
+    Both formats are accepted. Writing a snapshot removes the other format
+    afterwards, so if both exist the preferred one is the newer. A snapshot
+    that needs rewriting (damaged, or an old one with inline cards) is
+    handed to _fix_snapshot(); I/O errors just propagate.
+    """
+    path = next((p for p in _snapshot_paths() if p.exists()), None)
+    if path is None:
+        return _default_index(), 0
+
+    try:
+        index, version, inline = _decode_snapshot(path)
+    except FileNotFoundError:
+        # Replaced by a writer since exists(); read it again under the lock.
+        return _fix_snapshot()
+    except _SNAPSHOT_ERRORS:
+        return _fix_snapshot()
+
+    if inline:
+        return _fix_snapshot()
+    return index, version
+
+
+def _fix_snapshot() -> Tuple[LibraryIndex, int]:
+    """
+    Migrate or recover the snapshot, under the write lock.
+
+    Reads it again once the lock is held: another process may have fixed
+    it in the meantime, and only one of them may move a file aside.
+    """
+    with write_lock():
+        path = next((p for p in _snapshot_paths() if p.exists()), None)
+        if path is None:
+            return _default_index(), 0
+        try:
+            index, version, inline = _decode_snapshot(path)
+        except _SNAPSHOT_ERRORS as exc:
+            return _recover_snapshot(path, exc)
+
+        if inline:
+            for deck_id, cards in inline.items():
+                _write_cards(deck_id, cards)
+            _write_snapshot(index, version)
+        return index, version
+
+
+_VERSION_RE = re.compile(rb'(?<!\\)"version":(\d+)')
+
+
+def _salvage_version(path: Path, data: bytes) -> Optional[int]:
+    """The version an unreadable snapshot was at, if it can still be made out."""
+    if path == LIBRARY_BINARY_FILE:
+        return binary_snapshot.peek_version(data)
+    # _write_snapshot() puts the top-level "version" last.
+    matches = _VERSION_RE.findall(data)
+    return int(matches[-1]) if matches else None
+
+
+def _recover_snapshot(path: Path, exc: Exception) -> Tuple[LibraryIndex, int]:
+    """
+    Replace an unreadable snapshot with what can be saved (call under
+    write_lock()).
+
+    Never let a bad file silently become "the library": a copy is set aside
+    (once -- the next read finds the replacement, not the bad file) so it
+    can be recovered by hand. The bad file itself is only ever replaced
+    atomically, so readers without the lock never find no snapshot at all. The replacement holds whatever the journal
+    still adds on top of it, at a version past both the bad snapshot's and
+    the journal's: versions are ETags ("state-N") clients may have cached,
+    so the new content must never reuse one of them.
+    """
+    data = path.read_bytes()
+    backup = _set_aside(path)
+    print(f"WARNING: library snapshot unreadable ({exc}); saved a copy to {backup}")
+
+    salvaged = _salvage_version(path, data) or 0
+    index = _default_index()
+    newest = salvaged
+    for record in _read_journal():
+        seq = int(record.get("seq", 0))
+        newest = max(newest, seq)
+        if seq <= salvaged:
+            continue
+        try:
+            apply_record(index, record)
+        except LibraryError:
+            pass  # refers to something only the lost snapshot had
+
+    version = newest + 1
+    # The journal records are now all <= version, so read_index() skips
+    # them; the next compaction drops them.
+    _write_snapshot(index, version)
+    return index, version
+
+
+def _read_journal(repair: bool = False) -> List[Dict[str, Any]]:
+    """
+    Read all complete records from the journal.
+
+    An incomplete tail is ignored: it is either a crashed append or another
+    process mid-append. With repair=True (only while holding the file lock,
+    so it must be a crash) the tail is cut off so the next append starts on
+    a clean line; the original journal is copied aside first.
+    """
+    if not JOURNAL_FILE.exists():
+        return []
+
+    records: List[Dict[str, Any]] = []
+    good_offset = 0
+    data = JOURNAL_FILE.read_bytes()
+
+    for line in data.splitlines(keepends=True):
+        if not line.endswith(b"\n"):
+            break
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            break
+        good_offset += len(line)
+
+    if repair and good_offset != len(data):
+        backup = _set_aside(JOURNAL_FILE)
+        print(f"WARNING: dropped torn library journal tail; saved copy to {backup}")
+        with open(JOURNAL_FILE, "r+b") as fh:
+            fh.truncate(good_offset)
+            fh.flush()
+            os.fsync(fh.fileno())
+
+    return records
+
+
+def _append_journal(records: List[Dict[str, Any]]) -> None:
+    """Append records to the journal as one write, then fsync."""
+    blob = "".join(_dumps(r) + "\n" for r in records).encode("utf-8")
+    with open(JOURNAL_FILE, "ab") as fh:
+        fh.write(blob)
+        fh.flush()
+        os.fsync(fh.fileno())
+
+
+def _write_snapshot(index: LibraryIndex, version: int) -> None:
+    path, other = _snapshot_paths()
+    if path == LIBRARY_BINARY_FILE:
+        data = binary_snapshot.encode_index(index, version)
+    else:
+        payload = index.model_dump()
+        payload["version"] = version
+        data = _dumps(payload).encode("utf-8")
+    _atomic_write(path, data)
+    other.unlink(missing_ok=True)
+
+
+# ---------- Store interface ----------
+
+
+def stamp() -> Tuple[Any, Any]:
+    """(mtime_ns, size) of the snapshot(s) and the journal."""
+    return (
+        _stat_stamp(LIBRARY_FILE),
+        _stat_stamp(LIBRARY_BINARY_FILE),
+        _stat_stamp(JOURNAL_FILE),
+    )
+
+
+def read_index() -> Tuple[LibraryIndex, int]:
+    """
+    Crash recovery path: snapshot + replay of any newer journal records.
+
+    Returns (index, version).
+    """
+    global _journal_records
+
+    index, version = _read_snapshot()
+    records = _read_journal()
+    for record in records:
+        seq = int(record.get("seq", 0))
+        if seq <= version:
+            # Already folded into the snapshot by a compaction that was
+            # interrupted before it could trim the journal.
+            continue
+        try:
+            apply_record(index, record)
+        except LibraryError as exc:
+            print(f"WARNING: skipping journal record {seq}: {exc}")
+        version = seq
+
+    _journal_records = len(records)
+    return index, version
+
+
+def read_changes(since: int) -> List[Dict[str, Any]]:
+    """
+    Journal records newer than `since`. Records already compacted away are
+    gone, so the caller has to check the result starts at since + 1.
+    """
+    return [r for r in _read_journal() if int(r.get("seq", 0)) > since]
+
+
+@contextmanager
+def write_lock() -> Iterator[None]:
+    """
+    Exclusive cross-process lock around every library write.
+
+    Uses flock on data/library.lock, so several uvicorn workers sharing the
+    data dir take turns. Without fcntl (Windows) only the in-process
+    ordering of the writer thread applies. Re-entrant within a thread.
+    """
+    if getattr(_lock_depth, "n", 0):
+        # Already ours (e.g. read_index() fixing the snapshot inside
+        # compact()); flock on a second descriptor would wait for ourselves.
+        _lock_depth.n += 1
+        try:
+            yield
+        finally:
+            _lock_depth.n -= 1
+        return
+    _lock_depth.n = 1
+    try:
+        if fcntl is None:
+            _read_journal(repair=True)
+            yield
+            return
+        with open(LOCK_FILE, "a+b") as fh:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            try:
+                _read_journal(repair=True)
+                yield
+            finally:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+    finally:
+        _lock_depth.n = 0
+
+
+def persist(
+    index: LibraryIndex,
+    records: List[Dict[str, Any]],
+    cards: Dict[str, List[AnyCard]],
+    version: int,
+) -> None:
+    """
+    Persist a burst of accepted records (call under write_lock()).
+
+    Card files go first, then the records are journaled with one append
+    (cost ~ size of the change). With the journal disabled the index
+    snapshot is rewritten atomically instead.
+    """
+    global _journal_records
+
+    for deck_id, deck_cards in cards.items():
+        _write_cards(deck_id, deck_cards)
+
+    if settings.LIBRARY_JOURNAL_ENABLED:
+        _append_journal(records)
+        _journal_records += len(records)
+    else:
+        _write_snapshot(index, version)
+        JOURNAL_FILE.unlink(missing_ok=True)
+        _journal_records = 0
+
+    live_ids = {d.id for d in index.decks}
+    for record in records:
+        for sub in flatten_record(record):
+            if sub["op"] == "delete_deck" and sub["deck_id"] not in live_ids:
+                _unlink_cards(sub["deck_id"])
+
+
+def save_all(index: LibraryIndex, cards: Dict[str, List[AnyCard]], version: int) -> None:
+    """Replace the whole library (call under write_lock())."""
+    global _journal_records
+
+    for deck_id, deck_cards in cards.items():
+        _write_cards(deck_id, deck_cards)
+    _write_snapshot(index, version)
+    JOURNAL_FILE.unlink(missing_ok=True)
+    _journal_records = 0
+
+
+# ---------- Compaction ----------
+
+
+def compact() -> None:
+    """
+    Roll the journal into a fresh index snapshot.
+
+    Runs under the file lock, so the index we read already includes every
+    journaled record and the journal can simply be emptied. The index holds
+    no cards, so this is cheap. Card files of decks that no longer exist
+    are swept up at the same time.
+    """
+    global _journal_records
+
+    with write_lock():
+        index, version = read_index()
+        _write_snapshot(index, version)
+        _atomic_write(JOURNAL_FILE, b"")
+        _journal_records = 0
+
+        live_ids = {d.id for d in index.decks}
+        for suffix in (CARDS_SUFFIX, CARDS_BINARY_SUFFIX):
+            for path in DECKS_DIR.glob(f"*{suffix}"):
+                if path.stem not in live_ids:
+                    path.unlink(missing_ok=True)
+
+
+def convert_files() -> Tuple[int, int]:
+    """
+    Rewrite the snapshot and every card file in LIBRARY_SNAPSHOT_FORMAT
+    (journal folded in, like compact()). Returns (decks, cards).
+    """
+    global _journal_records
+
+    with write_lock():
+        index, version = read_index()
+        n_cards = 0
+        for deck in index.decks:
+            cards = read_cards(deck.id)
+            _write_cards(deck.id, cards)
+            n_cards += len(cards)
+        _write_snapshot(index, version)
+        _atomic_write(JOURNAL_FILE, b"")
+        _journal_records = 0
+    return len(index.decks), n_cards
+
+
+def _compaction_worker() -> None:
+    global _compaction_running
+    try:
+        compact()
+    except Exception as exc:
+        print("Library journal compaction failed:", exc)
+    finally:
+        _compaction_running = False
+
+
+def after_commit() -> None:
+    """Kick off background compaction once the journal is long enough."""
+    global _compaction_running
+    if _journal_records < settings.LIBRARY_JOURNAL_COMPACT_EVERY:
+        return
+    with _compaction_lock:
+        if _compaction_running:
+            return
+        _compaction_running = True
+    threading.Thread(target=_compaction_worker, daemon=True).start()
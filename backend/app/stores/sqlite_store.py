@@ -0,0 +1,414 @@
+"""
+SQLite library store (settings.LIBRARY_BACKEND = "sqlite").
+
+Categories, decks and cards are rows in one WAL-mode database, so moving or
+deleting a deck is an indexed row update instead of a file rewrite. Indexes:
+decks(id) (primary key), decks(category), cards(deck_id, position) (primary
+key) and cards(word). The most recent mutation records are kept in
+`changes` for the change feed.
+
+One-shot migration from the JSON store:
+
+    python -m app.stores.sqlite_store migrate
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+from ..config import settings
+from ..compact_cards import AnyCard, CompactCard, make_card
+from ..models import DeckMeta, LibraryIndex
+from . import DATA_DIR
+
+
+DEFAULT_DB_FILE = DATA_DIR / "library.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS categories (
+    name     TEXT PRIMARY KEY,
+    position INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS decks (
+    id                   TEXT PRIMARY KEY,
+    position             INTEGER NOT NULL,
+    name                 TEXT NOT NULL,
+    category             TEXT NOT NULL,
+    card_count           INTEGER NOT NULL,
+    source_type          TEXT NOT NULL,
+    source               TEXT NOT NULL,
+    taboo_words_per_card INTEGER NOT NULL,
+    cards_rev            INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_decks_category ON decks(category);
+
+CREATE TABLE IF NOT EXISTS cards (
+    deck_id  TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    word     TEXT NOT NULL,
+    taboo    TEXT NOT NULL,  -- JSON array of strings
+    PRIMARY KEY (deck_id, position)
+);
+CREATE INDEX IF NOT EXISTS idx_cards_word ON cards(word);
+
+-- Recent mutation records (change feed), trimmed to LIBRARY_CHANGELOG_SIZE.
+CREATE TABLE IF NOT EXISTS changes (
+    seq    INTEGER PRIMARY KEY,
+    record TEXT NOT NULL  -- the JSON record, seq included
+);
+"""
+
+_local = threading.local()
+
+
+def db_path() -> Path:
+    if settings.LIBRARY_SQLITE_PATH:
+        return Path(settings.LIBRARY_SQLITE_PATH)
+    return DEFAULT_DB_FILE
+
+
+def _connect() -> sqlite3.Connection:
+    """
+    Return this thread's connection (sqlite3 connections aren't shareable
+    across threads). Autocommit mode: writes use explicit BEGIN IMMEDIATE.
+    """
+    path = db_path()
+    conn = getattr(_local, "conn", None)
+    if conn is not None and getattr(_local, "path", None) == path:
+        return conn
+
+    conn = sqlite3.connect(path, isolation_level=None, timeout=30.0)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(_SCHEMA)
+    if conn.execute("SELECT COUNT(*) FROM categories").fetchone()[0] == 0:
+        conn.execute("INSERT INTO categories (name, position) VALUES ('Uncategorized', 0)")
+    _local.conn = conn
+    _local.path = path
+    return conn
+
+
+def _get_version(conn: sqlite3.Connection) -> int:
+    row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+    return int(row[0]) if row else 0
+
+
+def _set_version(conn: sqlite3.Connection, version: int) -> None:
+    conn.execute(
+        "INSERT INTO meta (key, value) VALUES ('version', ?) "
+        "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        (str(version),),
+    )
+
+
+def _write_cards(conn: sqlite3.Connection, deck_id: str, cards: List[AnyCard]) -> None:
+    conn.execute("DELETE FROM cards WHERE deck_id = ?", (deck_id,))
+    conn.executemany(
+        "INSERT INTO cards (deck_id, position, word, taboo) VALUES (?, ?, ?, ?)",
+        [
+            (deck_id, pos, c.word, json.dumps(list(c.taboo), ensure_ascii=False))
+            for pos, c in enumerate(cards)
+        ],
+    )
+    conn.execute("UPDATE decks SET cards_rev = cards_rev + 1 WHERE id = ?", (deck_id,))
+
+
+def _log_changes(conn: sqlite3.Connection, records: List[Dict[str, Any]], version: int) -> None:
+    conn.executemany(
+        "INSERT OR REPLACE INTO changes (seq, record) VALUES (?, ?)",
+        [(r["seq"], json.dumps(r, ensure_ascii=False)) for r in records],
+    )
+    keep = max(1, settings.LIBRARY_CHANGELOG_SIZE)
+    conn.execute("DELETE FROM changes WHERE seq <= ?", (version - keep,))
+
+
+def _next_position(conn: sqlite3.Connection, table: str) -> int:
+    row = conn.execute(f"SELECT COALESCE(MAX(position), -1) + 1 FROM {table}").fetchone()
+    return int(row[0])
+
+
+def _add_category(conn: sqlite3.Connection, name: str, position: Any = None) -> None:
+    exists = conn.execute("SELECT 1 FROM categories WHERE name = ?", (name,)).fetchone()
+    if exists:
+        return
+    if position is None:
+        pos = _next_position(conn, "categories")
+    else:
+        # Rare (only "put Uncategorized back in front"): shift the rest.
+        conn.execute(
+            "UPDATE categories SET position = position + 1 WHERE position >= ?",
+            (position,),
+        )
+        pos = position
+    conn.execute("INSERT INTO categories (name, position) VALUES (?, ?)", (name, pos))
+
+
+def _persist_record(conn: sqlite3.Connection, record: Dict[str, Any]) -> None:
+    """Translate one (already validated) record into row updates."""
+    op = record["op"]
+
+    if op == "add_category":
+        _add_category(conn, record["name"], record.get("position"))
+
+    elif op == "delete_category":
+        # Like apply_record(): make sure 'Uncategorized' exists (appended,
+        # if it was missing) before decks are moved into it.
+        conn.execute(
+            """
+            INSERT OR IGNORE INTO categories (name, position)
+            SELECT 'Uncategorized', COALESCE(MAX(position), -1) + 1 FROM categories
+            """
+        )
+        conn.execute(
+            "UPDATE decks SET category = 'Uncategorized' WHERE category = ?",
+            (record["name"],),
+        )
+        conn.execute("DELETE FROM categories WHERE name = ?", (record["name"],))
+
+    elif op == "move_deck":
+        conn.execute(
+            "UPDATE decks SET category = ? WHERE id = ?",
+            (record["category"], record["deck_id"]),
+        )
+
+    elif op == "upsert_deck":
+        d = record["deck"]
+        _add_category(conn, d["category"])
+        conn.execute(
+            """
+            INSERT INTO decks (id, position, name, category, card_count,
+                               source_type, source, taboo_words_per_card)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                name = excluded.name,
+                category = excluded.category,
+                card_count = excluded.card_count,
+                source_type = excluded.source_type,
+                source = excluded.source,
+                taboo_words_per_card = excluded.taboo_words_per_card
+            """,
+            (
+                d["id"],
+                _next_position(conn, "decks"),
+                d["name"],
+                d["category"],
+                d["card_count"],
+                d["source_type"],
+                d["source"],
+                d.get("taboo_words_per_card", 4),
+            ),
+        )
+
+    elif op == "replace_cards":
+        if record.get("taboo_words_per_card"):
+            conn.execute(
+                "UPDATE decks SET card_count = ?, taboo_words_per_card = ? WHERE id = ?",
+                (record["card_count"], record["taboo_words_per_card"], record["deck_id"]),
+            )
+        else:
+            conn.execute(
+                "UPDATE decks SET card_count = ? WHERE id = ?",
+                (record["card_count"], record["deck_id"]),
+            )
+
+    elif op == "delete_deck":
+        conn.execute("DELETE FROM cards WHERE deck_id = ?", (record["deck_id"],))
+        conn.execute("DELETE FROM decks WHERE id = ?", (record["deck_id"],))
+
+    elif op == "rename_deck":
+        conn.execute(
+            "UPDATE decks SET name = ? WHERE id = ?",
+            (record["name"].strip(), record["deck_id"]),
+        )
+
+    elif op == "batch":
+        for sub in record["ops"]:
+            _persist_record(conn, sub)
+
+
+# ---------- Store interface ----------
+
+
+def stamp() -> int:
+    """The persisted library version; bumped by every committed write."""
+    return _get_version(_connect())
+
+
+def read_index() -> Tuple[LibraryIndex, int]:
+    conn = _connect()
+    # One read transaction so the SELECTs see the same snapshot (unless
+    # we're already inside the writer's transaction).
+    own_txn = not conn.in_transaction
+    if own_txn:
+        conn.execute("BEGIN")
+    try:
+        version = _get_version(conn)
+        categories = [
+            row[0]
+            for row in conn.execute("SELECT name FROM categories ORDER BY position")
+        ]
+        decks = [
+            DeckMeta(
+                id=row[0],
+                name=row[1],
+                category=row[2],
+                card_count=row[3],
+                source_type=row[4],
+                source=row[5],
+                taboo_words_per_card=row[6],
+            )
+            for row in conn.execute(
+                "SELECT id, name, category, card_count, source_type, source, "
+                "taboo_words_per_card FROM decks ORDER BY position"
+            )
+        ]
+    finally:
+        if own_txn:
+            conn.execute("COMMIT")
+    return LibraryIndex(categories=categories, decks=decks), version
+
+
+def card_stamp(deck_id: str) -> Any:
+    row = _connect().execute(
+        "SELECT cards_rev FROM decks WHERE id = ?", (deck_id,)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def read_cards(deck_id: str) -> List[CompactCard]:
+    rows = _connect().execute(
+        "SELECT word, taboo FROM cards WHERE deck_id = ? ORDER BY position",
+        (deck_id,),
+    )
+    return [make_card(word, json.loads(taboo)) for word, taboo in rows]
+
+
+@contextmanager
+def write_lock() -> Iterator[None]:
+    """
+    One IMMEDIATE transaction around the whole write: SQLite's own lock
+    serializes writers across processes, and everything persisted inside
+    commits (or rolls back) together.
+    """
+    conn = _connect()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    else:
+        conn.execute("COMMIT")
+
+
+def persist(
+    index: LibraryIndex,
+    records: List[Dict[str, Any]],
+    cards: Dict[str, List[AnyCard]],
+    version: int,
+) -> None:
+    """Persist a burst of accepted records (call under write_lock())."""
+    conn = _connect()
+    for record in records:
+        _persist_record(conn, record)
+    live_ids = {d.id for d in index.decks}
+    for deck_id, deck_cards in cards.items():
+        if deck_id in live_ids:
+            _write_cards(conn, deck_id, deck_cards)
+    _log_changes(conn, records, version)
+    _set_version(conn, version)
+
+
+def save_all(index: LibraryIndex, cards: Dict[str, List[AnyCard]], version: int) -> None:
+    """Replace the whole library (call under write_lock())."""
+    conn = _connect()
+    conn.execute("DELETE FROM cards")
+    conn.execute("DELETE FROM decks")
+    conn.execute("DELETE FROM categories")
+    conn.executemany(
+        "INSERT INTO categories (name, position) VALUES (?, ?)",
+        [(name, pos) for pos, name in enumerate(index.categories)],
+    )
+    conn.executemany(
+        """
+        INSERT INTO decks (id, position, name, category, card_count,
+                           source_type, source, taboo_words_per_card)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        [
+            (
+                d.id, pos, d.name, d.category, d.card_count,
+                d.source_type, d.source, d.taboo_words_per_card,
+            )
+            for pos, d in enumerate(index.decks)
+        ],
+    )
+    for deck_id, deck_cards in cards.items():
+        _write_cards(conn, deck_id, deck_cards)
+    conn.execute("DELETE FROM changes")
+    _log_changes(conn, [{"seq": version, "op": "replace_library"}], version)
+    _set_version(conn, version)
+
+
+def read_changes(since: int) -> List[Dict[str, Any]]:
+    rows = _connect().execute(
+        "SELECT record FROM changes WHERE seq > ? ORDER BY seq", (since,)
+    )
+    return [json.loads(row[0]) for row in rows]
+
+
+def after_commit() -> None:
+    """Nothing to do: SQLite checkpoints its own WAL."""
+    return None
+
+
+def compact() -> None:
+    """Fold the WAL back into the main database file."""
+    _connect().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+# ---------- Migration ----------
+
+
+def migrate_from_json() -> Tuple[int, int]:
+    """
+    Copy the JSON store (snapshot + journal + deck files) into SQLite.
+
+    Replaces whatever the SQLite database held. Returns (decks, cards).
+    """
+    from . import json_store
+
+    index, version = json_store.read_index()
+    cards = {d.id: json_store.read_cards(d.id) for d in index.decks}
+
+    with write_lock():
+        save_all(index, cards, version)
+
+    return len(index.decks), sum(len(c) for c in cards.values())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="SQLite library store tools.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("migrate", help="Copy data/library.json (+ journal, decks/) into SQLite.")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        decks, cards = migrate_from_json()
+        print(f"Migrated {decks} decks / {cards} cards into {db_path()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Benchmark the streaming CSV deck parser against the old grid-based one.
+
+The old parse_deck_from_csv() built list(csv.reader(...)) of every row and
+then walked each column over the full rows x widest-row grid; the old
+transpose_rows_to_columns() padded every row to the widest one first. Both
+are copied below as the baseline, next to the ragged transpose that
+replaced it (since superseded by asking Sheets for majorDimension=COLUMNS,
+so it only lives here now). The synthetic sheet is wide and mostly
+empty (a few long columns, many short ones), which is where the grid
+costs most.
+
+Reports time and tracemalloc's peak for each, and checks that they agree.
+
+    cd backend
+    python scripts/bench_csv_parser.py [--columns 400] [--cards 60] [--taboo 4]
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.models import TabooCard  # noqa: E402
+from app.services.sheet_parser import parse_columns_to_cards  # noqa: E402
+from app.services.taboo_parser import parse_deck_from_csv  # noqa: E402
+
+
+def grid_parse_deck_from_csv(csv_text: str, taboo_words_per_card: int) -> List[TabooCard]:
+    """The previous implementation, kept here as the baseline."""
+    if taboo_words_per_card < 1:
+        taboo_words_per_card = 1
+
+    rows = list(csv.reader(io.StringIO(csv_text)))
+    cards: List[TabooCard] = []
+    if not rows:
+        return cards
+
+    max_cols = max(len(r) for r in rows)
+    max_rows = len(rows)
+    group_size = 1 + taboo_words_per_card
+
+    def get_cell(r_index: int, c_index: int) -> str:
+        if 0 <= r_index < max_rows and 0 <= c_index < len(rows[r_index]):
+            return rows[r_index][c_index].strip()
+        return ""
+
+    for col_idx in range(max_cols):
+        start_row = 0
+        while start_row < max_rows:
+            word = get_cell(start_row + 0, col_idx)
+            if not word:
+                all_blank = True
+                for r in range(start_row, min(start_row + group_size, max_rows)):
+                    if get_cell(r, col_idx):
+                        all_blank = False
+                        break
+                if all_blank:
+                    break
+                start_row += group_size
+                continue
+            taboo_words: List[str] = []
+            for offset in range(1, group_size):
+                r_index = start_row + offset
+                if r_index >= max_rows:
+                    break
+                val = get_cell(r_index, col_idx)
+                if val:
+                    taboo_words.append(val)
+            cards.append(TabooCard(word=word, taboo=taboo_words))
+            start_row += group_size
+    return cards
+
+
+def padded_transpose(rows: List[List[str]]) -> List[List[str]]:
+    """The previous transpose_rows_to_columns()."""
+    if not rows:
+        return []
+    max_len = max(len(r) for r in rows)
+    padded = [r + [""] * (max_len - len(r)) for r in rows]
+    return list(map(list, zip(*padded)))
+
+
+def ragged_transpose(rows: List[List[str]]) -> List[List[str]]:
+    """
+    Row-major to columns without padding: each column only runs down to
+    the last row that has a cell in it; a gap above a cell is filled with
+    "" so cells keep their row position.
+    """
+    columns: List[List[str]] = []
+    for row_index, row in enumerate(rows):
+        if len(row) > len(columns):
+            columns.extend([] for _ in range(len(row) - len(columns)))
+        for column, value in zip(columns, row):
+            if len(column) < row_index:
+                column.extend([""] * (row_index - len(column)))
+            column.append(value)
+    return columns
+
+
+def synthetic_rows(n_columns: int, max_cards: int, taboo: int, seed: int) -> List[List[str]]:
+    """Row-major cells: column lengths are skewed, so most of the grid is blank."""
+    rng = random.Random(seed)
+    group = 1 + taboo
+    lengths = [max(1, int(max_cards * rng.random() ** 4)) for _ in range(n_columns)]
+    lengths[0] = max_cards
+    n_rows = max(lengths) * group
+    rows: List[List[str]] = [[] for _ in range(n_rows)]
+    for c, n_cards in enumerate(lengths):
+        for k in range(n_cards):
+            for offset in range(group):
+                value = f"goal {c}-{k}" if offset == 0 else f"taboo {c}-{k}-{offset}"
+                if offset and rng.random() < 0.1:
+                    value = ""
+                row = rows[k * group + offset]
+                row.extend([""] * (c - len(row)))
+                row.append(value)
+    return rows
+
+
+def to_csv(rows: List[List[str]]) -> str:
+    out = io.StringIO()
+    csv.writer(out, lineterminator="\n").writerows(rows)
+    return out.getvalue()
+
+
+def measure(label: str, func: Callable, *args) -> object:
+    started = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - started
+    del result
+
+    tracemalloc.start()
+    result = func(*args)
+    kept, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # The result itself is the same size either way; what differs is the
+    # working memory on top of it.
+    print(
+        f"  {label:<10} {elapsed * 1000:8.1f} ms  peak {peak / 1024 / 1024:7.2f} MiB"
+        f"  ({(peak - kept) / 1024 / 1024:.2f} MiB beyond the result)"
+    )
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--columns", type=int, default=400)
+    parser.add_argument("--cards", type=int, default=60, help="cards in the longest column")
+    parser.add_argument("--taboo", type=int, default=4, help="taboo words per card")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.columns, args.cards, args.taboo, args.seed)
+    text = to_csv(rows)
+    cells = sum(1 for r in rows for v in r if v)
+    print(
+        f"{len(rows)} rows x {args.columns} columns, {cells} non-blank cells "
+        f"({cells / (len(rows) * args.columns):.0%} of the grid), {len(text) / 1024:.0f} KiB of CSV"
+    )
+
+    print("parse_deck_from_csv")
+    old = measure("grid", grid_parse_deck_from_csv, text, args.taboo)
+    new = measure("streaming", parse_deck_from_csv, text, args.taboo)
+    same = [(c.word, c.taboo) for c in old] == [(c.word, c.taboo) for c in new]
+    print(f"  {len(new)} cards; {'same' if same else 'DIFFERENT'} result")
+
+    print("rows -> columns")
+    old_cols = measure("padded", padded_transpose, rows)
+    new_cols = measure("ragged", ragged_transpose, rows)
+    same_cols = parse_columns_to_cards(old_cols) == parse_columns_to_cards(new_cols)
+    print(f"  {sum(map(len, new_cols))} cells kept vs {sum(map(len, old_cols))}; "
+          f"{'same' if same_cols else 'DIFFERENT'} cards")
+
+    if not (same and same_cols):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Measure in-memory size per card: Pydantic TabooCard vs CompactCard.
+
+Builds a synthetic library (100k cards by default) as JSON text, decodes
+it the way the stores do, and reports tracemalloc's view of how much each
+representation keeps alive.
+
+    cd backend
+    python scripts/measure_card_memory.py [--cards 100000] [--vocab 20000]
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import random
+import sys
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.compact_cards import make_card  # noqa: E402
+from app.models import TabooCard  # noqa: E402
+
+
+def synthetic_payload(n_cards: int, vocab_size: int, taboo_per_card: int, seed: int) -> str:
+    """JSON text for n_cards cards; taboo words follow a skewed distribution."""
+    rng = random.Random(seed)
+    vocab = [f"word{i:05d}" for i in range(vocab_size)]
+    # Heavier weight on low ids: common taboo words repeat a lot, like in
+    # real decks.
+    weights = [1.0 / (i + 1) for i in range(vocab_size)]
+    cards = []
+    for i in range(n_cards):
+        cards.append(
+            {
+                "word": f"card{i:06d}",
+                "taboo": rng.choices(vocab, weights=weights, k=taboo_per_card),
+            }
+        )
+    return json.dumps(cards)
+
+
+def measure(label: str, build, payload: str, n_cards: int) -> int:
+    raw = json.loads(payload)
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    cards = build(raw)
+    del raw  # only what the cards themselves keep alive counts
+    gc.collect()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    size = after - before
+    print(f"  {label:<12} {size / 1024 / 1024:8.1f} MiB  {size / n_cards:7.1f} bytes/card")
+    del cards
+    return size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cards", type=int, default=100_000)
+    parser.add_argument("--vocab", type=int, default=20_000)
+    parser.add_argument("--taboo", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    payload = synthetic_payload(args.cards, args.vocab, args.taboo, args.seed)
+    print(f"{args.cards:,} cards, {args.taboo} taboo words each, vocabulary {args.vocab:,}")
+
+    pydantic = measure(
+        "TabooCard",
+        lambda raw: [TabooCard.model_validate(c) for c in raw],
+        payload,
+        args.cards,
+    )
+    compact = measure(
+        "CompactCard",
+        lambda raw: [make_card(c["word"], c["taboo"]) for c in raw],
+        payload,
+        args.cards,
+    )
+    print(f"  saving       {(pydantic - compact) / args.cards:7.1f} bytes/card "
+          f"({100 * (1 - compact / pydantic):.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+A local stand-in for the Google Sheets API, for trying workbook imports
+without a key or network access.
+
+Serves one synthetic workbook under any spreadsheet id:
+
+    GET /v4/spreadsheets/<id>                        metadata (honours fields=)
+    GET /v4/spreadsheets/<id>/values/<range>         one tab
+    GET /v4/spreadsheets/<id>/values:batchGet?ranges=...&majorDimension=...
+
+Tabs are column-major taboo cards: row 1 holds the goal words, the rows
+below their taboo words. Every request sleeps --latency ms first, so the
+number of round trips shows up in the timings, and is counted. With
+--error-rate, that fraction of requests is answered 429 (Retry-After: 1)
+or 503 instead, to watch the client's retries (see GET /health).
+
+Run it and point the backend at it:
+
+    cd backend
+    python scripts/stub_sheets_server.py --tabs 20 --port 8765
+    GOOGLE_SHEETS_API_BASE=http://127.0.0.1:8765/v4 uvicorn app.main:app
+
+or let it drive parse_workbook() itself and report round trips and time:
+
+    python scripts/stub_sheets_server.py --tabs 20 --check
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, unquote, urlsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def synthetic_workbook(n_tabs: int, cards_per_tab: int, taboo_per_card: int, seed: int) -> Dict[str, Any]:
+    """{"title", "tabs": [{"title", "sheetId", "rows"}]} with row-major cell values."""
+    rng = random.Random(seed)
+    tabs = []
+    for t in range(n_tabs):
+        goals = [f"goal {t}-{c}" for c in range(cards_per_tab)]
+        rows = [goals]
+        for r in range(taboo_per_card):
+            # Some cards have fewer taboo words: ragged rows, like real sheets.
+            row = [f"taboo {t}-{c}-{r}" if rng.random() > 0.1 else "" for c in range(cards_per_tab)]
+            while row and row[-1] == "":
+                row.pop()
+            rows.append(row)
+        tabs.append({"title": f"Tab {t}" if t % 5 else f"Tab's {t}", "sheetId": 1000 + t, "rows": rows})
+    return {"title": "Stub workbook", "tabs": tabs}
+
+
+def _columns(rows: List[List[str]]) -> List[List[str]]:
+    """What Sheets returns for majorDimension=COLUMNS: trailing blanks trimmed."""
+    width = max((len(r) for r in rows), default=0)
+    columns = []
+    for c in range(width):
+        column = [r[c] if c < len(r) else "" for r in rows]
+        while column and column[-1] == "":
+            column.pop()
+        columns.append(column)
+    return columns
+
+
+def _tab_from_range(workbook: Dict[str, Any], a1: str) -> Dict[str, Any]:
+    """Only whole-tab ranges ('Tab 1' or Tab1) are supported."""
+    name = a1.split("!", 1)[0]
+    if name.startswith("'") and name.endswith("'"):
+        name = name[1:-1].replace("''", "'")
+    for tab in workbook["tabs"]:
+        if tab["title"] == name:
+            return tab
+    raise KeyError(name)
+
+
+def make_handler(workbook: Dict[str, Any], latency: float, counter: Dict[str, int], error_rate: float = 0.0):
+    rng = random.Random(0)
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> None:
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _value_range(self, a1: str, major: str) -> Dict[str, Any]:
+            tab = _tab_from_range(workbook, a1)
+            values = _columns(tab["rows"]) if major == "COLUMNS" else tab["rows"]
+            return {"range": a1, "majorDimension": major, "values": values}
+
+        def do_GET(self) -> None:
+            time.sleep(latency)
+            counter["requests"] = counter.get("requests", 0) + 1
+            if error_rate and rng.random() < error_rate:
+                counter["errors"] = counter.get("errors", 0) + 1
+                if rng.random() < 0.5:
+                    return self._send(429, {"error": {"message": "Quota exceeded"}}, {"Retry-After": "1"})
+                return self._send(503, {"error": {"message": "Backend error"}})
+            parts = urlsplit(self.path)
+            query = parse_qs(parts.query)
+            segments = [unquote(s) for s in parts.path.split("/") if s]
+            # ["v4", "spreadsheets", <id>, ...]
+            if segments[:2] != ["v4", "spreadsheets"] or len(segments) < 3:
+                return self._send(404, {"error": {"message": "Not found"}})
+            major = query.get("majorDimension", ["ROWS"])[0]
+
+            try:
+                if len(segments) == 4 and segments[3] == "values:batchGet":
+                    ranges = [self._value_range(a1, major) for a1 in query.get("ranges", [])]
+                    if query.get("fields") == ["valueRanges(values)"]:
+                        ranges = [{"values": r["values"]} for r in ranges]
+                    return self._send(200, {"spreadsheetId": segments[2], "valueRanges": ranges})
+                if len(segments) == 5 and segments[3] == "values":
+                    return self._send(200, self._value_range(segments[4], major))
+            except KeyError as exc:
+                return self._send(400, {"error": {"message": f"Unable to parse range: {exc}"}})
+
+            if len(segments) == 3:
+                sheets = [
+                    {"properties": {"sheetId": t["sheetId"], "title": t["title"], "index": i,
+                                    "gridProperties": {"rowCount": 1000, "columnCount": 26}}}
+                    for i, t in enumerate(workbook["tabs"])
+                ]
+                payload = {
+                    "spreadsheetId": segments[2],
+                    "properties": {"title": workbook["title"], "locale": "en_US", "timeZone": "Etc/GMT"},
+                    "sheets": sheets,
+                }
+                if query.get("fields"):
+                    # Good enough for the mask sheet_parser sends.
+                    payload = {
+                        "properties": {"title": workbook["title"]},
+                        "sheets": [{"properties": {k: s["properties"][k] for k in ("sheetId", "title")}} for s in sheets],
+                    }
+                return self._send(200, payload)
+            return self._send(404, {"error": {"message": "Not found"}})
+
+        def log_message(self, *args) -> None:
+            pass
+
+    return Handler
+
+
+def check(base: str, counter: Dict[str, int], workbook: Dict[str, Any]) -> None:
+    """Run parse_workbook() against the stub and compare with the stub's data."""
+    from app.config import settings
+    from app.services import sheet_parser
+    from app.services.sheet_parser import parse_columns_to_cards
+
+    settings.GOOGLE_SHEETS_API_BASE = base
+    settings.SOURCE_CACHE_ENABLED = False
+
+    counter["requests"] = counter["errors"] = 0
+    started = time.perf_counter()
+    parsed = asyncio.run(sheet_parser.parse_workbook("stub-sheet"))
+    elapsed = time.perf_counter() - started
+
+    expected = [parse_columns_to_cards(_columns(t["rows"])) for t in workbook["tabs"]]
+    got = [t["cards"] for t in parsed["tabs"]]
+    names_ok = [t["tab_name"] for t in parsed["tabs"]] == [t["title"] for t in workbook["tabs"]]
+    print(
+        f"{len(parsed['tabs'])} tabs, {sum(map(len, got))} cards: "
+        f"{counter['requests']} requests ({counter.get('errors', 0)} failed), {elapsed * 1000:.0f} ms; "
+        f"cards {'match' if got == expected and names_ok else 'DIFFER'}"
+    )
+    if got != expected or not names_ok:
+        sys.exit(1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--tabs", type=int, default=20)
+    parser.add_argument("--cards", type=int, default=200, help="cards per tab")
+    parser.add_argument("--taboo", type=int, default=5, help="taboo words per card")
+    parser.add_argument("--latency", type=float, default=50.0, help="ms added to every request")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered 429/503")
+    parser.add_argument("--check", action="store_true", help="run parse_workbook() against it and exit")
+    args = parser.parse_args()
+
+    workbook = synthetic_workbook(args.tabs, args.cards, args.taboo, args.seed)
+    counter: Dict[str, int] = {}
+    port = 0 if args.check else args.port
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(workbook, args.latency / 1000, counter, args.error_rate))
+    base = f"http://127.0.0.1:{server.server_port}/v4"
+
+    if args.check:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        check(base, counter, workbook)
+        server.shutdown()
+        return
+
+    print(f"Stub Sheets API on {base} ({args.tabs} tabs x {args.cards} cards)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Damaged binary snapshots fail with SnapshotError and nothing else
+(stores/binary_snapshot.py), so the JSON store can tell "corrupt file"
+apart from I/O errors.
+
+    cd backend
+    python -m pytest -q
+"""
+from __future__ import annotations
+
+import random
+import zlib
+
+import pytest
+
+from app.compact_cards import make_card
+from app.models import DeckMeta, LibraryIndex
+from app.stores import binary_snapshot
+from app.stores.binary_snapshot import SnapshotError
+
+
+def _index() -> LibraryIndex:
+    decks = [
+        DeckMeta(
+            id=f"deck-{n}",
+            name=f"Deck {n} ☕",
+            category="Uncategorized",
+            card_count=3,
+            source_type="google_sheets",
+            source="https://example.test/deck.csv",
+            taboo_words_per_card=2,
+        )
+        for n in range(3)
+    ]
+    return LibraryIndex(categories=["Uncategorized", "Café"], decks=decks)
+
+
+def _cards():
+    return [make_card(f"word {n}", [f"taboo {n}", "shared"]) for n in range(20)]
+
+
+def _recompress(blob: bytes, mutate) -> bytes:
+    """Damage the payload but keep a stream that still decompresses."""
+    header = blob[: binary_snapshot._HEADER.size]
+    payload = bytearray(zlib.decompress(blob[len(header):]))
+    mutate(payload)
+    return header + zlib.compress(bytes(payload))
+
+
+def test_round_trip():
+    index, version = binary_snapshot.decode_index(binary_snapshot.encode_index(_index(), 7))
+    assert version == 7
+    assert index.model_dump() == _index().model_dump()
+    assert binary_snapshot.decode_cards(binary_snapshot.encode_cards(_cards())) == _cards()
+
+
+@pytest.mark.parametrize("kind", ["index", "cards"])
+def test_damaged_payloads_raise_snapshot_error(kind):
+    if kind == "index":
+        blob, decode = binary_snapshot.encode_index(_index(), 7), binary_snapshot.decode_index
+    else:
+        blob, decode = binary_snapshot.encode_cards(_cards()), binary_snapshot.decode_cards
+
+    rng = random.Random(1)
+    damages = [
+        lambda p: p.__delitem__(slice(len(p) // 2, None)),
+        lambda p: p.extend(b"\0\0\0\0"),
+        lambda p: p.__setitem__(slice(0, 4), b"\xff\xff\xff\x0f"),
+        lambda p: p.__setitem__(slice(4, 8), b"\x00\x00\x00\x00"),
+        lambda p: p.__setitem__(slice(len(p) - 3, None), b"\xff\xfe\xfd"),
+    ]
+    for _ in range(300):
+        damages.append(
+            lambda p, at=rng.randrange(12, 200), value=rng.randrange(256): p.__setitem__(
+                min(at, len(p) - 1), value
+            )
+        )
+
+    for damage in damages:
+        try:
+            decode(_recompress(blob, damage))
+        except SnapshotError:
+            pass
@@ -0,0 +1,147 @@
+"""
+Deck refresh vs. the source cache: validators are only kept once a deck's
+new cards are stored (services/source_cache.py).
+
+    cd backend
+    python -m pytest -q
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import List
+
+import httpx
+import pytest
+
+from app import db
+from app.config import settings
+from app.models import DeckMeta
+from app.services import deck_refresh, http_client, source_cache
+
+
+CSV_V1 = "apple\nfruit\nred\n"
+CSV_V2 = "banana\nfruit\nyellow\n"
+
+
+class FakeSheet:
+    """A published CSV with an ETag, answering conditional requests."""
+
+    def __init__(self) -> None:
+        self.body = CSV_V1
+        self.etag = '"v1"'
+        self.requests: List[httpx.Request] = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if request.headers.get("if-none-match") == self.etag:
+            return httpx.Response(304, headers={"ETag": self.etag})
+        return httpx.Response(200, text=self.body, headers={"ETag": self.etag})
+
+
+@pytest.fixture
+def sheet(monkeypatch, tmp_path):
+    fake = FakeSheet()
+    monkeypatch.setattr(source_cache, "CACHE_DIR", tmp_path / "source_cache")
+    monkeypatch.setattr(settings, "SOURCE_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "SOURCE_FETCH_RATE_PER_MINUTE", 0)
+    monkeypatch.setattr(
+        http_client,
+        "get_http_client",
+        lambda: httpx.AsyncClient(transport=httpx.MockTransport(fake.handler)),
+    )
+    return fake
+
+
+@pytest.fixture
+def stored(monkeypatch):
+    """Records replace_deck_cards() calls instead of touching the library."""
+    calls = []
+    monkeypatch.setattr(db, "replace_deck_cards", lambda deck_id, cards: calls.append((deck_id, cards)))
+    return calls
+
+
+def _deck(deck_id: str = "deck-1") -> DeckMeta:
+    return DeckMeta(
+        id=deck_id,
+        name="Fruit",
+        category="Uncategorized",
+        card_count=1,
+        source_type="google_sheets",
+        source="https://example.test/fruit.csv",
+        taboo_words_per_card=2,
+    )
+
+
+def _refresh(deck: DeckMeta) -> dict:
+    return asyncio.run(deck_refresh._refresh_one(deck, asyncio.Semaphore(1)))
+
+
+def test_failed_apply_is_fetched_again(sheet, stored, monkeypatch):
+    def broken(deck_id, cards):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(db, "replace_deck_cards", broken)
+    result = _refresh(_deck())
+    assert result["status"] == "failed"
+    assert "disk full" in result["error"]
+
+    # Nothing was stored, so the next refresh must not be told "304".
+    monkeypatch.setattr(db, "replace_deck_cards", lambda deck_id, cards: stored.append((deck_id, cards)))
+    result = _refresh(_deck())
+    assert result["status"] == "refreshed"
+    assert "if-none-match" not in sheet.requests[-1].headers
+    assert [c.word for c in stored[0][1]] == ["apple"]
+
+    # Stored now: the same version is "unchanged".
+    result = _refresh(_deck())
+    assert result["status"] == "unchanged"
+    assert sheet.requests[-1].headers["if-none-match"] == '"v1"'
+
+
+def test_new_version_after_unchanged(sheet, stored):
+    assert _refresh(_deck())["status"] == "refreshed"
+    assert _refresh(_deck())["status"] == "unchanged"
+
+    sheet.body, sheet.etag = CSV_V2, '"v2"'
+    result = _refresh(_deck())
+    assert result["status"] == "refreshed"
+    assert [c.word for c in stored[-1][1]] == ["banana"]
+
+
+def test_decks_sharing_a_url_are_tracked_separately(sheet, stored):
+    assert _refresh(_deck("deck-1"))["status"] == "refreshed"
+    # deck-2 never stored this version: it must get the cards too.
+    assert _refresh(_deck("deck-2"))["status"] == "refreshed"
+    assert [deck_id for deck_id, _ in stored] == ["deck-1", "deck-2"]
+
+
+def test_rate_limit_waits_do_not_count_against_the_deadline(sheet, stored, monkeypatch):
+    monkeypatch.setattr(settings, "LIBRARY_REFRESH_DECK_TIMEOUT_SECONDS", 0.2)
+    monkeypatch.setattr(settings, "SOURCE_FETCH_MAX_RETRIES", 1)
+    throttled = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if not throttled:
+            throttled.append(request)
+            return httpx.Response(429, headers={"Retry-After": "0.5"})
+        return sheet.handler(request)
+
+    monkeypatch.setattr(
+        http_client,
+        "get_http_client",
+        lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    # The Retry-After alone is longer than the deck's deadline.
+    assert _refresh(_deck())["status"] == "refreshed"
+    assert throttled
+
+
+def test_slow_source_still_times_out(sheet, stored, monkeypatch):
+    monkeypatch.setattr(settings, "LIBRARY_REFRESH_DECK_TIMEOUT_SECONDS", 0.1)
+
+    async def slow(deck):
+        await asyncio.sleep(5)
+
+    monkeypatch.setattr(deck_refresh, "_fetch_and_parse", slow)
+    assert _refresh(_deck())["status"] == "timeout"
+    assert stored == []
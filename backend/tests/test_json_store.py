@@ -0,0 +1,108 @@
+"""
+JSON store snapshot reads (stores/json_store.py): only a damaged file is
+moved aside and recovered; I/O errors propagate and leave it alone.
+
+    cd backend
+    python -m pytest -q
+"""
+from __future__ import annotations
+
+import errno
+import json
+
+import pytest
+
+from app.stores import json_store
+
+
+LEGACY = {
+    "categories": ["Uncategorized", "Food"],
+    "decks": [
+        {
+            "id": "deck-1",
+            "name": "Fruit",
+            "category": "Food",
+            "card_count": 1,
+            "source_type": "google_sheets",
+            "source": "https://example.test/fruit.csv",
+            "taboo_words_per_card": 2,
+            "cards": [{"word": "apple", "taboo": ["fruit", "red"]}],
+        }
+    ],
+    "version": 12,
+}
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    monkeypatch.setattr(json_store, "LIBRARY_FILE", tmp_path / "library.json")
+    monkeypatch.setattr(json_store, "LIBRARY_BINARY_FILE", tmp_path / "library.tlib")
+    monkeypatch.setattr(json_store, "JOURNAL_FILE", tmp_path / "library.journal")
+    monkeypatch.setattr(json_store, "LOCK_FILE", tmp_path / "library.lock")
+    monkeypatch.setattr(json_store, "DECKS_DIR", tmp_path / "decks")
+    monkeypatch.setattr(json_store.settings, "LIBRARY_SNAPSHOT_FORMAT", "json")
+    (tmp_path / "decks").mkdir()
+    return tmp_path
+
+
+def _corrupt_files(tmp_path):
+    return sorted(p.name for p in tmp_path.glob("library.json.corrupt-*"))
+
+
+def test_io_error_is_not_corruption(store, monkeypatch):
+    json_store.LIBRARY_FILE.write_text(json.dumps({**LEGACY, "decks": []}))
+    real_read_bytes = json_store.Path.read_bytes
+
+    def emfile(path):
+        if path == json_store.LIBRARY_FILE:
+            raise OSError(errno.EMFILE, "Too many open files")
+        return real_read_bytes(path)
+
+    monkeypatch.setattr(json_store.Path, "read_bytes", emfile)
+    with pytest.raises(OSError):
+        json_store.read_index()
+    monkeypatch.setattr(json_store.Path, "read_bytes", real_read_bytes)
+
+    assert _corrupt_files(store) == []
+    index, version = json_store.read_index()
+    assert index.categories == ["Uncategorized", "Food"]
+    assert version == 12
+
+
+def test_failed_migration_keeps_the_legacy_file(store, monkeypatch):
+    json_store.LIBRARY_FILE.write_text(json.dumps(LEGACY))
+
+    def enospc(deck_id, cards):
+        raise OSError(errno.ENOSPC, "No space left on device")
+
+    real_write_cards = json_store._write_cards
+    monkeypatch.setattr(json_store, "_write_cards", enospc)
+    with pytest.raises(OSError):
+        json_store.read_index()
+    monkeypatch.setattr(json_store, "_write_cards", real_write_cards)
+
+    assert _corrupt_files(store) == []
+    assert "cards" in json.loads(json_store.LIBRARY_FILE.read_text())["decks"][0]
+
+    index, version = json_store.read_index()
+    assert [d.id for d in index.decks] == ["deck-1"] and version == 12
+    assert [c.word for c in json_store.read_cards("deck-1")] == ["apple"]
+    assert "cards" not in json.loads(json_store.LIBRARY_FILE.read_text())["decks"][0]
+
+
+def test_corrupt_snapshot_is_set_aside_once(store):
+    json_store.LIBRARY_FILE.write_text('{"categories":["Uncategorized"],"decks":[],"version":41')
+
+    index, version = json_store.read_index()
+    assert version == 42
+    assert len(_corrupt_files(store)) == 1
+
+    assert json_store.read_index()[1] == 42
+    assert len(_corrupt_files(store)) == 1
+
+
+def test_recovery_inside_the_write_lock(store):
+    """compact() reads under the lock; recovering there must not deadlock."""
+    json_store.LIBRARY_FILE.write_text("not json")
+    json_store.compact()
+    assert json_store.read_index() == (json_store._default_index(), 1)
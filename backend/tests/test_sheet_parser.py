@@ -0,0 +1,120 @@
+"""
+parse_workbook() against a faked Sheets API: batchGet chunking, column-major
+values, and mapping value ranges back to tabs (services/sheet_parser.py).
+
+    cd backend
+    python -m pytest -q
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Dict, List
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.services import http_client, sheet_parser
+
+
+# Titles that need quoting in A1 notation (quotes, "!", spaces, unicode).
+TABS: Dict[str, List[List[str]]] = {
+    "Animals": [["cat", "dog"], ["meow", "bark"], ["purr", ""]],
+    "Tab's 1": [["it's"], ["apostrophe"]],
+    "A!B": [["bang", "", "third"], ["exclaim"], [], ["x"]],
+    "  spaced  ": [["space"], ["blank"]],
+    "Café ☕": [["latte"], ["milk", "foam"]],
+}
+
+
+def _columns(rows: List[List[str]]) -> List[List[str]]:
+    """majorDimension=COLUMNS, trailing blanks trimmed like Sheets does."""
+    width = max((len(r) for r in rows), default=0)
+    columns = []
+    for c in range(width):
+        column = [r[c] if c < len(r) else "" for r in rows]
+        while column and column[-1] == "":
+            column.pop()
+        columns.append(column)
+    return columns
+
+
+def _tab_name(a1: str) -> str:
+    assert a1.startswith("'") and a1.endswith("'"), a1
+    return a1[1:-1].replace("''", "'")
+
+
+class FakeSheetsApi:
+    def __init__(self) -> None:
+        self.batch_calls: List[List[str]] = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        parts = urlsplit(str(request.url))
+        query = parse_qs(parts.query)
+        path = unquote(parts.path)
+        if path.endswith("/values:batchGet"):
+            assert query["majorDimension"] == ["COLUMNS"]
+            names = [_tab_name(a1) for a1 in query["ranges"]]
+            self.batch_calls.append(names)
+            ranges = [{"values": _columns(TABS[name])} for name in names]
+            return httpx.Response(200, text=json.dumps({"valueRanges": ranges}))
+        # Metadata
+        sheets = [
+            {"properties": {"sheetId": 100 + i, "title": name}}
+            for i, name in enumerate(TABS)
+        ]
+        return httpx.Response(200, text=json.dumps({"properties": {"title": "Fake"}, "sheets": sheets}))
+
+
+@pytest.fixture
+def api(monkeypatch):
+    fake = FakeSheetsApi()
+    monkeypatch.setattr(settings, "SHEETS_BATCH_GET_MAX_RANGES", 2)
+    monkeypatch.setattr(settings, "SOURCE_FETCH_RATE_PER_MINUTE", 0)
+    monkeypatch.setattr(
+        http_client,
+        "get_http_client",
+        lambda: httpx.AsyncClient(transport=httpx.MockTransport(fake.handler)),
+    )
+    return fake
+
+
+def test_parse_workbook_batches_and_maps_tabs(api):
+    parsed = asyncio.run(sheet_parser.parse_workbook("sheet-id"))
+
+    # 5 tabs, 2 per batchGet call, in order.
+    assert api.batch_calls == [["Animals", "Tab's 1"], ["A!B", "  spaced  "], ["Café ☕"]]
+    assert parsed["name"] == "Fake"
+    assert [(t["tab_name"], t["sheet_gid"]) for t in parsed["tabs"]] == [
+        (name, 100 + i) for i, name in enumerate(TABS)
+    ]
+
+    cards = {t["tab_name"]: t["cards"] for t in parsed["tabs"]}
+    assert cards["Animals"] == [
+        {"goal": "cat", "taboos": ["meow", "purr"]},
+        {"goal": "dog", "taboos": ["bark"]},
+    ]
+    assert cards["Tab's 1"] == [{"goal": "it's", "taboos": ["apostrophe"]}]
+    # The blank middle column yields no card; "third" keeps its position.
+    assert cards["A!B"] == [
+        {"goal": "bang", "taboos": ["exclaim", "x"]},
+        {"goal": "third", "taboos": []},
+    ]
+    assert cards["Café ☕"] == [{"goal": "latte", "taboos": ["milk"]}]
+
+
+def test_mismatched_batch_response_is_an_error(api, monkeypatch):
+    def short_handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/values:batchGet"):
+            return httpx.Response(200, text=json.dumps({"valueRanges": [{"values": []}]}))
+        return api.handler(request)
+
+    monkeypatch.setattr(
+        http_client,
+        "get_http_client",
+        lambda: httpx.AsyncClient(transport=httpx.MockTransport(short_handler)),
+    )
+    with pytest.raises(sheet_parser.GoogleSheetsError):
+        asyncio.run(sheet_parser.parse_workbook("sheet-id"))
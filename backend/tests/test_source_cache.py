@@ -0,0 +1,54 @@
+"""
+Source cache entries (services/source_cache.py): validators and body are
+replaced together, and a 304 is only served with the body it refers to.
+
+    cd backend
+    python -m pytest -q
+"""
+from __future__ import annotations
+
+import pytest
+
+from app.config import settings
+from app.services import source_cache
+
+
+URL = "https://example.test/fruit.csv?key=secret"
+SCOPE = "deck:deck-1"
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(source_cache, "CACHE_DIR", tmp_path / "source_cache")
+    monkeypatch.setattr(settings, "SOURCE_CACHE_ENABLED", True)
+    return tmp_path / "source_cache"
+
+
+def test_one_file_per_entry(cache_dir):
+    source_cache.remember(URL, SCOPE, b"apple", "utf-8", {"etag": '"v1"'})
+    assert [p.suffix for p in cache_dir.iterdir()] == [".entry"]
+    assert b"secret" not in next(cache_dir.iterdir()).read_bytes()
+
+    sent = source_cache.conditional_headers(URL, SCOPE)
+    assert sent == {"If-None-Match": '"v1"'}
+    assert source_cache.cached_text(URL, SCOPE, sent) == "apple"
+
+
+def test_replaced_entry_is_not_served_for_old_validators():
+    source_cache.remember(URL, SCOPE, b"apple", "utf-8", {"etag": '"v1"'})
+    sent = source_cache.conditional_headers(URL, SCOPE)
+
+    # Another refresh stores v2 while our conditional request is in flight.
+    source_cache.remember(URL, SCOPE, b"banana", "utf-8", {"etag": '"v2"'})
+
+    # A 304 to "v1" must not be paired with v2's body.
+    assert source_cache.cached_text(URL, SCOPE, sent) is None
+    sent = source_cache.conditional_headers(URL, SCOPE)
+    assert source_cache.cached_text(URL, SCOPE, sent) == "banana"
+
+
+def test_truncated_entry_is_ignored(cache_dir):
+    source_cache.remember(URL, SCOPE, b"apple", "utf-8", {"etag": '"v1"'})
+    entry = next(cache_dir.iterdir())
+    entry.write_bytes(entry.read_bytes()[:-2])
+    assert source_cache.conditional_headers(URL, SCOPE) == {}
@@ -17,7 +17,7 @@ export function authHeaders() {
 
 /**
  * Common JSON response handler.
- * Throws an Error with any .detail from the backend if status is not ok.
+ * Throws an Error with any .detail from the backend (and .status) if status is not ok.
  */
 export async function handleJsonResponse(resp) {
   if (!resp.ok) {
@@ -34,12 +34,45 @@ export async function handleJsonResponse(resp) {
         // ignore
       }
     }
-    throw new Error(msg || "Request failed");
+    const err = new Error(msg || "Request failed");
+    err.status = resp.status;
+    throw err;
   }
 
   return resp.json();
 }
 
+// -------- BACKGROUND JOBS --------
+// Imports, workbook reloads and refreshes answer 202 with a job
+// ({ id, status, done, total, progress, message, result, error }).
+
+export async function fetchJob(jobId) {
+  const resp = await fetch(`${API_BASE}/jobs/${encodeURIComponent(jobId)}`, {
+    headers: {
+      "Content-Type": "application/json",
+      ...authHeaders(),
+    },
+  });
+  return handleJsonResponse(resp);
+}
+
+/**
+ * Poll a job until it finishes. Resolves with its result, or throws the
+ * job's error. onProgress(job) is called after every poll.
+ */
+export async function waitForJob(job, { onProgress, intervalMs = 1000 } = {}) {
+  let current = job;
+  for (;;) {
+    if (onProgress) onProgress(current);
+    if (current.status === "succeeded") return current.result;
+    if (current.status === "failed") {
+      throw new Error(current.error || "Background job failed.");
+    }
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+    current = await fetchJob(current.id);
+  }
+}
+
 // -------- AUTH --------
 
 export async function loginWithPassword(password) {
@@ -60,6 +93,9 @@ export async function loginWithPassword(password) {
 
 // -------- LIBRARY --------
 
+/**
+ * Full library, every deck's cards included (Play tab).
+ */
 export async function fetchDeckState() {
   const resp = await fetch(`${API_BASE}/library/decks-state`, {
     headers: {
@@ -70,6 +106,88 @@ export async function fetchDeckState() {
   return handleJsonResponse(resp);
 }
 
+/**
+ * Categories + deck metadata only, no cards (Manage tab).
+ * Returns { version, categories, decks }.
+ */
+export async function fetchLibrarySummary() {
+  const resp = await fetch(`${API_BASE}/library/summary`, {
+    headers: {
+      "Content-Type": "application/json",
+      ...authHeaders(),
+    },
+  });
+  return handleJsonResponse(resp);
+}
+
+/**
+ * Live library changes over Server-Sent Events.
+ *
+ * onChange(record) gets each committed mutation ({ seq, op, ... });
+ * onReset({ version }) means "too far behind, reload everything".
+ * EventSource reconnects (and resumes) by itself. Returns an unsubscribe
+ * function.
+ */
+export function subscribeToLibraryChanges({ onChange, onReset } = {}) {
+  const source = new EventSource(`${API_BASE}/library/changes/stream`);
+
+  source.addEventListener("change", (event) => {
+    if (onChange) onChange(JSON.parse(event.data));
+  });
+  source.addEventListener("reset", (event) => {
+    if (onReset) onReset(JSON.parse(event.data));
+  });
+
+  return () => source.close();
+}
+
+// -------- PLAY SESSIONS --------
+// The shuffle lives on the server; every call returns
+// { session_id, total, remaining, card } where card is
+// { word, taboo, deck_id, deck_name } or null once the run is over.
+
+async function postPlay(path, body) {
+  const resp = await fetch(`${API_BASE}/play/sessions${path}`, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+      ...authHeaders(),
+    },
+    body: body ? JSON.stringify(body) : undefined,
+  });
+  return handleJsonResponse(resp);
+}
+
+export async function createPlaySession(deckIds) {
+  return postPlay("", { deck_ids: deckIds });
+}
+
+export async function playDraw(sessionId) {
+  return postPlay(`/${sessionId}/draw`);
+}
+
+export async function playSkip(sessionId) {
+  return postPlay(`/${sessionId}/skip`);
+}
+
+export async function playReshuffle(sessionId) {
+  return postPlay(`/${sessionId}/reshuffle`);
+}
+
+export async function endPlaySession(sessionId) {
+  const resp = await fetch(`${API_BASE}/play/sessions/${sessionId}`, {
+    method: "DELETE",
+    headers: {
+      "Content-Type": "application/json",
+      ...authHeaders(),
+    },
+  });
+  return handleJsonResponse(resp);
+}
+
+// The mutations below ask for ?view=summary: they answer with the same
+// { version, categories, decks } shape as fetchLibrarySummary (no cards).
+
 /**
  * Import a deck from a URL.
  *
@@ -107,11 +225,28 @@ export async function importDeckFromUrl(
     body: JSON.stringify(body),
   });
 
-  return handleJsonResponse(resp);
+  // Runs as a background job; wait for it, then hand back the summary.
+  await waitForJob(await handleJsonResponse(resp));
+  return fetchLibrarySummary();
+}
+
+/**
+ * Re-fetch every Google Sheets deck from its source.
+ * Resolves with { refreshed, failed, results: [{ deck_id, name, status, ... }] }.
+ */
+export async function refreshDecksFromSource({ onProgress } = {}) {
+  const resp = await fetch(`${API_BASE}/library/decks/refresh-from-source`, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+      ...authHeaders(),
+    },
+  });
+  return waitForJob(await handleJsonResponse(resp), { onProgress });
 }
 
 export async function createCategory(name) {
-  const resp = await fetch(`${API_BASE}/library/categories`, {
+  const resp = await fetch(`${API_BASE}/library/categories?view=summary`, {
     method: "POST",
     headers: {
       "Content-Type": "application/json",
@@ -124,7 +259,7 @@ export async function createCategory(name) {
 
 export async function deleteCategory(name) {
   const encoded = encodeURIComponent(name);
-  const resp = await fetch(`${API_BASE}/library/categories/${encoded}`, {
+  const resp = await fetch(`${API_BASE}/library/categories/${encoded}?view=summary`, {
     method: "DELETE",
     headers: {
       "Content-Type": "application/json",
@@ -135,7 +270,7 @@ export async function deleteCategory(name) {
 }
 
 export async function moveDeck(deckId, category) {
-  const resp = await fetch(`${API_BASE}/library/decks/${deckId}/category`, {
+  const resp = await fetch(`${API_BASE}/library/decks/${deckId}/category?view=summary`, {
     method: "PATCH",
     headers: {
       "Content-Type": "application/json",
@@ -147,7 +282,7 @@ export async function moveDeck(deckId, category) {
 }
 
 export async function deleteDeck(deckId) {
-  const resp = await fetch(`${API_BASE}/library/decks/${deckId}`, {
+  const resp = await fetch(`${API_BASE}/library/decks/${deckId}?view=summary`, {
     method: "DELETE",
     headers: {
       "Content-Type": "application/json",
@@ -1,6 +1,6 @@
 // frontend/src/api/workbooks.js
 
-import { API_BASE, authHeaders, handleJsonResponse } from "./library";
+import { API_BASE, authHeaders, handleJsonResponse, waitForJob } from "./library";
 
 /**
  * Import a full Google Sheets workbook.
@@ -8,8 +8,9 @@ import { API_BASE, authHeaders, handleJsonResponse } from "./library";
  *  - Parse all tabs
  *  - Create decks (one per tab)
  *  - Store workbook + tab metadata in Mongo
+ * This runs as a background job; resolves once it has finished.
  */
-export async function importWorkbook(sheetUrl) {
+export async function importWorkbook(sheetUrl, { onProgress } = {}) {
   const resp = await fetch(`${API_BASE}/admin/workbooks/add`, {
     method: "POST",
     headers: {
@@ -19,7 +20,7 @@ export async function importWorkbook(sheetUrl) {
     body: JSON.stringify({ sheet_url: sheetUrl }),
   });
 
-  return handleJsonResponse(resp);
+  return waitForJob(await handleJsonResponse(resp), { onProgress });
 }
 
 /**
@@ -38,8 +39,9 @@ export async function fetchWorkbooks() {
 
 /**
  * Re-parse a single workbook and update all of its decks in place.
+ * Background job, like importWorkbook.
  */
-export async function reloadWorkbook(workbookId) {
+export async function reloadWorkbook(workbookId, { onProgress } = {}) {
   const resp = await fetch(
     `${API_BASE}/admin/workbooks/${encodeURIComponent(workbookId)}/reload`,
     {
@@ -50,7 +52,7 @@ export async function reloadWorkbook(workbookId) {
     }
   );
 
-  return handleJsonResponse(resp);
+  return waitForJob(await handleJsonResponse(resp), { onProgress });
 }
 
 /**
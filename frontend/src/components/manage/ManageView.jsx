@@ -2,7 +2,7 @@
 import { useEffect, useMemo, useState } from "react";
 import "./manage.css";
 import {
-  fetchDeckState,
+  fetchLibrarySummary,
   createCategory,
   deleteCategory,
   moveDeck,
@@ -139,6 +139,8 @@ export default function ManageView() {
   const [flaggedDeckIds, setFlaggedDeckIds] = useState([]);
   const [sortConfig, setSortConfig] = useState({});
   const [loading, setLoading] = useState(true);
+  // Progress of a running background job (workbook import/reload), if any.
+  const [jobProgress, setJobProgress] = useState("");
   const [error, setError] = useState("");
   const [draggingId, setDraggingId] = useState(null);
 
@@ -159,7 +161,7 @@ export default function ManageView() {
       setError("");
 
       const [state, workbookList] = await Promise.all([
-        fetchDeckState(),
+        fetchLibrarySummary(),
         fetchWorkbooks().catch(() => []),
       ]);
 
@@ -178,6 +180,16 @@ export default function ManageView() {
     loadState();
   }, []);
 
+  const showJobProgress = (job) => {
+    if (job.status === "queued") {
+      setJobProgress("Waiting for another import to finish…");
+    } else if (job.status === "running" && job.total) {
+      setJobProgress(`${job.done}/${job.total} tabs`);
+    } else {
+      setJobProgress("");
+    }
+  };
+
   /* ---------------- Import Workbook (Google Sheets) ---------------- */
   const handleImportGoogle = async () => {
     const url = window.prompt("Paste the Google Sheets URL for the workbook:");
@@ -187,7 +199,7 @@ export default function ManageView() {
       setLoading(true);
       setError("");
 
-      await importWorkbook(url);
+      await importWorkbook(url, { onProgress: showJobProgress });
       await loadState();
 
       window.alert("Workbook imported and decks updated.");
@@ -197,6 +209,7 @@ export default function ManageView() {
       window.alert(`Failed to import workbook:\n${err.message || err}`);
     } finally {
       setLoading(false);
+      setJobProgress("");
     }
   };
 
@@ -205,13 +218,14 @@ export default function ManageView() {
     try {
       setLoading(true);
       setError("");
-      await reloadWorkbook(workbookId);
+      await reloadWorkbook(workbookId, { onProgress: showJobProgress });
       await loadState();
     } catch (err) {
       console.error(err);
       setError(err.message || "Failed to reload workbook.");
     } finally {
       setLoading(false);
+      setJobProgress("");
     }
   };
 
@@ -561,7 +575,11 @@ export default function ManageView() {
           {allCollapsed ? "Expand All" : "Collapse All"}
         </button>
 
-        {loading && <span style={{ marginLeft: 12 }}>Loading…</span>}
+        {loading && (
+          <span style={{ marginLeft: 12 }}>
+            Loading…{jobProgress && ` ${jobProgress}`}
+          </span>
+        )}
         {error && (
           <span style={{ marginLeft: 12, color: "#f97373" }}>{error}</span>
         )}
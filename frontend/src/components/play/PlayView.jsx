@@ -1,5 +1,13 @@
-import { useEffect, useMemo, useState } from "react";
-import { fetchDeckState } from "../../api/library"; // ../../ because we're in /play/
+import { useEffect, useMemo, useRef, useState } from "react";
+import {
+  createPlaySession,
+  endPlaySession,
+  fetchLibrarySummary,
+  playDraw,
+  playReshuffle,
+  playSkip,
+  subscribeToLibraryChanges,
+} from "../../api/library"; // ../../ because we're in /play/
 
 function shuffleArray(array) {
   const arr = array.slice();
@@ -83,11 +91,13 @@ export default function PlayView() {
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState("");
 
-  // Game state: pool of cards built from selected decks
+  // Game state: the shuffled run lives on the server (/play/sessions);
+  // we only keep its id, the current card and how many cards are left.
   const [isPlaying, setIsPlaying] = useState(false);
-  const [basePool, setBasePool] = useState([]);      // unshuffled pool
-  const [originalRun, setOriginalRun] = useState([]); // last shuffled run
-  const [remaining, setRemaining] = useState([]);     // what’s left to draw
+  const [sessionId, setSessionId] = useState(null);
+  const [currentCard, setCurrentCard] = useState(null);
+  const [remainingCount, setRemainingCount] = useState(0);
+  const [busy, setBusy] = useState(false);
   const [copied, setCopied] = useState(false);
 
   // ---------- Load deck state from backend ----------
@@ -96,7 +106,8 @@ export default function PlayView() {
     try {
       setLoading(true);
       setError("");
-      const state = await fetchDeckState();
+      // Deck metadata only; the cards stay on the server.
+      const state = await fetchLibrarySummary();
       const cats = state && state.categories ? state.categories : [];
       const ds = state && state.decks ? state.decks : [];
 
@@ -120,6 +131,33 @@ export default function PlayView() {
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, []);
 
+  // ---------- Live updates ----------
+  // When someone changes the library (Manage tab, another tablet), reload
+  // the deck list. A burst of changes triggers a single reload, and the
+  // reload itself is a cheap 304 if nothing we show actually changed.
+  // The running game's session is never touched.
+
+  const loadDeckStateRef = useRef(loadDeckState);
+  loadDeckStateRef.current = loadDeckState;
+
+  useEffect(() => {
+    let timer = null;
+    const scheduleReload = () => {
+      if (timer) clearTimeout(timer);
+      timer = setTimeout(() => loadDeckStateRef.current(), 300);
+    };
+
+    const unsubscribe = subscribeToLibraryChanges({
+      onChange: scheduleReload,
+      onReset: scheduleReload,
+    });
+
+    return () => {
+      if (timer) clearTimeout(timer);
+      unsubscribe();
+    };
+  }, []);
+
   // ---------- Helpers for categories / decks ----------
 
   const allCategories = useMemo(() => {
@@ -179,82 +217,94 @@ export default function PlayView() {
     setSelectedDeckIds(shuffled.slice(0, needed));
   };
 
-  // ---------- Build card pool from selected decks ----------
+  // ---------- Game controls ----------
 
-  const buildCardPoolFromSelection = () => {
-    const pool = [];
-    decks.forEach((deck) => {
-      if (!selectedDeckIds.includes(deck.id)) return;
-      if (!Array.isArray(deck.cards) || deck.cards.length === 0) return;
+  const applySession = (state) => {
+    setIsPlaying(true);
+    setSessionId(state.session_id);
+    setRemainingCount(state.remaining);
+    setCurrentCard(
+      state.card ? { ...state.card, deckName: state.card.deck_name } : null
+    );
+  };
 
-      deck.cards.forEach((card) => {
-        pool.push({
-          ...card,
-          deckName: deck.name,
-        });
-      });
-    });
-    return pool;
+  const resetGame = () => {
+    setIsPlaying(false);
+    setSessionId(null);
+    setCurrentCard(null);
+    setRemainingCount(0);
   };
 
-  // ---------- Game controls ----------
+  // Run one session call; if the server forgot the session (expired or
+  // restarted) drop back to the "press Play" state.
+  const runSessionCall = async (call) => {
+    if (busy) return;
+    try {
+      setBusy(true);
+      applySession(await call());
+    } catch (err) {
+      console.error(err);
+      if (err.status === 404) {
+        resetGame();
+        window.alert("This play session expired. Press Play to start again.");
+      } else {
+        window.alert(err.message || "Play request failed.");
+      }
+    } finally {
+      setBusy(false);
+    }
+  };
 
-  const beginPlay = () => {
+  const beginPlay = async () => {
     if (selectedDeckIds.length === 0) {
       window.alert("Select at least one deck first.");
       return;
     }
 
-    const pool = buildCardPoolFromSelection();
-    if (!pool.length) {
+    const previous = sessionId;
+    try {
+      setBusy(true);
+      applySession(await createPlaySession(selectedDeckIds));
+    } catch (err) {
+      console.error(err);
       window.alert(
-        "The selected decks don't have any stored cards.\n" +
-          "Try re-importing your Google Sheet decks from the Manage tab."
+        (err.message || "Could not start the game.") +
+          "\nTry re-importing your Google Sheet decks from the Manage tab."
       );
       return;
+    } finally {
+      setBusy(false);
+    }
+    if (previous) {
+      endPlaySession(previous).catch(() => {});
     }
-
-    const shuffled = shuffleArray(pool);
-    setIsPlaying(true);
-    setBasePool(pool);         // store unshuffled
-    setOriginalRun(shuffled);  // store one shuffled run (optional)
-    setRemaining(shuffled);
   };
 
   const stopPlay = () => {
-    setIsPlaying(false);
-    setRemaining([]);
+    if (sessionId) {
+      endPlaySession(sessionId).catch(() => {});
+    }
+    resetGame();
   };
 
   const reloadPlay = () => {
-    // Reshuffle the base pool instead of reusing originalRun
-    const pool = basePool && basePool.length ? basePool : buildCardPoolFromSelection();
-    if (!pool || !pool.length) return;
-
-    const shuffled = shuffleArray(pool);
-    setIsPlaying(true);
-    setOriginalRun(shuffled);
-    setRemaining(shuffled);
+    if (!sessionId) {
+      beginPlay();
+      return;
+    }
+    runSessionCall(() => playReshuffle(sessionId));
   };
 
   const drawCard = () => {
-    if (!isPlaying || remaining.length === 0) return;
-    // Remove the first card from the pool
-    setRemaining((prev) => prev.slice(1));
+    if (!isPlaying || !sessionId || remainingCount === 0) return;
+    runSessionCall(() => playDraw(sessionId));
   };
 
   const skipCard = () => {
-    if (!isPlaying || remaining.length <= 1) return;
-    // Move the first card to the back of the pool
-    setRemaining((prev) => {
-      const [first, ...rest] = prev;
-      return [...rest, first];
-    });
+    if (!isPlaying || !sessionId || remainingCount <= 1) return;
+    runSessionCall(() => playSkip(sessionId));
   };
 
-  const currentCard =
-    remaining && remaining.length > 0 ? remaining[0] : null;
-
   // For preview text if we don't have a real card yet
   const previewWord = currentCard
     ? currentCard.word
@@ -347,14 +397,14 @@ export default function PlayView() {
             <button
               className="pill pill-green big-pill"
               onClick={drawCard}
-              disabled={!isPlaying || remaining.length === 0}
+              disabled={busy || !isPlaying || remainingCount === 0}
             >
               D (Draw)
             </button>
             <button
               className="pill pill-red big-pill"
               onClick={skipCard}
-              disabled={!isPlaying || remaining.length <= 1}
+              disabled={busy || !isPlaying || remainingCount <= 1}
             >
               K (Skip)
             </button>